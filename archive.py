@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Binary season archive, opened with memory mapping so that loading a season of any size is instant.
+
+An archive is a directory of fixed-width numpy arrays, one per overview and pitchtime column,
+with every game's rows one after the other, and an index.json giving each game's offsets and
+the vocabularies text columns are coded against. The players x points grid of every game,
+which holds the on-pitch marks and goals and assists, is stored as small integer codes.
+
+Opening an archive only reads index.json and maps the arrays, so only the pages a query
+touches are read from disk, and the points, onpitch, goals and assists of a game are
+available as numpy arrays without building any dataframes. Archive.readdata rebuilds the
+overviews and pitchtimes dictionaries exactly as they were written, decoding each column
+for all games at once.
+
+Usage:
+    overviews, pitchtimes, roster = fxns.readdata('tournament.csv')
+    archive.write_archive('season', overviews, pitchtimes)
+
+    season = archive.Archive('season')
+    onpitch, goals, assists = season.onpitch('Herd')
+    overviews, pitchtimes, roster = season.readdata()
+    roster, indstats, GAtotal, genderstats = fxns.calc_stream(season.iter_games())
+"""
+
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+import fxns
+
+
+def _encode(value):
+    """
+    Function : Turns a cell value into a JSON vocabulary entry that keeps its type.
+    """
+    if isinstance(value, (float, np.floating)):
+        return ['f', float(value)]
+    if isinstance(value, (int, np.integer)):
+        return ['i', int(value)]
+    return ['s', str(value)]
+
+def _decode(entry):
+    kind, value = entry
+    return float(value) if kind == 'f' else int(value) if kind == 'i' else value
+
+def _encode_column(values, vocab):
+    """
+    Function : Codes a column of objects against a vocabulary, adding new values to it.
+    Missing values are coded as -1.
+
+    Outputs:
+        int32 array of codes.
+    """
+    codes, uniques = pd.factorize(np.asarray(values, dtype = object))
+    # Only the distinct values are looked up one by one.
+    lookup = {tuple(e) : i for i, e in enumerate(vocab)}
+    mapping = np.empty(len(uniques)+1, dtype = np.int32)
+    mapping[-1] = -1
+    for i, value in enumerate(uniques):
+        key = tuple(_encode(value))
+        if key not in lookup:
+            lookup[key] = len(vocab)
+            vocab.append(list(key))
+        mapping[i] = lookup[key]
+    return mapping[codes]
+
+def _decode_column(codes, vocab):
+    """
+    Function : Turns a column of codes back into objects, with NaN for missing values.
+    """
+    values = np.array([_decode(e) for e in vocab] + [np.nan], dtype = object)
+    return values[np.asarray(codes)]
+
+def _convert(values, lengths, dtypes):
+    """
+    Function : Converts runs of values to their dtypes, converting every run with the same 
+    dtype in a single call.
+
+    Inputs:
+        values - Object array of decoded values, the runs one after the other.
+        lengths - Length of each run, e.g. of each game of a column.
+        dtypes - List of dtype strings, one per run.
+
+    Outputs:
+        List of arrays, one per run.
+    """
+    starts = np.concatenate([[0], np.cumsum(lengths, dtype = np.int64)])
+    converted = [None]*len(lengths)
+    for dtype in set(dtypes):
+        which = [i for i, d in enumerate(dtypes) if d == dtype]
+        if len(which) == len(lengths):
+            rows = slice(None)
+        else:
+            rows = np.concatenate([np.arange(starts[i], starts[i+1]) for i in which])
+        typed = pd.Series(values[rows], dtype = object).astype(dtype).values
+        start = 0
+        for i in which:
+            converted[i] = typed[start:start+lengths[i]]
+            start += lengths[i]
+    return converted
+
+def _point_columns(pitchtime):
+    return [c for c in pitchtime.columns if str(c).isdigit()]
+
+def _fixed_columns(frame):
+    return [c for c in frame.columns if not str(c).isdigit()]
+
+def write_archive(directory, overviews, pitchtimes):
+    """
+    Function : Writes games to a binary archive. The archive is written next to directory
+    and moved into place once complete, so readers never see a half written archive, or
+    new arrays alongside an old index. An existing archive at directory is replaced,
+    but any other existing file or directory raises a ValueError.
+
+    Inputs:
+        directory - String, directory for the archive.
+        overviews - dictionary containing dataframes of game events
+        pitchtimes - Dictionary of dataframes containing player stats
+
+    Outputs:
+        String, the archive directory.
+    """
+    games = list(overviews)
+    overviewcolumns = list(overviews[games[0]].columns) if games else []
+    playercolumns = _fixed_columns(pitchtimes[games[0]]) if games else []
+    for game in games:
+        if list(overviews[game].columns) != overviewcolumns or _fixed_columns(pitchtimes[game]) != playercolumns:
+            raise ValueError('Columns of '+str(game)+' differ from the first game')
+
+    index = {'games' : [], 'overview' : [], 'pitchtime' : [], 'cells' : []}
+    arrays = {}
+    for prefix, frames, columns in [('overview', overviews, overviewcolumns), ('pitchtime', pitchtimes, playercolumns)]:
+        for i, column in enumerate(columns):
+            parts = [frames[game][column] for game in games]
+            dtype = parts[0].dtype if parts else np.dtype(float)
+            entry = {'name' : column}
+            if all(p.dtype.kind in 'iufb' for p in parts) and all(p.dtype == dtype for p in parts):
+                entry['dtype'] = dtype.str
+                arrays[prefix+'-'+str(i)] = np.concatenate([p.values for p in parts]) if parts else np.zeros(0, dtype)
+            else:
+                entry['vocab'] = []
+                values = np.concatenate([p.to_numpy(dtype = object) for p in parts]) if parts else np.zeros(0, object)
+                arrays[prefix+'-'+str(i)] = _encode_column(values, entry['vocab'])
+            index[prefix].append(entry)
+
+    coded = {prefix : [e['name'] for e in index[prefix] if 'vocab' in e] for prefix in ['overview', 'pitchtime']}
+    cells = []
+    offsets = {'points' : 0, 'players' : 0, 'cells' : 0}
+    for game in games:
+        pitchtime = pitchtimes[game]
+        columns = _point_columns(pitchtime)
+        grid = pitchtime[columns]
+        cells.append(grid.to_numpy(dtype = object).ravel())
+        index['games'].append({'name' : game,
+                               'points' : [offsets['points'], len(overviews[game])],
+                               'players' : [offsets['players'], len(pitchtime)],
+                               'cells' : offsets['cells'],
+                               'columns' : columns,
+                               'order' : list(pitchtime.columns),
+                               # Coded columns can be text in one game and all missing (float) in another.
+                               'dtypes' : {'overview' : {c : str(overviews[game][c].dtype) for c in coded['overview']},
+                                           'pitchtime' : {c : str(pitchtime[c].dtype) for c in coded['pitchtime']+columns}},
+                               'index' : [str(i) for i in pitchtime.index] if not isinstance(pitchtime.index, pd.RangeIndex) else None})
+        offsets['points'] += len(overviews[game])
+        offsets['players'] += len(pitchtime)
+        offsets['cells'] += len(cells[-1])
+
+    codes = _encode_column(np.concatenate(cells) if cells else np.zeros(0, object), index['cells'])
+    # Cell codes are small, so they fit 16 bits unless the grid holds many distinct values.
+    celltype = np.int16 if len(index['cells']) < 2**15 else np.int32
+    arrays['cells'] = codes.astype(celltype)
+
+    directory = os.path.normpath(directory)
+    # Only an earlier archive is replaced, never a directory holding anything else.
+    if os.path.exists(directory) and not os.path.isfile(os.path.join(directory, 'index.json')):
+        raise ValueError(directory+' exists and is not an archive')
+    tmpdir = directory+'.'+str(os.getpid())+'.tmp'
+    if os.path.exists(tmpdir):
+        shutil.rmtree(tmpdir)
+    os.makedirs(tmpdir)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmpdir, name+'.npy'), np.ascontiguousarray(array))
+    with open(os.path.join(tmpdir, 'index.json'), 'w') as f:
+        json.dump(index, f)
+
+    # A directory can't be renamed over another, so the old archive is moved aside first.
+    # Between the two renames there is briefly no archive at directory, but never a mixed one.
+    # Readers that already opened it keep their mapped arrays.
+    if os.path.exists(directory):
+        olddir = directory+'.'+str(os.getpid())+'.old'
+        os.rename(directory, olddir)
+        os.rename(tmpdir, directory)
+        shutil.rmtree(olddir)
+    else:
+        os.rename(tmpdir, directory)
+
+    return directory
+
+class Archive:
+    """
+    A binary season archive opened for reading, with every array memory mapped.
+    """
+    def __init__(self, directory):
+        """
+        Inputs:
+            directory - String, archive directory written by write_archive.
+        """
+        self.directory = directory
+        with open(os.path.join(directory, 'index.json')) as f:
+            self.index = json.load(f)
+        self.games = {g['name'] : g for g in self.index['games']}
+        # Every array is mapped now, so the archive stays consistent if it is replaced while open.
+        names = ['cells'] + [prefix+'-'+str(i) for prefix in ['overview', 'pitchtime'] for i in range(len(self.index[prefix]))]
+        self._arrays = {name : np.load(os.path.join(directory, name+'.npy'), mmap_mode = 'r', allow_pickle = False)
+                        for name in names}
+
+    def array(self, name):
+        """
+        Function : Returns a memory mapped archive array.
+        """
+        return self._arrays[name]
+
+    def _column(self, prefix, i, start, length):
+        entry = self.index[prefix][i]
+        values = self.array(prefix+'-'+str(i))[start:start+length]
+        if 'vocab' in entry:
+            return _decode_column(values, entry['vocab'])
+        return np.array(values)
+
+    def column(self, name, game=None):
+        """
+        Function : Returns an overview or pitchtime column, for one game or for every game
+        one after the other, without building a dataframe.
+        """
+        for prefix, rows in [('overview', 'points'), ('pitchtime', 'players')]:
+            for i, entry in enumerate(self.index[prefix]):
+                if entry['name'] == name:
+                    if game is None:
+                        return self._column(prefix, i, 0, len(self.array(prefix+'-'+str(i))))
+                    start, length = self.games[game][rows]
+                    return self._column(prefix, i, start, length)
+        raise KeyError(name)
+
+    def _grid(self, game):
+        g = self.games[game]
+        players, columns = g['players'][1], len(g['columns'])
+        return self.array('cells')[g['cells']:g['cells']+players*columns].reshape(players, columns)
+
+    def onpitch(self, game):
+        """
+        Function : Players x points matrices for a game, as fxns.calc_onpitch gives, read
+        straight from the cell codes.
+
+        Outputs:
+            onpitch, goals, assists - Boolean arrays.
+        """
+        g = self.games[game]
+        grid = self._grid(game)
+        columns = [g['columns'].index(str(i+1)) if str(i+1) in g['columns'] else -1 for i in range(g['points'][1])]
+        codes = np.where(np.array(columns) >= 0, grid[:, columns], -1) if columns else np.zeros((len(grid), 0), int)
+        vocab = [_decode(e) for e in self.index['cells']]
+        goal = np.array([v == 'G' for v in vocab] + [False])
+        assist = np.array([v == 'A' for v in vocab] + [False])
+        return codes >= 0, goal[codes], assist[codes]
+
+    def _frames(self, games):
+        """
+        Function : Rebuilds the overview and pitchtime dataframes of several games, decoding
+        and converting each column for all of them at once. Only the games' rows are read.
+        """
+        gs = [self.games[game] for game in games]
+        columns = {game : {} for game in games}
+        for prefix, rows in [('overview', 'points'), ('pitchtime', 'players')]:
+            lengths = [g[rows][1] for g in gs]
+            starts = np.concatenate([[0], np.cumsum(lengths, dtype = np.int64)])
+            take = np.concatenate([np.arange(g[rows][0], g[rows][0]+g[rows][1]) for g in gs]) if gs else np.zeros(0, int)
+            for i, e in enumerate(self.index[prefix]):
+                values = self.array(prefix+'-'+str(i))[take]
+                if 'vocab' in e:
+                    parts = _convert(_decode_column(values, e['vocab']), lengths,
+                                     [g['dtypes'][prefix][e['name']] for g in gs])
+                else:
+                    parts = [values[starts[k]:starts[k+1]] for k in range(len(gs))]
+                for game, part in zip(games, parts):
+                    columns[game][(prefix, e['name'])] = part
+
+        # Each point column is a strided run through its game's players x points grid.
+        take, dtypes, keys = [], [], []
+        for game, g in zip(games, gs):
+            players, width = g['players'][1], len(g['columns'])
+            for j, c in enumerate(g['columns']):
+                take.append(g['cells'] + j + width*np.arange(players))
+                dtypes.append(g['dtypes']['pitchtime'][c])
+                keys.append((game, c))
+        if keys:
+            cells = _decode_column(self.array('cells')[np.concatenate(take)], self.index['cells'])
+            for (game, c), part in zip(keys, _convert(cells, [len(t) for t in take], dtypes)):
+                columns[game][('pitchtime', c)] = part
+
+        frames = {}
+        for game, g in zip(games, gs):
+            overview = pd.DataFrame({e['name'] : columns[game][('overview', e['name'])] for e in self.index['overview']})
+            pitchtime = pd.DataFrame({c : columns[game][('pitchtime', c)] for c in g['order']}, index = g['index'])
+            frames[game] = overview, pitchtime
+        return frames
+
+    def game(self, game):
+        """
+        Function : Rebuilds the overview and pitchtime dataframes of one game.
+        """
+        return self._frames([game])[game]
+
+    def iter_games(self, games=None, chunksize=50):
+        """
+        Function : Rebuilds games one at a time, for fxns.calc_stream.
+
+        Inputs:
+            games - Names of the games to read. default = None, every game.
+            chunksize - Number of games decoded together. default = 50
+
+        Outputs:
+            Generator of (game, overview, pitchtime) tuples.
+        """
+        games = list(self.games if games is None else games)
+        for start in range(0, len(games), chunksize):
+            chunk = games[start:start+chunksize]
+            frames = self._frames(chunk)
+            for game in chunk:
+                yield (game,) + frames.pop(game)
+
+    def readdata(self, games=None):
+        """
+        Function : Rebuilds the overviews and pitchtimes dictionaries, as fxns.readdata gives.
+
+        Inputs:
+            games - Names of the games to load. default = None, every game.
+
+        Outputs:
+            overviews, pitchtimes, roster
+        """
+        frames = self._frames(list(self.games if games is None else games))
+        overviews = {game : frames[game][0] for game in frames}
+        pitchtimes = {game : frames[game][1] for game in frames}
+        roster = fxns.merge_roster(pitchtimes) if pitchtimes else pd.DataFrame(columns = ['ID','Name','Gender'])
+        return overviews, pitchtimes, roster
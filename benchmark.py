@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Times and memory-profiles every stage of the analysis pipeline on synthetic tournaments
+of increasing size, to catch performance regressions and to see which stages are worth
+optimising first.
+
+For each number of games, a tournament is generated with synthetic.make_tournament, and
+each stage is run with the derived table cache turned off and figures rendered headless.
+Wall time is measured with time.perf_counter, and peak memory with tracemalloc, which
+numpy and pandas report their allocations to. Tracing slows code down, so each stage is
+run twice: once timed, and once traced.
+
+Usage:
+    python benchmark.py --games 1 10 100 1000 10000 --out bench.csv
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+import pandas as pd
+import fxns
+import synthetic
+
+
+def measure(function, *args, **kwargs):
+    """
+    Function : Runs a function twice, measuring its wall time on the first run
+    and its peak memory on the second.
+
+    Outputs:
+        result, seconds, peak - Return value of the function, wall time in seconds
+        and peak memory allocated during the call in MB.
+    """
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        function(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak/2**20
+
+def run_stages(filename):
+    """
+    Function : Runs every pipeline stage on a tournament, in pipeline order.
+
+    Inputs:
+        filename - String, path to the tournament csv file, in the current directory.
+
+    Outputs:
+        List of (stage, seconds, peak MB) tuples.
+    """
+    results = []
+    def stage(name, function, *args, **kwargs):
+        result, seconds, peak = measure(function, *args, **kwargs)
+        results.append((name, seconds, peak))
+        return result
+
+    overviews, pitchtimes, roster = stage('readdata', fxns.readdata, filename, cachedir = None)
+    with tempfile.TemporaryDirectory(prefix = 'bench-cache-') as cachedir:
+        fxns.readdata(filename, cachedir = cachedir)
+        stage('readdata (cached)', fxns.readdata, filename, cachedir = cachedir)
+    indstats = stage('calc_indstats', fxns.calc_indstats, overviews, pitchtimes, roster)
+    GAtotal = stage('totalgoalassist_list', fxns.totalgoalassist_list, pitchtimes, overviews)
+    genderstats = stage('calc_gender_r', fxns.calc_gender_r, GAtotal, overviews, indstats)
+    turns = stage('calc_player_turns', fxns.calc_player_turns, pitchtimes, overviews)
+
+    game = next(iter(overviews))
+    stage('vis_events (one game)', fxns.vis_events, game, overviews)
+    stage('vis_possessions (one game)', fxns.vis_possessions, game, overviews)
+    stage('vis_GAflow', fxns.vis_GAflow, GAtotal, pitchtimes, roster)
+    stage('vis_player_pointresults', fxns.vis_player_pointresults, indstats)
+    stage('vis_player_efficiency', fxns.vis_player_efficiency, indstats)
+    stage('pie_gender_con', fxns.pie_gender_con, genderstats)
+    stage('vis_disparity', fxns.vis_disparity, genderstats, indstats, GAtotal)
+    stage('vis_player_odposviolin', fxns.vis_player_odposviolin, turns, roster)
+
+    return results
+
+def benchmark(games=(1, 10, 100, 1000, 10000), points=20, roster=24, fratio=0.5, seed=0, directory=None):
+    """
+    Function : Benchmarks every pipeline stage over tournaments with different numbers of games.
+
+    Inputs:
+        games - Numbers of games to benchmark. default = (1, 10, 100, 1000, 10000)
+        points - Number of points per game. default = 20
+        roster - Number of players on the roster. default = 24
+        fratio - Share of points played with an F gender ratio. default = 0.5
+        seed - Seed for the synthetic tournaments. default = 0
+        directory - Directory to write the synthetic tournaments to. default = None, a temporary 
+        directory that is removed afterwards.
+
+    Outputs:
+        Dataframe with a row per stage and a seconds and peak MB column per number of games.
+    """
+    temporary = tempfile.TemporaryDirectory(prefix = 'bench-') if directory is None else None
+    if temporary is not None:
+        directory = temporary.name
+
+    cache, headless = fxns.DERIVED_CACHE, fxns.HEADLESS
+    fxns.DERIVED_CACHE, fxns.HEADLESS = None, True
+    # Import the plotting libraries up front, so their one-off import time
+    # is not charged to the first figure of the smallest tournament.
+    fxns.go.Figure, fxns.sns.color_palette, fxns.pco.to_hex, fxns.offline.plot
+    cwd = os.getcwd()
+    rows = []
+    try:
+        for n in games:
+            path = os.path.join(directory, str(n)+'-games')
+            filename = synthetic.make_tournament(path, n, points, roster, fratio, seed)
+            # readdata reads the game files relative to the working directory.
+            os.chdir(path)
+            for stage, seconds, peak in run_stages(os.path.basename(filename)):
+                rows.append({'Stage':stage, 'Games':n, 'Seconds':seconds, 'Peak MB':peak})
+            os.chdir(cwd)
+    finally:
+        os.chdir(cwd)
+        fxns.DERIVED_CACHE, fxns.HEADLESS = cache, headless
+        if temporary is not None:
+            temporary.cleanup()
+
+    table = pd.DataFrame(rows)
+    table = table.pivot_table(index = 'Stage', columns = 'Games', values = ['Seconds', 'Peak MB'], sort = False)
+    return table
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Benchmark the analysis pipeline on synthetic tournaments.')
+    parser.add_argument('--games', type = int, nargs = '+', default = [1, 10, 100, 1000, 10000])
+    parser.add_argument('--points', type = int, default = 20)
+    parser.add_argument('--roster', type = int, default = 24)
+    parser.add_argument('--fratio', type = float, default = 0.5)
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--dir', default = None, help = 'directory for the synthetic tournaments')
+    parser.add_argument('--out', default = None, help = 'csv file to save the comparison table to')
+    args = parser.parse_args()
+
+    table = benchmark(args.games, args.points, args.roster, args.fratio, args.seed, args.dir)
+    pd.set_option('display.width', 200)
+    print(table.round(3).to_string())
+    if args.out:
+        table.to_csv(args.out)
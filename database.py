@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Optional single-file SQLite storage for game data, in place of two csv files per game.
+
+Games, points, players and the players on the pitch in every point are kept in normalised
+tables, indexed on game, player and point situation. import_games reads a tournament in the
+csv layout and adds it to a database, and readdata loads games back in the same layout as
+fxns.readdata. Filters on opponent, date and player are applied in SQL, so loading a slice of
+an archive of many seasons only reads the rows for the games in the slice.
+
+Usage:
+    python database.py archive.db tournament.csv --date 2018-04-14
+
+    import database, fxns
+    overviews, pitchtimes, roster = database.readdata('archive.db', start = '2018-01-01', players = ['Smatt'])
+    indstats = fxns.calc_indstats(overviews, pitchtimes, roster)
+"""
+
+import sqlite3
+import argparse
+import numpy as np
+import pandas as pd
+import fxns
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    opponent TEXT NOT NULL,
+    date TEXT,
+    tournament TEXT,
+    position INTEGER,
+    UNIQUE (opponent, date, tournament)
+);
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    gender TEXT
+);
+CREATE TABLE IF NOT EXISTS points (
+    game INTEGER NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+    point INTEGER NOT NULL,
+    deep_space INTEGER,
+    opponent INTEGER,
+    gender_ratio TEXT,
+    called_by TEXT,
+    od TEXT,
+    scored INTEGER,
+    possessions INTEGER,
+    midpoint_timeout TEXT,
+    between_timeout TEXT,
+    between_x REAL,
+    PRIMARY KEY (game, point)
+);
+CREATE TABLE IF NOT EXISTS game_players (
+    game INTEGER NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+    player INTEGER NOT NULL REFERENCES players(id),
+    row INTEGER NOT NULL,
+    gender TEXT,
+    points_played REAL,
+    goals REAL,
+    assists REAL,
+    PRIMARY KEY (game, row)
+);
+CREATE TABLE IF NOT EXISTS player_points (
+    game INTEGER NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+    point INTEGER NOT NULL,
+    player INTEGER NOT NULL REFERENCES players(id),
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_opponent ON games (opponent);
+CREATE INDEX IF NOT EXISTS games_date ON games (date);
+CREATE INDEX IF NOT EXISTS points_situation ON points (od, gender_ratio, called_by);
+CREATE INDEX IF NOT EXISTS game_players_player ON game_players (player);
+CREATE INDEX IF NOT EXISTS player_points_game ON player_points (game, point);
+CREATE INDEX IF NOT EXISTS player_points_player ON player_points (player);
+"""
+
+# Overview csv columns, against their points table columns.
+OVERVIEW = {'Point number' : 'point', 'Deep Space' : 'deep_space', 'Opponent' : 'opponent',
+            'Gender ratio' : 'gender_ratio', 'Gender Called by' : 'called_by', 'Starting on O/D' : 'od',
+            'Did we score' : 'scored', 'Number of posessions' : 'possessions',
+            'Midpoint Timeouts' : 'midpoint_timeout', 'Timeouts between points' : 'between_timeout',
+            'Events between points' : 'between_x'}
+
+
+def connect(database):
+    """
+    Function : Opens a database, creating its tables and indexes if it is new.
+
+    Inputs:
+        database - String, path of the SQLite file.
+
+    Outputs:
+        sqlite3 Connection.
+    """
+    connection = sqlite3.connect(database)
+    connection.execute('PRAGMA foreign_keys = ON')
+    connection.executescript(SCHEMA)
+    return connection
+
+def _value(x):
+    """
+    Function : Converts a dataframe cell to a value sqlite3 can store, with NaN as NULL.
+    """
+    if x is None or (isinstance(x, float) and np.isnan(x)):
+        return None
+    return x.item() if isinstance(x, np.generic) else x
+
+def _as_read(values, index=None):
+    """
+    Function : Types a column of values read from the database as read_csv types the csv 
+    column: numbers as floats, text with pandas' inferred string dtype, and a column with 
+    nothing in it as floats of NaN.
+    """
+    column = pd.Series(values, index = index, dtype = object)
+    column = column.where(column.notna(), np.nan)
+    try:
+        return column.astype(float)
+    except (ValueError, TypeError):
+        return column.infer_objects()
+
+def _player_ids(connection, roster):
+    """
+    Function : Looks up the IDs of the players in a roster, adding new players.
+    """
+    connection.executemany('INSERT OR IGNORE INTO players (name, gender) VALUES (?, ?)',
+                           [(_value(n), _value(g)) for n, g in zip(roster.Name, roster.Gender)])
+    # Fill in genders that were not known when a player was first added.
+    connection.executemany('UPDATE players SET gender = ? WHERE name = ? AND gender IS NULL',
+                           [(_value(g), _value(n)) for n, g in zip(roster.Name, roster.Gender)])
+    ids = dict(connection.execute('SELECT name, id FROM players'))
+    return [ids[n] for n in roster.Name]
+
+def import_games(database, filename, date=None, tournament=None, cachedir=None):
+    """
+    Function : Adds the games of a tournament in the csv layout to a database.
+    Games already in the database, with the same opponent, date and tournament, are replaced.
+
+    Inputs:
+        database - String, path of the SQLite file. Created if missing.
+        filename - String for the tournament csv file, as for fxns.readdata. If it has a Date
+        column, each game is given its own date.
+        date - String, date of the games, e.g. '2018-04-14', for tournament files without
+        a Date column. default = None
+        tournament - String, name of the tournament. default = None
+        cachedir - As for fxns.readdata. default = None
+
+    Outputs:
+        List of the database IDs of the imported games.
+    """
+    overviews, pitchtimes, roster = fxns.readdata(filename, cachedir)
+    games = pd.read_csv(filename).dropna(how = 'all').reset_index(drop = True)
+    dates = games['Date'] if 'Date' in games else [date]*len(games)
+
+    connection = connect(database)
+    ids = []
+    with connection:
+        for position, (opponent, gamedate) in enumerate(zip(games['Opponent'], dates)):
+            gamedate, tournament = _value(gamedate), _value(tournament)
+            connection.execute('DELETE FROM games WHERE opponent = ? AND date IS ? AND tournament IS ?',
+                               (opponent, gamedate, tournament))
+            game = connection.execute('INSERT INTO games (opponent, date, tournament, position) VALUES (?, ?, ?, ?)',
+                                      (opponent, gamedate, tournament, position)).lastrowid
+            ids.append(game)
+
+            overview = overviews[opponent]
+            connection.executemany('INSERT INTO points (game, '+', '.join(OVERVIEW.values())+') VALUES (?'+', ?'*len(OVERVIEW)+')',
+                                   [(game,)+tuple(_value(x) for x in row) for row in overview[list(OVERVIEW)].itertuples(index = False)])
+
+            pitchtime = pitchtimes[opponent]
+            players = _player_ids(connection, pitchtime)
+            connection.executemany('INSERT INTO game_players VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                   [(game, player, row, _value(g), _value(p), _value(goals), _value(a))
+                                    for row, (player, g, p, goals, a) in enumerate(zip(players, pitchtime.Gender,
+                                    pitchtime['Points Played'], pitchtime['Goals'], pitchtime['Assists']))])
+
+            # Only the players on the pitch in each point are stored.
+            columns = [str(i+1) for i in range(len(overview)) if str(i+1) in pitchtime]
+            cells = pitchtime[columns].values.astype(object)
+            rows, points = np.nonzero(pd.notna(cells))
+            connection.executemany('INSERT INTO player_points VALUES (?, ?, ?, ?)',
+                                   [(game, int(columns[p]), players[r], str(cells[r, p])) for r, p in zip(rows, points)])
+    connection.close()
+
+    return ids
+
+def _filters(opponents=None, start=None, end=None, players=None):
+    """
+    Function : Builds the SQL WHERE clause and parameters selecting games.
+    """
+    where, params = [], []
+    if opponents is not None:
+        opponents = [opponents] if isinstance(opponents, str) else list(opponents)
+        where.append('g.opponent IN ('+', '.join('?'*len(opponents))+')')
+        params += opponents
+    if start is not None:
+        where.append('g.date >= ?')
+        params.append(start)
+    if end is not None:
+        where.append('g.date <= ?')
+        params.append(end)
+    if players is not None:
+        players = [players] if isinstance(players, str) else list(players)
+        where.append('EXISTS (SELECT 1 FROM player_points pp JOIN players p ON p.id = pp.player '
+                     'WHERE pp.game = g.id AND p.name IN ('+', '.join('?'*len(players))+'))')
+        params += players
+    return (' WHERE '+' AND '.join(where) if where else ''), params
+
+def readdata(database, opponents=None, start=None, end=None, players=None):
+    """
+    Function : Loads games from a database, in the layout fxns.readdata returns,
+    reading only the games that match the filters.
+
+    Inputs:
+        database - String, path of the SQLite file.
+        opponents - Opponent name, or list of them. default = None, any opponent.
+        start, end - Strings, first and last dates to include, e.g. '2018-01-01'. default = None
+        players - Player name, or list of them. Only games in which any of them played
+        a point are loaded. default = None
+
+    Outputs:
+        overviews, pitchtimes, roster, as fxns.readdata gives. Games are in date order,
+        then in the order they were listed in their tournament file. Opponents played more
+        than once are told apart by date, as 'Opponent (date)'.
+    """
+    where, params = _filters(opponents, start, end, players)
+    connection = connect(database)
+    try:
+        games = pd.read_sql_query('SELECT g.id, g.opponent, g.date FROM games g'+where+
+                                  ' ORDER BY g.date, g.tournament, g.position, g.id', connection, params = params)
+        selected = 'SELECT g.id FROM games g'+where
+        points = pd.read_sql_query('SELECT * FROM points WHERE game IN ('+selected+') ORDER BY game, point',
+                                   connection, params = params)
+        gameplayers = pd.read_sql_query('SELECT gp.*, p.name FROM game_players gp JOIN players p ON p.id = gp.player '
+                                        'WHERE gp.game IN ('+selected+') ORDER BY gp.game, gp.row',
+                                        connection, params = params)
+        cells = pd.read_sql_query('SELECT * FROM player_points WHERE game IN ('+selected+')',
+                                  connection, params = params)
+    finally:
+        connection.close()
+
+    # Games are keyed on opponent, as in fxns.readdata, with the date added to tell apart repeat opponents.
+    games['name'] = games['opponent']
+    repeat = games['name'].duplicated(keep = False)
+    games.loc[repeat, 'name'] = games['opponent'][repeat]+' ('+games['date'][repeat].fillna('')+')'
+    repeat = games['name'].duplicated(keep = False)
+    games.loc[repeat, 'name'] = games['name'][repeat]+' #'+(games[repeat].groupby('name').cumcount()+1).astype(str)
+
+    points = points.rename(columns = {v : k for k, v in OVERVIEW.items()})
+    pointgroups = dict(list(points.groupby('game')))
+    playergroups = dict(list(gameplayers.groupby('game')))
+    cellgroups = dict(list(cells.groupby('game')))
+
+    overviews = {}
+    pitchtimes = {}
+    for game, opponent in zip(games['id'], games['name']):
+        overview = pointgroups[game][list(OVERVIEW)].reset_index(drop = True)
+        for column in ['Gender ratio', 'Gender Called by', 'Starting on O/D', 'Midpoint Timeouts',
+                       'Timeouts between points', 'Events between points']:
+            overview[column] = _as_read(overview[column].values)
+        overviews[opponent] = overview
+
+        gp = playergroups[game]
+        index = [str(i) for i in range(len(gp))]
+        pitchtime = pd.DataFrame({'Gender' : _as_read(gp['gender'].values, index),
+                                  'Name' : _as_read(gp['name'].values, index)})
+        grid = np.full((len(gp), len(overview)), None, dtype = object)
+        if game in cellgroups:
+            c = cellgroups[game]
+            # Points are stored against players, so a player listed twice in a game gets them on their first row.
+            first = pd.Series(np.arange(len(gp)), index = gp['player'].values)
+            first = first[~first.index.duplicated()]
+            grid[first[c['player']].values, c['point'].values-1] = c['value'].values
+        for i in range(len(overview)):
+            # Points nobody got a goal or assist in are numbers in the csv file, as read_csv would read them.
+            pitchtime[str(i+1)] = _as_read(grid[:, i], index)
+        pitchtime['Points Played'] = gp['points_played'].values
+        pitchtime['Goals'] = gp['goals'].values
+        pitchtime['Assists'] = gp['assists'].values
+        pitchtimes[opponent] = pitchtime
+
+    roster = fxns.merge_roster(pitchtimes) if pitchtimes else pd.DataFrame(columns = ['ID','Name','Gender'])
+
+    return overviews, pitchtimes, roster
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Import a tournament in the csv layout into a SQLite database.')
+    parser.add_argument('database')
+    parser.add_argument('tournament', help = 'tournament csv file')
+    parser.add_argument('--date', default = None)
+    parser.add_argument('--name', default = None, help = 'name of the tournament')
+    args = parser.parse_args()
+    print(len(import_games(args.database, args.tournament, args.date, args.name)), 'games imported')
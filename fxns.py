@@ -10,28 +10,227 @@ game events and individual events.
 This system reads data in with 
 """
 
+import os
+import hashlib
+import importlib
+import functools
+import pickle
+import heapq
+import itertools
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.colors as pco
-import seaborn as sns
-import networkx as nx
-import copy
-from plotly.offline import download_plotlyjs, init_notebook_mode,  plot
-import plotly.graph_objs as go
-init_notebook_mode()
+
+
+class _LazyModule:
+    """
+    Stands in for a module that is only imported when one of its attributes is first used, 
+    so importing fxns stays fast for batch jobs that never draw a figure.
+    """
+    def __init__(self, name):
+        self._name = name
+        
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self._name), attr)
+
+pco = _LazyModule('matplotlib.colors')
+sns = _LazyModule('seaborn')
+nx = _LazyModule('networkx')
+sparse = _LazyModule('scipy.sparse')
+splinalg = _LazyModule('scipy.sparse.linalg')
+offline = _LazyModule('plotly.offline')
+go = _LazyModule('plotly.graph_objs')
+
+def init_notebook():
+    """
+    Function : Sets up plotting for use in a Jupyter notebook. 
+    Loads plotly into the notebook, and sets the seaborn style.
+    """
+    offline.init_notebook_mode()
+    sns.set_style('whitegrid')
+    sns.set_context('paper')
 
 
 #%% Color Options
 UTcmap = {'T':(0.73,0.56,0.81), 'U':(0.67, 0.70, 0.73), 'UT':(0.85,0.53,0.5)}
 FMcmap = {'M':(0.33,0.60,0.78),'F':(0.27, 0.70, 0.62)}
-sns.set_style('whitegrid')
-sns.set_context('paper')
+
+#%% Rendering
+
+# Set to True for batch builds: figures are then only rendered to divs, 
+# and no temp-plot.html is written or opened in a browser.
+HEADLESS = False
+
+def render(fig):
+    """
+    Function : Renders a figure to a html div for embedding in the report. 
+    Unless HEADLESS is set, the figure is also opened in the browser.
+    
+    Inputs: 
+        fig - Plotly figure or figure dictionary.
+    
+    Outputs: 
+        String containing the html div of the figure.
+    """
+    if not HEADLESS:
+        offline.plot(fig)
+    return offline.plot(fig, include_plotlyjs=False, output_type='div')
+
+#%% Cache for derived tables
+
+# Directory in which derived tables are memoized, keyed on a hash of the function's inputs 
+# and of this file, and the maximum size in bytes it may grow to before the least 
+# recently used tables are evicted. Memoization is off until DERIVED_CACHE is set to a 
+# directory, e.g. os.path.join('.ultimate_cache', 'derived').
+DERIVED_CACHE = None
+DERIVED_CACHE_SIZE = 256*2**20
+
+# Number of cache hits and misses for each memoized function in this session.
+cachestats = {}
+
+def _hash_update(h, obj):
+    """
+    Function : Feeds an input of a memoized function into a hash, including dataframes 
+    and dictionaries of dataframes.
+    """
+    if isinstance(obj, dict):
+        h.update(b'dict')
+        for k, v in obj.items():
+            _hash_update(h, k)
+            _hash_update(h, v)
+    elif isinstance(obj, (list, tuple)):
+        h.update(type(obj).__name__.encode())
+        for v in obj:
+            _hash_update(h, v)
+    elif isinstance(obj, pd.DataFrame):
+        h.update(repr((obj.columns.tolist(), obj.shape, [str(d) for d in obj.dtypes])).encode())
+        h.update(pd.util.hash_pandas_object(obj, index = True).values.tobytes())
+    elif isinstance(obj, pd.Series):
+        h.update(repr((obj.name, obj.shape, str(obj.dtype))).encode())
+        h.update(pd.util.hash_pandas_object(obj, index = True).values.tobytes())
+    else:
+        h.update(pickle.dumps(obj))
+
+@functools.lru_cache(maxsize = None)
+def _code_version():
+    with open(__file__, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def _evict(cachedir, maxsize):
+    """
+    Function : Removes the least recently used tables until the cache fits in maxsize bytes.
+    """
+    files = [os.path.join(cachedir, f) for f in os.listdir(cachedir) if f.endswith('.pkl')]
+    files = sorted((os.stat(f).st_mtime_ns, os.stat(f).st_size, f) for f in files)
+    total = sum(size for _, size, _ in files)
+    for _, size, f in files:
+        if total <= maxsize:
+            break
+        os.remove(f)
+        total -= size
+
+def memoize(function):
+    """
+    Function : Decorator that memoizes a function returning derived tables on disk. 
+    Results are keyed on a hash of the function name, its inputs and the code version, 
+    so they are reused until an input or fxns.py changes. A workers keyword argument is not 
+    part of the key. Reading a cached table marks it 
+    as recently used. Hits and misses are counted in cachestats.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if DERIVED_CACHE is None:
+            return function(*args, **kwargs)
+        
+        h = hashlib.sha1()
+        _hash_update(h, (function.__name__, _code_version()))
+        _hash_update(h, args)
+        # The number of worker processes never changes a result, so it is left out of the key.
+        _hash_update(h, {k : v for k, v in kwargs.items() if k != 'workers'})
+        cachefile = os.path.join(DERIVED_CACHE, function.__name__+'-'+h.hexdigest()+'.pkl')
+        stats = cachestats.setdefault(function.__name__, {'hits':0, 'misses':0})
+        
+        if os.path.exists(cachefile):
+            try:
+                result = pd.read_pickle(cachefile)
+            except Exception:
+                # A damaged or unreadable entry is treated as a miss and rewritten.
+                pass
+            else:
+                os.utime(cachefile)
+                stats['hits'] += 1
+                return result
+        
+        stats['misses'] += 1
+        result = function(*args, **kwargs)
+        os.makedirs(DERIVED_CACHE, exist_ok = True)
+        tmpfile = cachefile+'.'+str(os.getpid())+'.tmp'
+        pd.to_pickle(result, tmpfile)
+        os.replace(tmpfile, cachefile)
+        _evict(DERIVED_CACHE, DERIVED_CACHE_SIZE)
+        
+        return result
+    
+    return wrapper
 
 #%% Read data for use 
 
 
-def readdata(filename):
+def _read_game(overviewfile, pitchtimefile, cachedir=None):
+    """
+    Function : Reads the Overview and Pitchtime csv files for a single game. 
+    If a cache directory is given, the parsed dataframes are pickled there, keyed on 
+    the path, modification time and size of both csv files, and reused until either changes.
+    
+    Inputs: 
+        overviewfile - String, path to the game's Overview csv file.
+        pitchtimefile - String, path to the game's Pitchtime csv file.
+        cachedir - String, directory for cached games. default = None, no caching.
+    
+    Outputs: 
+        overview, pitchtime - Dataframes of game events and player stats.
+    """
+    if cachedir is not None:
+        key = []
+        for f in (overviewfile, pitchtimefile):
+            st = os.stat(f)
+            key.append((os.path.abspath(f), st.st_mtime_ns, st.st_size))
+        name = hashlib.sha1(repr(key[0][0]).encode()).hexdigest()
+        cachefile = os.path.join(cachedir, name+'.pkl')
+        if os.path.exists(cachefile):
+            cached = pd.read_pickle(cachefile)
+            if cached['key'] == key:
+                return cached['overview'], cached['pitchtime']
+    
+    overview = pd.read_csv(overviewfile)
+    pitchtime = pd.read_csv(pitchtimefile)
+    pitchtime = pitchtime.rename(index = str, columns = {"Unnamed: 0":'Gender', "Unnamed: 1":"Name"})
+    pitchtime.drop(pitchtime.tail(3).index, inplace = True)
+    
+    if cachedir is not None:
+        os.makedirs(cachedir, exist_ok = True)
+        # Write to a temporary file first so concurrent readers never see a partial pickle.
+        tmpfile = cachefile+'.'+str(os.getpid())+'.tmp'
+        pd.to_pickle({'key':key, 'overview':overview, 'pitchtime':pitchtime}, tmpfile)
+        os.replace(tmpfile, cachefile)
+    
+    return overview, pitchtime
+
+def _read_tournament(filename):
+    """
+    Function : Reads a tournament csv file, adding the Overview and Pitchtime csv file of each game.
+    """
+    tournament = pd.read_csv(filename)
+    tournament = tournament.dropna(how = 'all')
+    tournament = tournament.dropna(axis = 1, how = 'all')
+    tournament = tournament.reset_index(drop = True)
+
+    tournament['Overview'] = tournament['Opponent']+'-'+'Overview.csv'
+    tournament['Pitchtime'] = tournament['Opponent']+'-'+'Pitchtime.csv'
+    
+    return tournament
+
+def readdata(filename, cachedir=None, workers=None, registry=None):
     """
     Function : Returns lists of csv files to read and saves them into dictionaries of dataframes.
     Each game has two dataframes:
@@ -41,58 +240,359 @@ def readdata(filename):
         2. Pitchtimes: 
             Player based statistics including Goals, Assists, and 
             whether they were on the pitch for each point.
+    Games are read concurrently, and parsed games are cached so only games whose 
+    csv files have changed are parsed again on the next call.
     
     Inputs: 
         filename - This should be a string for the csv file in which the 
         tournament games are stored in. 
+        cachedir - String, directory in which parsed games are cached, 
+        e.g. '.ultimate_cache'. default = None, no caching.
+        workers - Number of threads used to read games. default = None, chosen by Python.
+        registry - PlayerRegistry. If given, aliases are replaced with registered names in 
+        every game, new players are registered and the registry is saved, and the roster's 
+        ID column holds each player's registry ID. default = None, IDs are roster positions.
     
     Outputs: 
         overviews, pitchtimes, roster
         
         overviews - Dictionary of dataframes containing game events 
         pitchtimes - Dictionary of dataframes containing player stats
-        roster - Dataframe containing player names and gender for the entire tournament.
+        roster - Dataframe containing player IDs, names and gender for the entire tournament.
     """
-    tournament = pd.read_csv(filename)
-    tournament = tournament.dropna(how = 'all')
-    tournament = tournament.dropna(axis = 1, how = 'all')
+    tournament = _read_tournament(filename)
 
     overviews = {}
     pitchtimes = {}
 
-    tournament['Overview'] = tournament['Opponent']+'-'+'Overview.csv'
-    tournament['Pitchtime'] = tournament['Opponent']+'-'+'Pitchtime.csv'
+    # Import games concurrently, keeping the order of the tournament file
+    with ThreadPoolExecutor(max_workers = workers) as pool:
+        games = pool.map(lambda i: _read_game(tournament['Overview'][i], tournament['Pitchtime'][i], cachedir),
+                         range(len(tournament)))
+        for opponent, (overview, pitchtime) in zip(tournament['Opponent'], games):
+            overviews[opponent] = overview
+            pitchtimes[opponent] = pitchtime
+    
+    if registry is not None:
+        for game in pitchtimes:
+            pitchtimes[game] = pitchtimes[game].assign(Name = registry.canonical(pitchtimes[game].Name))
+    
+    roster = merge_roster(pitchtimes)
+    
+    if registry is not None:
+        roster['ID'] = registry.register(roster)
+        if registry.filename is not None:
+            registry.save()
+    
+    return overviews, pitchtimes, roster
 
-    # Import game overviews
-    for i in range(len(tournament)):
-        overviews[tournament['Opponent'][i]]=pd.read_csv(tournament['Overview'][i])
-        pitchtimes[tournament['Opponent'][i]]=pd.read_csv(tournament['Pitchtime'][i])
+def merge_roster(pitchtimes):
+    """
+    Function : Builds the roster from every game, so players missing from any one game are kept.
+    
+    Inputs: 
+        pitchtimes - Dictionary of dataframes containing player stats
+    
+    Outputs: 
+        Dataframe containing player IDs, names and gender, in order of first appearance, 
+        with the string index labels pitchtimes have. The IDs are the players' positions 
+        in the roster; readdata swaps them for registry IDs when given a registry.
+    """
+    # Concatenating the two columns is far cheaper than selecting them as a frame from every game.
+    names = pd.concat([pitchtimes[game]['Name'] for game in pitchtimes], ignore_index = True)
+    genders = pd.concat([pitchtimes[game]['Gender'] for game in pitchtimes], ignore_index = True)
+    first = ~names.duplicated()
+    roster = pd.DataFrame({'ID' : np.arange(first.sum(), dtype = np.int64), 'Name' : names[first].values, 
+                           'Gender' : genders[first].values}).rename(index = str)
+    
+    return roster
+
+def gender_of(ids, players):
+    """
+    Function : Looks up the gender of each player by ID, with one vectorised index lookup.
+    
+    Inputs: 
+        ids - Player IDs, e.g. a column of GAtotal.
+        players - Dataframe with ID and Gender columns, e.g. roster or indstats.
+    
+    Outputs: 
+        Series of genders with the index of ids, NaN for IDs not in players.
+    """
+    rows = pd.Index(players.ID).get_indexer(ids)
+    genders = players.Gender.to_numpy(dtype = object)
+    return pd.Series(np.where(rows >= 0, genders[rows], np.nan), index = getattr(ids, 'index', None), dtype = object)
+
+def name_of(ids, players):
+    """
+    Function : Looks up the name of each player by ID, for labelling figures.
     
-    for game in pitchtimes:
-        pitchtimes[game] = pitchtimes[game].rename(index = str, columns = {"Unnamed: 0":'Gender', "Unnamed: 1":"Name"})
-        pitchtimes[game].drop(pitchtimes[game].tail(3).index, inplace = True)
+    Inputs: 
+        ids - Player IDs, e.g. a column of GAtotal.
+        players - Dataframe with ID and Name columns, e.g. roster or indstats.
+    
+    Outputs: 
+        Series of names with the index of ids, NaN for IDs not in players.
+    """
+    rows = pd.Index(players.ID).get_indexer(ids)
+    names = players.Name.to_numpy(dtype = object)
+    return pd.Series(np.where(rows >= 0, names[rows], np.nan), index = getattr(ids, 'index', None), dtype = object)
+
+class PlayerRegistry:
+    """
+    Every player seen in any game or season, with a stable integer ID, their gender, and the 
+    other names they have been entered under. It is kept in a csv file, so a player keeps 
+    their ID from one season to the next, and a player entered as e.g. 'Smatt' in one game 
+    and 'Matt S' in another is counted as one player once the alias is added.
+    
+    Usage:
+        registry = PlayerRegistry('players.csv')
+        registry.add_alias('Matt S', 'Smatt')
+        overviews, pitchtimes, roster = readdata('tournament.csv', registry = registry)
+        # roster's ID column now holds registry IDs, and every game uses the registered names.
+    """
+    def __init__(self, filename=None):
+        """
+        Inputs:
+            filename - String, csv file the registry is loaded from and saved to. 
+            default = None, a registry that is not saved.
+        """
+        self.filename = filename
+        self.players = pd.DataFrame({'ID' : pd.Series(dtype = np.int64), 'Name' : pd.Series(dtype = object),
+                                     'Gender' : pd.Series(dtype = object)})
+        self.aliases = {}
+        if filename is not None and os.path.exists(filename):
+            players = pd.read_csv(filename, dtype = {'Name' : object, 'Gender' : object, 'Aliases' : object})
+            for ID, aliases in zip(players.ID, players.Aliases.fillna('')):
+                for alias in filter(None, aliases.split('; ')):
+                    self.aliases[alias] = int(ID)
+            self.players = players[['ID','Name','Gender']].astype({'ID' : np.int64})
+        self._update()
+    
+    def _update(self):
+        # Every known name, registered or alias, against its ID.
+        self._lookup = pd.Series(list(self.players.ID)+list(self.aliases.values()), 
+                                 index = list(self.players.Name)+list(self.aliases), dtype = np.int64)
+        if not self._lookup.index.is_unique:
+            duplicated = self._lookup.index[self._lookup.index.duplicated()]
+            raise ValueError('Names registered more than once: '+', '.join(map(str, duplicated.unique())))
+        self._rows = pd.Index(self.players.ID)
+    
+    def ids(self, names):
+        """
+        Function : Looks up the IDs of player names or aliases.
         
-    roster = pitchtimes[game][['Name','Gender']]
+        Outputs: 
+            Array of IDs aligned with names, -1 for unknown names.
+        """
+        # Unknown names get position -1, which picks the -1 on the end.
+        positions = pd.Index(self._lookup.index).get_indexer(names)
+        return np.append(self._lookup.values, -1)[positions]
+    
+    def names(self, ids):
+        """
+        Function : Looks up the registered names of player IDs, for display.
+        """
+        return np.append(self.players.Name.to_numpy(dtype = object), np.nan)[self._rows.get_indexer(ids)]
+    
+    def canonical(self, names):
+        """
+        Function : Replaces aliases with registered names. Unknown names are left as they are.
+        """
+        names = np.asarray(names, dtype = object)
+        ids = self.ids(names)
+        return np.where(ids >= 0, self.names(ids), names)
+    
+    def register(self, roster):
+        """
+        Function : Adds any new players in a roster to the registry, and fills in 
+        genders the registry did not know.
+        
+        Inputs: 
+            roster - Dataframe with Name and Gender columns.
+        
+        Outputs: 
+            Array of the players' IDs, aligned with roster.
+        """
+        ids = self.ids(roster.Name)
+        new = roster[ids < 0].drop_duplicates(subset = 'Name')
+        if len(new):
+            start = self.players.ID.max()+1 if len(self.players) else 0
+            added = pd.DataFrame({'ID' : np.arange(start, start+len(new), dtype = np.int64),
+                                  'Name' : new.Name.values, 'Gender' : new.Gender.values})
+            self.players = pd.concat([self.players, added], ignore_index = True)
+            self._update()
+            ids = self.ids(roster.Name)
+        
+        known = self.players.Gender.isna().values[self._rows.get_indexer(ids)] & roster.Gender.notna().values
+        if known.any():
+            rows = self._rows.get_indexer(ids[known])
+            self.players.loc[self.players.index[rows], 'Gender'] = roster.Gender.values[known]
+        
+        return ids
+    
+    def add_alias(self, alias, name):
+        """
+        Function : Records that alias is another name for the player registered as name. 
+        If alias was registered as a player of its own, that player and their aliases are 
+        merged into name. An existing alias is pointed at name instead.
+        """
+        ID = int(self.ids([name])[0])
+        if ID < 0:
+            raise KeyError(name)
+        registered = self.players.Name == alias
+        if registered.any():
+            old = int(self.players.ID[registered].iloc[0])
+            if old == ID:
+                # alias is already the registered name of the player.
+                return
+            self.aliases = {a : (ID if i == old else i) for a, i in self.aliases.items()}
+            self.players = self.players[self.players.ID != old].reset_index(drop = True)
+        self.aliases[alias] = ID
+        self._update()
+    
+    def roster(self):
+        """
+        Function : Returns every registered player, with their ID, Name and Gender.
+        """
+        return self.players.copy()
+    
+    def save(self, filename=None):
+        """
+        Function : Saves the registry to its csv file, or to filename if given.
+        """
+        filename = self.filename if filename is None else filename
+        aliases = pd.Series(list(self.aliases), index = list(self.aliases.values()), dtype = object)
+        players = self.players.copy()
+        players['Aliases'] = ['; '.join(aliases[aliases.index == ID]) for ID in players.ID]
+        players.to_csv(filename, index = False)
+
+#%% Long format tables of points and players on the pitch
+
+def calc_points(overviews):
+    """
+    Function : Stacks the game events of every game into one table, with a row per point.
+    Games are given integer IDs in the order of overviews.
     
-    return overviews, pitchtimes, roster
+    Inputs: 
+        overviews - dictionary containing dataframes of game events
+    
+    Outputs: 
+        Dataframe with columns Game, Point, Starting on O/D, Gender ratio, 
+        Gender Called by, Did we score and Number of posessions.
+    """
+    points = []
+    for gameid, game in enumerate(overviews):
+        gameinfo = overviews[game]
+        p = pd.DataFrame({
+                'Game' : np.full(len(gameinfo), gameid, dtype = np.int32),
+                'Point' : np.arange(1, len(gameinfo)+1, dtype = np.int32),
+                # Anything not started on O is treated as a D point, and anything not scored as conceded.
+                'Starting on O/D' : np.where(gameinfo['Starting on O/D']=='O', 'O', 'D'),
+                'Gender ratio' : gameinfo['Gender ratio'].values,
+                'Gender Called by' : gameinfo['Gender Called by'].values,
+                'Did we score' : (gameinfo['Did we score']==1).values.astype(np.int8),
+                'Number of posessions' : gameinfo['Number of posessions'].values,
+                })
+        points.append(p)
+    points = pd.concat(points, ignore_index = True)
+    
+    for column in ['Starting on O/D', 'Gender ratio', 'Gender Called by']:
+        points[column] = points[column].astype('category')
+    
+    return points
+
+def calc_pointlog(overviews, pitchtimes, roster=None):
+    """
+    Function : Converts the one-column-per-point pitchtimes dataframes into one long table, 
+    with a row for every player on the pitch in every point. 
+    Games and players are stored as integer IDs, their positions in overviews and roster.
+    
+    Inputs: 
+        overviews - dictionary containing dataframes of game events
+        pitchtimes - Dictionary of dataframes containing player stats
+        roster - Dataframe containing roster for the entire tournament. 
+        default = None, merged from pitchtimes.
+    
+    Outputs: 
+        Dataframe with columns Game, Point, Player and Role, where Role is 
+        'G' for a goal, 'A' for an assist and 'P' for otherwise playing the point.
+    """
+    if roster is None:
+        roster = merge_roster(pitchtimes)
+    playerids = pd.Index(roster.Name)
+    
+    pointlog = []
+    for gameid, game in enumerate(overviews):
+        columns = [str(i+1) for i in range(len(overviews[game])) if str(i+1) in pitchtimes[game]]
+        r = pitchtimes[game][['Name']+columns].melt(id_vars = 'Name', var_name = 'Point', value_name = 'Role')
+        r = r.dropna(subset = ['Role'])
+        pointlog.append(pd.DataFrame({
+                'Game' : np.full(len(r), gameid, dtype = np.int32),
+                'Point' : r['Point'].astype(np.int32).values,
+                'Player' : playerids.get_indexer(r['Name']).astype(np.int32),
+                'Role' : r['Role'].where(r['Role'].isin(['G','A']), 'P').values,
+                }))
+    pointlog = pd.concat(pointlog, ignore_index = True)
+    pointlog['Role'] = pd.Categorical(pointlog['Role'], categories = ['P','A','G'])
+    pointlog.sort_values(['Game','Point','Player'], inplace = True)
+    pointlog.reset_index(drop = True, inplace = True)
+    
+    return pointlog
+
+def calc_onpitch(overview, pitchtime):
+    """
+    Function : Builds players x points matrices for a single game, with a row per 
+    player in pitchtime and a column per point in overview.
+    
+    Inputs: 
+        overview - Dataframe of game events for the game
+        pitchtime - Dataframe of player stats for the game
+    
+    Outputs: 
+        onpitch, goals, assists - Boolean arrays marking whether each player was on the pitch, 
+        scored or assisted in each point.
+    """
+    values = pitchtime.reindex(columns = [str(i+1) for i in range(len(overview))]).values.astype(object)
+    onpitch = pd.notna(values)
+    goals = values == 'G'
+    assists = values == 'A'
+    
+    return onpitch, goals, assists
 
 #%% Functions and Visualisations relating to overall team performances 
 
-def vis_events(game, overviews):
+def vis_events(game, overviews, minrun=3):
     """
     Function : Overview of specified game, displaying: 
                     - Score evolution within the game
                     - Gender ratio of each point
                     - Which team called the gender ratio
                     - When timeouts happen
+                    - Scoring runs
         
     Inputs: 
         game - String, name of opponent of interest. 
         overviews - dictionary containing dataframes of game events
+        minrun - Shortest scoring run to shade. None shades no runs. default = 3
     
     Outputs:
         Plotly Scatter and Line graph.
     """
+    return render(fig_events(game, overviews, minrun))
+
+def fig_events(game, overviews, minrun=3):
+    """
+    Function : Builds the figure shown by vis_events, without rendering it.
+    
+    Inputs: 
+        game - String, name of opponent of interest. 
+        overviews - dictionary containing dataframes of game events
+        minrun - Shortest scoring run to shade. None shades no runs. default = 3
+    
+    Outputs:
+        Plotly Figure. Trace 0 is the opponent's score, trace 1 is our score. 
+        Timeouts are the first shapes, followed by the scoring runs.
+    """
     fm2 = dict((k, pco.to_hex(v)) for k,v in FMcmap.items())
     ut2 = dict((k, pco.to_hex(v)) for k,v in UTcmap.items())
     
@@ -107,7 +607,7 @@ def vis_events(game, overviews):
     bto = bto.rename(index = str, columns={'Events between points':'x','Timeouts between points':'Timeout'})
     
     # Store timeout information in one place
-    timeouts = mto.append(bto)
+    timeouts = pd.concat([mto, bto])
     timeouts.reset_index(inplace = True, drop = True)
     
     # Plot Trace
@@ -116,7 +616,7 @@ def vis_events(game, overviews):
         y = gameinfo['Deep Space'],
         mode = 'lines+markers',
         marker = dict(
-                size = '10', 
+                size = 10, 
                 color = gameinfo['Gender ratio'].map(fm2),
                 ),
         line = dict(
@@ -153,6 +653,23 @@ def vis_events(game, overviews):
                                 },
                        })
     
+    if minrun is not None and len(gameinfo):
+        runs = calc_runs({game : gameinfo}, minrun)
+        runcolors = {'Deep Space' : '#ABB2B9', 'Opponent' : '#BB8FCE'}
+        for team, start, end in zip(runs.Team, runs.Start, runs.End):
+            shapes.append({'type': 'rect',
+                           'xref': 'x',
+                           'yref': 'paper',
+                           'x0': start-0.5,
+                           'y0': 0,
+                           'x1': end+0.5,
+                           'y1': 1,
+                           'fillcolor': runcolors[team],
+                           'opacity': 0.2,
+                           'layer': 'below',
+                           'line': {'width': 0},
+                           })
+    
     layout = go.Layout(
             title = "Events vs "+str(game),
             shapes = shapes,
@@ -168,8 +685,7 @@ def vis_events(game, overviews):
             )
             
     fig = go.Figure(data = [trace2,trace1], layout = layout)
-    plot(fig)
-    return plot(fig, include_plotlyjs=False, output_type='div')
+    return fig
 
 def vis_possessions(game, overviews):
     """
@@ -183,6 +699,19 @@ def vis_possessions(game, overviews):
         Plotly scatter graph. 
         
     """
+    return render(fig_possessions(game, overviews))
+
+def fig_possessions(game, overviews):
+    """
+    Function : Builds the figure shown by vis_possessions, without rendering it.
+    
+    Inputs:
+        game - name of opponent in question
+        overviews - dictionary containing dataframes of game events
+        
+    Outputs:
+        Plotly Figure with a single scatter trace.
+    """
     yn = {0 : '#BB8FCE', 1 : '#ABB2B9'}
     yn1 ={0:'Conceded', 1:'Converted'}
     gameinfo = overviews[game]
@@ -191,7 +720,7 @@ def vis_possessions(game, overviews):
             y = gameinfo['Number of posessions'],
             mode = 'markers',
             marker = dict(
-                size = '10', 
+                size = 10, 
                 color = gameinfo['Did we score'].map(yn),
                 ),
             text = gameinfo['Did we score'].map(yn1),
@@ -206,39 +735,79 @@ def vis_possessions(game, overviews):
             )
         
     fig = go.Figure(data=trace_1, layout = layout)
-    plot(fig)
     
-    return plot(fig, include_plotlyjs=False, output_type='div')
+    return fig
 
 #%% Functions and Visualisations relating to goals and assist information.
 
-def totalgoalassist_list(pitchtimes, overviews):
+def calc_GApairs(overviews, pitchtimes, roster=None):
     """
-    Function :   Goals, Assists for all games
+    Function : Extracts the assister and scorer of every point from all games in one pass 
+    over the long format pointlog. Scored points, and points with any G or A marker, are 
+    flagged when they do not have exactly one of each marker.
+    
+    Inputs: 
+        overviews - dictionary containing dataframes of game events
+        pitchtimes - Dictionary of dataframes containing player stats
+        roster - Dataframe containing roster for the entire tournament. 
+        default = None, merged from pitchtimes.
+    
+    Outputs: 
+        Dataframe with columns Game, Point, Assists, Goals, A markers, G markers and Flagged.
+        Assists and Goals are integer player IDs, or -1 where the marker is missing or duplicated.
+    """
+    points = calc_points(overviews)
+    pointlog = calc_pointlog(overviews, pitchtimes, roster)
+    
+    marked = pointlog[pointlog.Role.isin(['G','A'])]
+    markers = marked.groupby(['Game','Point','Role'], observed = False).Player.agg(['size','max'])
+    markers = markers.unstack('Role').reindex(columns = ['G','A'], level = 'Role')
+    markers = markers.reindex(pd.MultiIndex.from_frame(points[['Game','Point']])).fillna({'size':0})
+    
+    GA = points[['Game','Point','Did we score']].copy()
+    for role, column in [('A','Assists'), ('G','Goals')]:
+        count = markers[('size', role)].fillna(0).values.astype(int)
+        GA[column] = np.where(count==1, markers[('max', role)].fillna(-1).values, -1).astype(np.int32)
+        GA[role+' markers'] = count
+    
+    GA = GA[(GA['Did we score']==1) | (GA['G markers'] > 0) | (GA['A markers'] > 0)]
+    GA['Flagged'] = (GA['G markers']!=1) | (GA['A markers']!=1) | (GA['Did we score']!=1)
+    GA = GA[['Game','Point','Assists','Goals','A markers','G markers','Flagged']].reset_index(drop = True)
+    
+    return GA
+
+@memoize
+def totalgoalassist_list(pitchtimes, overviews, roster=None):
+    """
+    Function :   Goals, Assists for all games, as player IDs. 
+    Points without exactly one goal and one assist marker are left out, see calc_GApairs.
     
     Inputs: 
         pitchtimes - Dictionary containing all dataframes of player stats
         overviews  - Dictionary containing all dataframes of game stats
+        roster - Dataframe containing roster for the entire tournament, whose ID column 
+        the pairs are given in. default = None, merged from pitchtimes.
         
     Outputs: 
-        Dataframe containing Goal and Assist pairs. 
+        Dataframe containing Goal and Assist player ID pairs, indexed by Game and Point. 
+        Names are looked up from the roster when plotting, see name_of.
     """
-    GAtotal = []
-
-    for game in pitchtimes:
-        points = len(overviews[game])
-        scored = pitchtimes[game].select_dtypes(include=['object'])
-        GA = pd.DataFrame(index = range(points), columns = ['Goals', 'Assists'])
+    if roster is None:
+        roster = merge_roster(pitchtimes)
+    GA = calc_GApairs(overviews, pitchtimes, roster)
     
-        for i in range(points):
-            if str(i+1) in scored:
-                GA['Goals'][i] = pitchtimes[game].loc[pitchtimes[game][str(i+1)]=="G"]['Name'].item()
-                GA['Assists'][i] =  pitchtimes[game].loc[pitchtimes[game][str(i+1)]=="A"]['Name'].item()
-        GA = GA.dropna()
-        GAtotal.append(GA)
+    return _GA_ids(GA, roster.ID.values, list(overviews))
 
-    GAtotal = pd.concat(GAtotal)
-    
+def _GA_ids(GA, ids, games):
+    """
+    Function : Keeps the complete pairs from calc_GApairs, and swaps roster positions for player IDs.
+    """
+    GA = GA[(GA.Goals >= 0) & (GA.Assists >= 0)]
+    GAtotal = pd.DataFrame({'Goals' : ids[GA.Goals.values].astype(np.int64), 
+                            'Assists' : ids[GA.Assists.values].astype(np.int64)}, 
+                           index = pd.MultiIndex.from_arrays(
+                                   [np.array(games)[GA.Game.values], GA.Point.values],
+                                   names = ['Game','Point']))
     return GAtotal
 
 def vis_GAflow(GAtotal,pitchtimes,roster, title='Visualising GA flow'):
@@ -246,20 +815,25 @@ def vis_GAflow(GAtotal,pitchtimes,roster, title='Visualising GA flow'):
     Function : Creates a Plotly Alluvial flow graph.
     
     Inputs: 
-        GAtotal - Dataframe of Goal/Assist pairs
+        GAtotal - Dataframe of Goal/Assist player ID pairs
         pitchtimes - Dictionary of dataframes containing player stats
-        roster - Dataframe containing roster for the entire tournament
+        roster - Dataframe containing roster for the entire tournament, whose names label the nodes
         title - Title of the generated plot. (String)
         
     Outputs:  
         Plotly Alluvial Flow Diagram.
     """
-    # Generate a color palette with enough variations to cover the whole team
-    sns.set_palette('husl',len(roster))
-    # Map colors to each player.
-    playercmap = dict(zip(roster.Name, sns.color_palette()))
+    # Generate a color palette with enough variations to cover the whole team, 
+    # and map colors to each player.
+    playercmap = dict(zip(roster.Name, sns.color_palette('husl',len(roster))))
     # Calculate weight of each link, and save to new DataFrame.
     sankey = GAtotal.groupby(['Assists','Goals']).size().to_frame('Counts').reset_index()
+    rmap = {'FF':'#45B39D', 'FM': '#7DCEA0', 'MF':'#85C1E9','MM':'#5499C7'}
+    sankey['GA pair']=gender_of(sankey.Assists, roster)+gender_of(sankey.Goals, roster)
+    # Swap player IDs for the names shown on the nodes.
+    sankey['Assists']=name_of(sankey.Assists, roster)
+    sankey['Goals']=name_of(sankey.Goals, roster)
+    sankey = sankey.sort_values(['Assists','Goals'], ignore_index = True)
     
     # Convert Names (Categoricals) into integers
     sankey['Assists']=sankey['Assists'].astype('category')
@@ -281,9 +855,6 @@ def vis_GAflow(GAtotal,pitchtimes,roster, title='Visualising GA flow'):
     # Map/Assign integer to targets
     sankey['Target'] = sankey.Goals.map(gls)
     
-    genderdict = dict(zip(roster.Name, roster.Gender))
-    rmap = {'FF':'#45B39D', 'FM': '#7DCEA0', 'MF':'#85C1E9','MM':'#5499C7'}
-    sankey['GA pair']=sankey.Assists.map(genderdict)+sankey.Goals.map(genderdict)
     sankey['Linkcolor']=sankey['GA pair'].map(rmap)
     
     # Plot Sankey/Alluvial Diagram
@@ -314,8 +885,7 @@ def vis_GAflow(GAtotal,pitchtimes,roster, title='Visualising GA flow'):
             )
     
     fig = dict(data = [data_trace], layout=layout)
-    plot(fig)
-    return plot(fig, include_plotlyjs=False, output_type='div')
+    return render(fig)
 
 def vis_GArank(indstats, option='A'):
     """
@@ -358,7 +928,7 @@ def vis_GArank(indstats, option='A'):
                 title = 'Ranking Assists on Gender',
                 xaxis = dict(
                         title = 'Rank',
-                        autotick = False,),
+                        dtick = 1,),
                 )
         fig = go.Figure(data=[traceA], layout=layout)
         
@@ -367,15 +937,15 @@ def vis_GArank(indstats, option='A'):
                 title = 'Ranking Goals on Gender',
                 xaxis = dict(
                         title = 'Rank',
-                        autotick = False,),
+                        dtick = 1,),
                 )
         fig = go.Figure(data=[traceG], layout=layout)
     
-    plot(fig)
-    return plot(fig, include_plotlyjs=False, output_type='div')
+    return render(fig)
 
 #%% Functions and visualisations relating to individual performances. 
 
+@memoize
 def calc_indstats(overviews, pitchtimes, roster):
     """
     Function : Calculates individual performances and responsibilities.
@@ -388,52 +958,46 @@ def calc_indstats(overviews, pitchtimes, roster):
     Outputs:  
         Dataframe containing individual player statistics.
     """
-    indstats = roster.copy()
-    s = ['Points Played', 'Goals','Assists']
-    for column in s:
-        p=np.zeros(len(roster))
-        for game in pitchtimes: 
-            p1 = pitchtimes[game][column] 
-            p = p+p1
-        indstats[column]=p
-    
-    o1 = []
-    o0 = []
-    d1 = []
-    d0 = []
+    players = pd.Index(roster.Name)
+    totals = np.zeros((len(roster), len(_COUNTS)))
+    
     for game in overviews:
-        for i in range(len(overviews[game])):
-            r = pitchtimes[game][['Name',str(i+1)]].dropna()
-            r = r.reset_index(drop=True)
-            r.drop(str(i+1), inplace = True, axis = 1)
-            
-            if overviews[game]['Did we score'][i]==1:
-                if overviews[game]['Starting on O/D'][i]=='O':
-                    o1.append(r)                    
-                else:
-                    d1.append(r)
-            else:
-                if overviews[game]['Starting on O/D'][i]=='O':
-                    o0.append(r)
-                else:
-                    d0.append(r)
+        counts = _player_counts(overviews[game], pitchtimes[game])
+        rows = players.get_indexer(pitchtimes[game].Name)
+        np.add.at(totals, rows[rows >= 0], counts[rows >= 0])
+    
+    return _indstats_table(roster, totals)
+
+# Additive player counts that make up indstats, in the column order of _player_counts.
+_COUNTS = ['Points Played', 'Goals', 'Assists', 'O Converted', 'O Conceded', 'D Converted', 'D Conceded']
 
-    o1 = pd.concat(o1)
-    o0 = pd.concat(o0)
-    d1 = pd.concat(d1)
-    d0 = pd.concat(d0)
-   
-    a = o1.Name.value_counts().reindex(indstats.Name).fillna(0)
-    indstats['O Converted']=a.tolist()
+def _player_counts(overview, pitchtime):
+    """
+    Function : Counts the points played, goals, assists and O/D point outcomes of every 
+    player in a single game.
     
-    a = o0.Name.value_counts().reindex(indstats.Name).fillna(0)
-    indstats['O Conceded']=a.tolist()
+    Outputs: 
+        Array with a row per pitchtime row, and a column per entry of _COUNTS.
+    """
+    onpitch, goals, assists = calc_onpitch(overview, pitchtime)
     
-    a = d1.Name.value_counts().reindex(indstats.Name).fillna(0)
-    indstats['D Converted']=a.tolist()
+    # One column per point outcome, so a single matrix product counts every outcome for every player.
+    scored = (overview['Did we score']==1).values
+    onO = (overview['Starting on O/D']=='O').values
+    outcomes = np.column_stack([scored & onO, ~scored & onO, scored & ~onO, ~scored & ~onO]).astype(float)
     
-    a = d0.Name.value_counts().reindex(indstats.Name).fillna(0)
-    indstats['D Conceded']=a.tolist()
+    return np.column_stack([onpitch.sum(axis = 1), goals.sum(axis = 1), assists.sum(axis = 1), onpitch @ outcomes])
+
+def _indstats_table(roster, totals):
+    """
+    Function : Builds the indstats dataframe from the roster and its _COUNTS totals.
+    """
+    indstats = roster.copy()
+    for i, column in enumerate(_COUNTS):
+        indstats[column] = totals[:, i]
+    # The O/D outcomes are point counts, and have always been integers.
+    for column in ['O Converted', 'O Conceded', 'D Converted', 'D Conceded']:
+        indstats[column] = indstats[column].astype(np.int64)
     
     indstats['O Points'] = indstats['O Converted']+indstats['O Conceded']
     indstats['D Points'] = indstats['D Converted']+indstats['D Conceded']
@@ -443,12 +1007,151 @@ def calc_indstats(overviews, pitchtimes, roster):
     
     return indstats
 
+# Ratios plotted from indstats, as numerator and denominator columns.
+_RATIOS = {'Goal rate' : ('Goals', 'Points Played'),
+           'Assist rate' : ('Assists', 'Points Played'),
+           'Converted rate' : ('Converted, not GA', 'Points Played'),
+           'Conceded rate' : ('Conceded', 'Points Played'),
+           'O Conversion' : ('O Converted', 'O Points'),
+           'O Concession' : ('O Conceded', 'O Points'),
+           'D Conversion' : ('D Converted', 'D Points'),
+           'D Concession' : ('D Conceded', 'D Points')}
+
+def _ratios(totals):
+    """
+    Function : Calculates the _RATIOS from _COUNTS totals, along the last axis of totals.
+    """
+    c = dict(zip(_COUNTS, np.moveaxis(totals, -1, 0)))
+    c['O Points'] = c['O Converted']+c['O Conceded']
+    c['D Points'] = c['D Converted']+c['D Conceded']
+    c['Conceded'] = c['O Conceded']+c['D Conceded']
+    c['Converted, not GA'] = c['Points Played']-(c['Goals']+c['Assists']+c['Conceded'])
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        return np.stack([c[a]/c[b] for a, b in _RATIOS.values()], axis = -1)
+
+def _point_counts(overviews, pitchtimes, players):
+    """
+    Function : Splits the _COUNTS totals of every player into the points they come from.
+    
+    Outputs: 
+        Array with a row per point of every game, and a column per player and entry of _COUNTS, 
+        which sums over the rows to the totals calc_indstats uses.
+    """
+    counts = []
+    for game in overviews:
+        overview = overviews[game]
+        onpitch, goals, assists = calc_onpitch(overview, pitchtimes[game])
+        scored = (overview['Did we score']==1).values
+        onO = (overview['Starting on O/D']=='O').values
+        outcomes = [scored & onO, ~scored & onO, scored & ~onO, ~scored & ~onO]
+        
+        gamecounts = np.stack([onpitch, goals, assists]+[onpitch & outcome for outcome in outcomes], axis = -1)
+        rows = players.get_indexer(pitchtimes[game].Name)
+        pointcounts = np.zeros((len(overview), len(players), len(_COUNTS)), dtype = np.float32)
+        np.add.at(pointcounts, (slice(None), rows[rows >= 0]), gamecounts[rows >= 0].swapaxes(0, 1))
+        counts.append(pointcounts.reshape(len(overview), -1))
+    
+    return np.concatenate(counts)
+
+def _bootstrap(counts, seed, resamples):
+    """
+    Function : Resamples the points of counts with replacement, and totals each resample.
+    
+    Outputs: 
+        Array with a row per resample, and the column totals of counts for that resample.
+    """
+    n = len(counts)
+    rng = np.random.default_rng(seed)
+    # Every resample's point indices at once, turned into how often each point was drawn.
+    draws = rng.integers(0, n, size = (resamples, n)) + n*np.arange(resamples)[:, None]
+    weights = np.bincount(draws.ravel(), minlength = resamples*n).reshape(resamples, n).astype(np.float32)
+    return weights @ counts
+
+# The point counts of calc_indstats_ci, set once in each worker process by _share_counts.
+_shared_counts = None
+
+def _share_counts(counts):
+    global _shared_counts
+    _shared_counts = counts
+
+def _bootstrap_shared(seed, resamples):
+    return _bootstrap(_shared_counts, seed, resamples)
+
+# Largest number of resample x point draws made at once, which bounds the memory of each batch
+# to about 20 bytes a draw.
+_BOOTSTRAP_CELLS = 2**22
+
+@memoize
+def calc_indstats_ci(overviews, pitchtimes, roster, resamples=10000, level=0.95, seed=None, workers=1):
+    """
+    Function : Calculates individual player statistics, with bootstrap confidence intervals 
+    for every ratio plotted from them. Points are resampled with replacement, so players 
+    with few points get wide intervals.
+    
+    Inputs: 
+        overviews - dictionary containing dataframes of game events
+        pitchtimes - Dictionary of dataframes containing player stats
+        roster - Dataframe containing roster for the entire tournament
+        resamples - Number of bootstrap resamples. default = 10000
+        level - Confidence level of the intervals. default = 0.95
+        seed - Seed for the resamples, the intervals are the same for the same seed 
+        whatever the number of workers. default = None
+        workers - Number of worker processes, None for one per core. default = 1
+        
+    Outputs:  
+        Dataframe of indstats, with a column for each ratio in _RATIOS, 
+        and its interval in columns with ' low' and ' high' appended. 
+        It can be passed to the vis_player functions and vis_odlean in place of indstats, 
+        which then show the intervals as error bars.
+    """
+    players = pd.Index(roster.Name)
+    counts = _point_counts(overviews, pitchtimes, players)
+    totals = counts.sum(axis = 0, dtype = np.float64).reshape(len(players), len(_COUNTS))
+    
+    # Fixed size batches with their own seeds, so results do not depend on how they are shared out.
+    # Batches shrink as the season grows, so each stays within _BOOTSTRAP_CELLS weights.
+    batch = int(np.clip(_BOOTSTRAP_CELLS // max(len(counts), 1), 1, 1000))
+    sizes = [batch]*(resamples//batch) + ([resamples % batch] if resamples % batch else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if workers == 1:
+        batches = list(map(_bootstrap, [counts]*len(sizes), seeds, sizes))
+    else:
+        # counts is sent to each worker once when it starts, and each batch only sends its seed and size.
+        with ProcessPoolExecutor(max_workers = workers, initializer = _share_counts, initargs = (counts,)) as pool:
+            batches = list(pool.map(_bootstrap_shared, seeds, sizes))
+    boot = _ratios(np.concatenate(batches).reshape(resamples, len(players), len(_COUNTS)))
+    
+    tail = 100*(1-level)/2
+    low, high = np.nanpercentile(boot, [tail, 100-tail], axis = 0)
+    
+    indstats = _indstats_table(roster, totals)
+    order = players.get_indexer(indstats.Name)
+    estimates = _ratios(totals)
+    for i, ratio in enumerate(_RATIOS):
+        indstats[ratio] = estimates[order, i]
+        indstats[ratio+' low'] = low[order, i]
+        indstats[ratio+' high'] = high[order, i]
+    
+    return indstats
+
+def _error_bars(indstats, ratio):
+    """
+    Function : Plotly error bars for a ratio, if indstats carries its confidence interval.
+    """
+    if ratio+' low' not in indstats:
+        return None
+    return dict(type = 'data', symmetric = False, 
+                array = indstats[ratio+' high']-indstats[ratio], 
+                arrayminus = indstats[ratio]-indstats[ratio+' low'],
+                color = '#566573', thickness = 1)
+
 def vis_player_pointresults(indstats, title='Breakdown of points played by player'):
     """
     Function : Visualises outcomes of points played by each player.
     
     Inputs: 
         indstats - Dataframe containing individual player statistics.
+        From calc_indstats_ci, the confidence intervals are shown as error bars.
         
     Outputs:  
         Plotly stacked bar chart with percentages normalised to each individual.
@@ -456,6 +1159,7 @@ def vis_player_pointresults(indstats, title='Breakdown of points played by playe
     trace_1 = go.Bar(
         x = indstats.Name,
         y = indstats.Conceded/indstats['Points Played'],
+        error_y = _error_bars(indstats, 'Conceded rate'),
         marker =dict(color = '#45B39D'
                 ),
         name = 'Conceded'
@@ -464,6 +1168,7 @@ def vis_player_pointresults(indstats, title='Breakdown of points played by playe
     trace_2 = go.Bar(
             x = indstats.Name,
             y = indstats['Converted, not GA']/indstats['Points Played'],
+            error_y = _error_bars(indstats, 'Converted rate'),
             marker =dict(color = '#7DCEA0'
                 ),
             name = 'Converted'
@@ -472,6 +1177,7 @@ def vis_player_pointresults(indstats, title='Breakdown of points played by playe
     trace_3 = go.Bar(
             x = indstats.Name,
             y = indstats.Assists/indstats['Points Played'],
+            error_y = _error_bars(indstats, 'Assist rate'),
             marker =dict(color = '#5499C7'
                 ),
             name = 'Assists'
@@ -480,6 +1186,7 @@ def vis_player_pointresults(indstats, title='Breakdown of points played by playe
     trace_4 = go.Bar(
             x = indstats.Name,
             y = indstats.Goals/indstats['Points Played'],
+            error_y = _error_bars(indstats, 'Goal rate'),
             marker =dict(color = '#85C1E9'
                 ),
             name = 'Goals'
@@ -501,8 +1208,7 @@ def vis_player_pointresults(indstats, title='Breakdown of points played by playe
     )
     
     fig = go.Figure(data=data, layout=layout)
-    plot(fig)
-    return plot(fig, include_plotlyjs=False, output_type='div')
+    return render(fig)
 
 def vis_player_odpoints(indstats):
     """
@@ -549,8 +1255,7 @@ def vis_player_odpoints(indstats):
                     ])
     
     fig = go.Figure(data =[trace_1, trace_2], layout =layout)
-    plot(fig)
-    return plot(fig, include_plotlyjs=False, output_type='div')
+    return render(fig)
 
 def vis_player_efficiency(indstats,pointtype='O'):
     """
@@ -558,6 +1263,7 @@ def vis_player_efficiency(indstats,pointtype='O'):
     
     Inputs: 
         indstats - Dataframe containing individual player statistics.
+        From calc_indstats_ci, the confidence intervals are shown as error bars.
         pointtype - Determine to view offensive 'O' points or defensive 'D' points. default = 'O', 
         
     Outputs:  
@@ -566,6 +1272,7 @@ def vis_player_efficiency(indstats,pointtype='O'):
     trace_1 = go.Bar(
         x = indstats.Name,
         y = indstats['O Converted']/indstats['O Points'],
+        error_y = _error_bars(indstats, 'O Conversion'),
         marker = dict(
                 color = "#7DCEA0"
                 ),
@@ -574,6 +1281,7 @@ def vis_player_efficiency(indstats,pointtype='O'):
     trace_2 = go.Bar(
             x = indstats.Name,
             y = indstats['O Conceded']/indstats['O Points'],
+            error_y = _error_bars(indstats, 'O Concession'),
             marker = dict(
                     color = "#45B39D"
                     ),
@@ -582,6 +1290,7 @@ def vis_player_efficiency(indstats,pointtype='O'):
     trace_3 = go.Bar(
             x = indstats.Name,
             y = indstats['D Converted']/indstats['D Points'],
+            error_y = _error_bars(indstats, 'D Conversion'),
             marker = dict(
                     color = "#85C1E9"
                     ),
@@ -590,6 +1299,7 @@ def vis_player_efficiency(indstats,pointtype='O'):
     trace_4 = go.Bar(
             x = indstats.Name,
             y = indstats['D Conceded']/indstats['D Points'],
+            error_y = _error_bars(indstats, 'D Concession'),
             marker = dict(
                     color = "#5499C7"
                     ),
@@ -615,8 +1325,7 @@ def vis_player_efficiency(indstats,pointtype='O'):
             )
     
     fig = go.Figure(data=data, layout = layout)
-    plot(fig)
-    return plot(fig, include_plotlyjs=False, output_type='div')
+    return render(fig)
 
 #%% Pie Charts showing gender based information.
     
@@ -631,14 +1340,13 @@ def pie_gender_GApair(indstats,GAtotal, title = 'Assist/Goal Pair Type by Gender
     Outputs:  
         Plotly Pie Chart
     """
-    genderdict = dict(zip(indstats.Name, indstats.Gender))
     rmap = {'FF':'#45B39D', 'FM': '#7DCEA0', 'MF':'#5499C7','MM':'#85C1E9'}
-    a = pd.DataFrame()
-    a['Goals'] = GAtotal.Goals.map(genderdict)
-    a['Assists'] = GAtotal.Assists.map(genderdict)
+    a = pd.DataFrame(index = GAtotal.index)
+    a['Goals'] = gender_of(GAtotal.Goals, indstats)
+    a['Assists'] = gender_of(GAtotal.Assists, indstats)
     a['GA pair'] = a.Assists + a.Goals
     
-    b = a['GA pair'].value_counts()
+    b = a['GA pair'].value_counts().rename('GA pair')
     b.index.name = 'Pair Type'
     b=b.reset_index()
     
@@ -649,41 +1357,39 @@ def pie_gender_GApair(indstats,GAtotal, title = 'Assist/Goal Pair Type by Gender
     layout = go.Layout(title = title, legend = dict(orientation = 'h', x=0.5, y = -0.2))
     fig=go.Figure(data=[trace], layout=layout)
     
-    plot(fig)
-    return plot(fig, include_plotlyjs=False, output_type='div')
+    return render(fig)
     
 
+@memoize
 def calc_gender_r(GAtotal, overviews, indstats):
     """
     Function : Calculates gender ratio based stats 
     
     Inputs: 
-        GAtotal - two columned list containing all goal and assist pairs 
+        GAtotal - two columned list containing all goal and assist pairs, indexed by Game and Point
         overviews - dictionary containing dataframes of game events
         indstats - Dataframe containing individual player statistics.
         
     Outputs:  
         Dataframe consisting of Goals, Assists, and Conversion rates for points sorted by gender ratio.
     """
-    allgames = []
-    for game in overviews:
-        allgames.append(overviews[game][['Gender ratio','Did we score']])
-    allgames = pd.concat(allgames)
-    allgames.reset_index(drop=True)
-    
-    genderstats=pd.DataFrame(allgames['Gender ratio'].value_counts())
-    genderstats['Converted']=allgames[allgames['Did we score']==1]['Gender ratio'].value_counts()
-    genderstats['Conceded']=genderstats['Gender ratio'] - genderstats['Converted']
-    
-    genderdict = dict(zip(indstats.Name, indstats.Gender))
-    a = pd.DataFrame()
-    a['Goals'] = GAtotal.Goals.map(genderdict)
-    a['Assists'] = GAtotal.Assists.map(genderdict)
-    a['Gender ratio'] = allgames['Gender ratio'][allgames['Did we score']==1]
-    genderstats['F Goals']=a[a.Goals=='F']['Gender ratio'].value_counts()
-    genderstats['M Goals']=a[a.Goals=='M']['Gender ratio'].value_counts()
-    genderstats['F Assists']=a[a.Assists=='F']['Gender ratio'].value_counts()
-    genderstats['M Assists']=a[a.Assists=='M']['Gender ratio'].value_counts()
+    points = calc_points(overviews)
+    points['Gender ratio'] = points['Gender ratio'].astype(object)
+    points.index = pd.MultiIndex.from_arrays([np.array(list(overviews))[points.Game], points.Point],
+                                             names = ['Game','Point'])
+    
+    genderstats = pd.DataFrame({'Gender ratio' : points['Gender ratio'].value_counts()})
+    genderstats['Converted'] = points[points['Did we score']==1].groupby('Gender ratio').size()
+    genderstats['Conceded'] = genderstats['Gender ratio'] - genderstats['Converted']
+    
+    # Line up each goal with the gender ratio of the point it was scored in.
+    a = pd.DataFrame({'Goals' : gender_of(GAtotal.Goals, indstats), 
+                      'Assists' : gender_of(GAtotal.Assists, indstats)}, index = GAtotal.index)
+    a = a.join(points['Gender ratio'])
+    for column in ['Goals','Assists']:
+        counts = a.groupby(['Gender ratio', column]).size().unstack(column).reindex(columns = ['F','M'])
+        for gender in ['F','M']:
+            genderstats[gender+' '+column] = counts[gender]
     
     genderstats.index.name = 'Ratio'
     genderstats.reset_index(inplace = True)
@@ -709,8 +1415,7 @@ def pie_gender_con(genderstats, title = 'Gender: Point Conversion'):
     
     trace = go.Pie(labels = labels, values = values, marker = dict(colors=colors))
     fig = go.Figure(data=[trace], layout=layout)
-    plot(fig)
-    return plot(fig, include_plotlyjs=False, output_type='div')
+    return render(fig)
 
 def pie_gender_g(genderstats, title = 'Gender: Breakdown of Goals'):
     """
@@ -731,8 +1436,7 @@ def pie_gender_g(genderstats, title = 'Gender: Breakdown of Goals'):
     
     trace = go.Pie(labels = labels, values = values, marker = dict(colors=colors))
     fig = go.Figure(data=[trace], layout=layout)
-    plot(fig)
-    return plot(fig, include_plotlyjs=False, output_type='div')
+    return render(fig)
     
 def pie_gender_a(genderstats, title = 'Gender: Breakdown of Assists'):
     """
@@ -753,8 +1457,7 @@ def pie_gender_a(genderstats, title = 'Gender: Breakdown of Assists'):
     
     trace = go.Pie(labels = labels, values = values, marker = dict(colors=colors))
     fig = go.Figure(data=[trace], layout=layout)
-    plot(fig)
-    return plot(fig, include_plotlyjs=False, output_type='div')
+    return render(fig)
     
 def vis_disparity(genderstats, indstats, GAtotal):
     """
@@ -778,10 +1481,9 @@ def vis_disparity(genderstats, indstats, GAtotal):
     a['M Numbers'] = a['M Point %'].apply(lambda x: x*genderstats.Converted[genderstats.Ratio=='M'])
     a['Theoretical'] = a['F Numbers'] + a['M Numbers']
     
-    genderdict = dict(zip(indstats.Name, indstats.Gender))
-    b = pd.DataFrame()
-    b['Goals'] = GAtotal.Goals.map(genderdict)
-    b['Assists'] = GAtotal.Assists.map(genderdict)
+    b = pd.DataFrame(index = GAtotal.index)
+    b['Goals'] = gender_of(GAtotal.Goals, indstats)
+    b['Assists'] = gender_of(GAtotal.Assists, indstats)
     b['GA pair'] = b.Assists + b.Goals
     b = b['GA pair'].value_counts()
     b=b.reindex(a['AG Type'])
@@ -805,11 +1507,10 @@ def vis_disparity(genderstats, indstats, GAtotal):
                     title ='Difference')
                     )
     fig = go.Figure(data=[trace], layout = layout)
-    plot(fig)
     
     b = a[['Theoretical','Actual','Difference']].copy()
         
-    return b, plot(fig, include_plotlyjs= False, output_type='div')
+    return b, render(fig)
 
 
 #%%
@@ -820,6 +1521,7 @@ def vis_odlean(indstats):
     
     Inputs: 
         indstats - Dataframe containing individual player statistics.
+        From calc_indstats_ci, the confidence intervals are shown as error bars.
         
     Outputs:  
         Plotly Scatter Graph
@@ -834,10 +1536,12 @@ def vis_odlean(indstats):
     trace2 = go.Scatter(
                 x = a['D Score'],
                 y = a['O Score'],
+                error_x = _error_bars(indstats, 'D Conversion'),
+                error_y = _error_bars(indstats, 'O Conversion'),
                 mode = 'markers',
                 text = a.Name,
                 marker = dict(
-                        size = '10',
+                        size = 10,
                         color=a.Gender.map(fm2),
                 ))
             
@@ -859,10 +1563,11 @@ def vis_odlean(indstats):
             )
     
     fig=go.Figure(data=[trace2], layout = layout)
-    plot(fig)
+    return render(fig)
 
 #%% Functions and visualisations relating to possessions in points played by each individual
     
+@memoize
 def calc_player_turns(pitchtimes, overviews):
     """
     Function : Calculates individual performances based on number of possession on points played.
@@ -872,58 +1577,47 @@ def calc_player_turns(pitchtimes, overviews):
         pitchtimes - Dictionary of dataframes containing player stats
                 
     Outputs:  
-        B0, B1 - Dataframes containing number of possessions in each conceded or converted point played by each individual.
+        Dataframe with a row per player per point played, with columns Game, Point, Name, 
+        Number of posessions and Did we score.
     """
-    A = copy.deepcopy(pitchtimes)
-    B0 = copy.deepcopy(A)
-    B1 = copy.deepcopy(A)
-    for game in A:
-        A[game].replace(to_replace=['G','A'], value=1.0, inplace=True)
-        A[game].drop(['Points Played', 'Goals', 'Assists'], axis=1, inplace = True)
-        
-        B0[game]=A[game].copy()
-        B1[game]=A[game].copy()        
-        
-        for i in range(len(overviews[game])):
-            if A[game][str(i+1)].dtype == 'object':
-                A[game][str(i+1)]=A[game][str(i+1)].astype(float)
-        
-            if overviews[game]['Did we score'][i]==1:
-                B1[game][str(i+1)]=A[game][str(i+1)]*overviews[game]['Number of posessions'][i]
-                B0[game][str(i+1)]= np.nan
-            else:
-                B0[game][str(i+1)]=A[game][str(i+1)]*overviews[game]['Number of posessions'][i]
-                B1[game][str(i+1)]= np.nan
-   
-        B0[game] = B0[game].transpose()
-        B1[game] = B1[game].transpose()
-    
-        B1[game].columns=B1[game].loc['Name']
-        B1[game].drop(['Name', 'Gender'], inplace=True)
-   
-        B0[game].columns=B0[game].loc['Name']
-        B0[game].drop(['Name', 'Gender'], inplace=True)
-    B0 = pd.concat(B0)
-    B1 = pd.concat(B1)
-    
-    return B0, B1
-    
-def vis_player_odposviolin(B0, B1, roster):
+    roster = merge_roster(pitchtimes)
+    players = pd.Index(roster.Name)
+    
+    turns = []
+    for gameid, game in enumerate(overviews):
+        onpitch, _, _ = calc_onpitch(overviews[game], pitchtimes[game])
+        rows, cols = np.nonzero(onpitch)
+        turns.append(pd.DataFrame({
+                'Game' : np.full(len(cols), gameid, dtype = np.int32),
+                'Point' : (cols+1).astype(np.int32),
+                'Player' : players.get_indexer(pitchtimes[game].Name.values[rows]),
+                'Number of posessions' : overviews[game]['Number of posessions'].values[cols].astype(float),
+                'Did we score' : (overviews[game]['Did we score'].values[cols]==1).astype(np.int8),
+                }))
+    turns = pd.concat(turns, ignore_index = True)
+    turns.insert(2, 'Name', pd.Categorical.from_codes(turns.pop('Player'), categories = players))
+    
+    return turns
+    
+def vis_player_odposviolin(turns, roster):
     """
     Function : Visualises individual performances based on number of possessions per point.
     
     Inputs: 
-        B0 - Dataframe containing number of possessions per conceded point played by each individual
-        B1 - Dataframe containing number of possessions per converted point played by each individual
+        turns - Dataframe containing number of possessions in each point played by each individual
         roster - Dataframe containing roster for the entire tournament
         
     Outputs:  
         Plotly Violin Plot.
     """
+    empty = pd.Series(dtype = float)
+    converted = dict(list(turns[turns['Did we score']==1].groupby('Name', observed = True)['Number of posessions']))
+    conceded = dict(list(turns[turns['Did we score']!=1].groupby('Name', observed = True)['Number of posessions']))
+    
     data = []
     for name in roster.Name:
         trace1 = go.Violin(
-                y=B1[name].dropna(),
+                y=converted.get(name, empty),
                 name=str(name),
                 spanmode='hard',
                 scalemode='count',
@@ -942,7 +1636,7 @@ def vis_player_odposviolin(B0, B1, roster):
         data.append(trace1)
     
         trace2 = go.Violin(
-                y=B0[name].dropna(),
+                y=conceded.get(name, empty),
                 name=str(name),
                 spanmode='hard',
                 side = 'negative',
@@ -967,4 +1661,1144 @@ def vis_player_odposviolin(B0, B1, roster):
         )
     
     fig = go.Figure(data=data, layout=layout)
-    plot(fig)
\ No newline at end of file
+    return render(fig)
+#%% Incremental season statistics
+
+class SeasonStats:
+    """
+    Accumulates season statistics one game at a time, so indstats, GAtotal and genderstats 
+    stay up to date after every game without recomputing the whole season. 
+    Nearly everything in those tables is an additive count, so absorbing a game only 
+    costs time in proportion to that game, and a game can be retracted again, 
+    e.g. to replace it with a corrected version.
+    
+    Usage:
+        season = SeasonStats()
+        for game in overviews:
+            season.add_game(game, overviews[game], pitchtimes[game])
+        indstats = season.indstats()
+    
+    The tables are the same as calc_indstats, totalgoalassist_list and calc_gender_r 
+    give for the games added so far, in the order they were added.
+    """
+    _GENDER = ['Gender ratio', 'Converted', 'F Goals', 'M Goals', 'F Assists', 'M Assists']
+    
+    def __init__(self):
+        self.games = {}
+        self.players = pd.DataFrame(columns = _COUNTS, dtype = float)
+        self.gender = self._empty_gender()
+        self._roster = None
+    
+    def add_game(self, game, overview, pitchtime):
+        """
+        Function : Adds a game to the season totals. A game that was already added 
+        is replaced, keeping its place in the season.
+        
+        Inputs: 
+            game - String, name of opponent.
+            overview - Dataframe of game events for the game
+            pitchtime - Dataframe of player stats for the game
+        """
+        replacing = game in self.games
+        if replacing:
+            self._retract(game)
+        
+        names = pitchtime[['Name','Gender']]
+        players = pd.DataFrame(_player_counts(overview, pitchtime), index = names.Name.values, columns = _COUNTS)
+        players = players.groupby(level = 0, sort = False).sum()
+        
+        # Pairs are kept as IDs in the game's own roster, as the season roster changes when games are removed.
+        roster = merge_roster({game: pitchtime})
+        GA = _GA_ids(calc_GApairs({game: overview}, {game: pitchtime}, roster), roster.ID.values, [game])
+        
+        # Line up each goal with the gender ratio of the point it was scored in.
+        ratio = overview['Gender ratio'].values
+        gender = _ratio_counts(ratio, (overview['Did we score']==1).values)
+        _pair_counts(gender, ratio[GA.index.get_level_values('Point')-1], GA, roster)
+        
+        self.games[game] = {'roster' : names, 'players' : players, 'GA' : GA, 'GA names' : roster.Name.values, 
+                            'gender' : gender}
+        self.players = self.players.add(players, fill_value = 0)
+        # Ratios are kept in order of first appearance, as calc_gender_r and calc_stream have them, 
+        # so ties in the point count come out in the same order. A replaced game keeps its 
+        # place, so its ratios are gathered again in game order.
+        if replacing:
+            self._gather_gender()
+        else:
+            self.gender = pd.concat([self.gender, gender]).groupby(level = 0, sort = False).sum()
+        
+        # New games join the end of the roster, any other change rebuilds it on demand.
+        if self._roster is not None and not replacing:
+            self._roster = merge_roster({0: self._roster, 1: names})
+        else:
+            self._roster = None
+    
+    def remove_game(self, game):
+        """
+        Function : Retracts a game from the season totals.
+        
+        Inputs: 
+            game - String, name of opponent.
+        """
+        self._retract(game)
+        del self.games[game]
+        self._gather_gender()
+        self._roster = None
+    
+    def _retract(self, game):
+        self.players = self.players.sub(self.games[game]['players'], fill_value = 0)
+    
+    def _gather_gender(self):
+        # Only a few rows per game, so adding them up again in game order is cheap.
+        self.gender = pd.concat([self._empty_gender()]+[self.games[game]['gender'] for game in self.games])
+        self.gender = self.gender.groupby(level = 0, sort = False).sum()
+    
+    def _empty_gender(self):
+        return pd.DataFrame(columns = self._GENDER, dtype = np.int64)
+    
+    def roster(self):
+        """
+        Function : Returns the roster of every game added so far, as merge_roster does.
+        """
+        if self._roster is None:
+            self._roster = merge_roster({game: self.games[game]['roster'] for game in self.games})
+        return self._roster
+    
+    def indstats(self):
+        """
+        Function : Returns individual player statistics, as calc_indstats does.
+        """
+        roster = self.roster()
+        totals = self.players.reindex(roster.Name, fill_value = 0).values
+        return _indstats_table(roster, totals)
+    
+    def GAtotal(self):
+        """
+        Function : Returns the Goal and Assist pairs, as totalgoalassist_list does.
+        """
+        roster = self.roster()
+        players = pd.Index(roster.Name)
+        GAs = []
+        for game in self.games:
+            GA = self.games[game]['GA']
+            ids = roster.ID.values[players.get_indexer(self.games[game]['GA names'])]
+            GAs.append(GA.assign(Goals = ids[GA.Goals.values], Assists = ids[GA.Assists.values]))
+        return pd.concat(GAs)
+    
+    def genderstats(self):
+        """
+        Function : Returns gender ratio based statistics, as calc_gender_r does.
+        """
+        # Ratios that were only ever in retracted games have no points left.
+        return _genderstats_table(self.gender[self.gender['Gender ratio'] > 0])
+
+def _ratio_counts(ratio, scored):
+    """
+    Function : Counts the points played and converted at each gender ratio, in order of first appearance.
+    """
+    return pd.DataFrame({'Gender ratio' : 1, 'Converted' : np.asarray(scored).astype(int)},
+                        index = ratio).groupby(level = 0, sort = False).sum()
+
+def _pair_counts(gender, ratio, GA, roster):
+    """
+    Function : Adds the goals and assists by each gender at each gender ratio to the counts 
+    of _ratio_counts, given the gender ratio of the point each GA pair was scored in.
+    """
+    pairs = pd.DataFrame({'Ratio' : ratio,
+                          'Goals' : gender_of(GA.Goals, roster).values, 
+                          'Assists' : gender_of(GA.Assists, roster).values})
+    for column in ['Goals','Assists']:
+        counts = pairs.groupby(['Ratio', column]).size()
+        for g in ['F','M']:
+            gender[g+' '+column] = counts.xs(g, level = column).reindex(gender.index).fillna(0) \
+                    if g in counts.index.get_level_values(column) else 0
+
+def _genderstats_table(gender):
+    """
+    Function : Builds the genderstats dataframe of calc_gender_r from _ratio_counts and _pair_counts totals.
+    """
+    gender = gender.sort_values('Gender ratio', ascending = False, kind = 'stable')
+    
+    # Counts that calc_gender_r finds no points for are left empty, as value_counts does.
+    genderstats = pd.DataFrame({'Gender ratio' : gender['Gender ratio'].astype(int)})
+    genderstats['Converted'] = gender['Converted'].replace(0, np.nan)
+    genderstats['Conceded'] = genderstats['Gender ratio'] - genderstats['Converted']
+    for column in ['F Goals','M Goals','F Assists','M Assists']:
+        genderstats[column] = gender[column].replace(0, np.nan)
+    # Counts with no empty entries are integers, as calc_gender_r gives them. It counts the F and M 
+    # goals (and assists) in one table, so they are only integers if neither has an empty entry.
+    for columns in [['Converted'], ['Conceded'], ['F Goals','M Goals'], ['F Assists','M Assists']]:
+        full = genderstats[columns].notna().all().all()
+        genderstats[columns] = genderstats[columns].astype(np.int64 if full else float)
+    
+    genderstats.index.name = 'Ratio'
+    genderstats.reset_index(inplace = True)
+    
+    return genderstats
+
+#%% Streaming aggregation
+
+def iter_games(filenames, cachedir=None):
+    """
+    Function : Reads games one at a time, so a league or many seasons can be analysed 
+    without holding every game in memory. Games are read as readdata reads them.
+    
+    Inputs: 
+        filenames - String or list of strings, tournament csv files as for readdata.
+        cachedir - As for readdata. default = None, no caching.
+    
+    Outputs: 
+        Generator of (game, overview, pitchtime) tuples. A game whose opponent was already 
+        played in an earlier file is named 'Opponent (tournament)', after the file it is in.
+    """
+    if isinstance(filenames, str):
+        filenames = [filenames]
+    
+    seen = set()
+    for filename in filenames:
+        tournament = _read_tournament(filename)
+        name = os.path.splitext(os.path.basename(filename))[0]
+        for i, opponent in enumerate(tournament['Opponent']):
+            game = opponent if opponent not in seen else opponent+' ('+name+')'
+            if game in seen:
+                raise ValueError('Game '+str(game)+' appears more than once')
+            seen.add(game)
+            overview, pitchtime = _read_game(tournament['Overview'][i], tournament['Pitchtime'][i], cachedir)
+            yield game, overview, pitchtime
+
+def calc_stream(games, chunksize=50):
+    """
+    Function : Calculates indstats, GAtotal and genderstats from a stream of games, folding 
+    each chunk of games into running totals, so at most one chunk of games is in memory at once.
+    
+    Inputs: 
+        games - Iterable of (game, overview, pitchtime) tuples, e.g. from iter_games or 
+        archive.Archive.iter_games. Game names must be unique.
+        chunksize - Number of games held in memory and counted together. default = 50
+    
+    Outputs: 
+        roster, indstats, GAtotal, genderstats
+        
+        The same tables as merge_roster, calc_indstats, totalgoalassist_list and calc_gender_r 
+        give for the games read into memory.
+    """
+    games = iter(games)
+    roster = None
+    totals = np.zeros((0, len(_COUNTS)))
+    GAs, pairratios, gender = [], [], []
+    seen = set()
+    
+    while True:
+        chunk = list(itertools.islice(games, chunksize))
+        if not chunk:
+            break
+        overviews = {game : overview for game, overview, pitchtime in chunk}
+        pitchtimes = {game : pitchtime for game, overview, pitchtime in chunk}
+        if len(overviews) < len(chunk) or seen.intersection(overviews):
+            raise ValueError('Game names must be unique')
+        seen.update(overviews)
+        del chunk
+        
+        # New players join the end of the roster, as merge_roster orders them.
+        chunkroster = merge_roster(pitchtimes)
+        roster = chunkroster if roster is None else merge_roster({0 : roster, 1 : chunkroster})
+        totals = np.vstack([totals, np.zeros((len(roster)-len(totals), len(_COUNTS)))])
+        players = pd.Index(roster.Name)
+        for game in overviews:
+            counts = _player_counts(overviews[game], pitchtimes[game])
+            rows = players.get_indexer(pitchtimes[game].Name)
+            np.add.at(totals, rows[rows >= 0], counts[rows >= 0])
+        
+        # Keep the gender ratio of the point each GA pair was scored in, for genderstats.
+        GA = calc_GApairs(overviews, pitchtimes, chunkroster)
+        GA = GA[(GA.Goals >= 0) & (GA.Assists >= 0)]
+        GAs.append(_GA_ids(GA, roster.ID.values[players.get_indexer(chunkroster.Name)], list(overviews)))
+        ratio = np.concatenate([overviews[game]['Gender ratio'].values.astype(object) for game in overviews])
+        starts = np.cumsum([0]+[len(overviews[game]) for game in overviews])
+        pairratios.append(ratio[starts[GA.Game.values] + GA.Point.values-1])
+        scored = np.concatenate([(overviews[game]['Did we score']==1).values for game in overviews])
+        gender.append(_ratio_counts(ratio, scored))
+    
+    if roster is None:
+        raise ValueError('No games to aggregate')
+    
+    indstats = _indstats_table(roster, totals)
+    GAtotal = pd.concat(GAs)
+    gender = pd.concat(gender).groupby(level = 0, sort = False).sum()
+    _pair_counts(gender, np.concatenate(pairratios), GAtotal, roster)
+    
+    return roster, indstats, GAtotal, _genderstats_table(gender)
+
+#%% Packed lineups
+
+class Lineups:
+    """
+    The line on the pitch in every point, stored as a bitset over player IDs 
+    (positions in roster), with a row per point of calc_points. 
+    Lineup questions are answered with vectorised bit operations over every point at once, 
+    instead of scanning the point columns of every pitchtimes dataframe.
+    
+    Usage:
+        lineups = calc_lineups(overviews, pitchtimes, roster)
+        lineups.together()                                  # points each pair played together
+        lineups.conversion(['Ange', 'Smatt'], od = 'D')     # D points converted with both on
+        lineups.by_player(lineups.select(ratio = 'F'))      # conversion with each player on, F points
+    
+    Players can be given by name or by ID, on their own or as a list.
+    """
+    # Points unpacked at a time by by_player and together, so they never hold the whole 
+    # points x players array, only a block of it. Blocks this small also stay in cache, 
+    # which makes them faster than unpacking every point at once.
+    BLOCK = 2**12
+    
+    def __init__(self, points, bits, roster):
+        """
+        Inputs:
+            points - Dataframe of points, as calc_points gives.
+            bits - uint8 array with a row per point, the on-pitch players packed with np.packbits.
+            roster - Dataframe containing player names and gender.
+        """
+        self.points = points
+        self.bits = bits
+        self.roster = roster
+        self.players = pd.Index(roster.Name)
+        self.scored = points['Did we score'].values == 1
+    
+    def ids(self, players):
+        """
+        Function : Converts player names or IDs to an array of IDs.
+        """
+        players = np.atleast_1d(np.asarray(players, dtype = object))
+        ids = np.array([p if isinstance(p, (int, np.integer)) else self.players.get_loc(p) for p in players], dtype = np.intp)
+        return ids
+    
+    def _key(self, players):
+        """
+        Function : Packs a set of players into a bitset, in the layout of self.bits.
+        """
+        key = np.zeros(len(self.players), dtype = bool)
+        key[self.ids(players)] = True
+        return np.packbits(key)
+    
+    def onpitch(self, mask=None):
+        """
+        Function : Unpacks the bitsets into a points x players boolean array, 
+        for the points selected by mask.
+        """
+        bits = self.bits if mask is None else self.bits[mask]
+        return np.unpackbits(bits, axis = 1, count = len(self.players)).astype(bool)
+    
+    def _blocks(self, mask=None):
+        """
+        Function : Unpacks the points selected by mask a block at a time, 
+        yielding each block's on-pitch array and whether its points were scored.
+        """
+        bits = self.bits if mask is None else self.bits[mask]
+        scored = self.scored if mask is None else self.scored[mask]
+        for start in range(0, len(bits), self.BLOCK):
+            onpitch = np.unpackbits(bits[start:start+self.BLOCK], axis = 1, count = len(self.players))
+            yield onpitch, scored[start:start+self.BLOCK]
+    
+    def select(self, ratio=None, od=None, calledby=None, games=None, mask=None):
+        """
+        Function : Selects points by their situation.
+        
+        Inputs: 
+            ratio - Gender ratio, 'F' or 'M'. default = None, any.
+            od - 'O' or 'D' for the line starting on offence or defence. default = None, any.
+            calledby - Team that called the gender ratio. default = None, any.
+            games - Game IDs (positions in overviews) to include. default = None, all.
+            mask - Boolean array of points to narrow down further. default = None, all.
+        
+        Outputs: 
+            Boolean array with an entry per point.
+        """
+        points = self.points
+        selected = np.ones(len(points), dtype = bool) if mask is None else mask.copy()
+        for column, value in [('Gender ratio', ratio), ('Starting on O/D', od), ('Gender Called by', calledby)]:
+            if value is not None:
+                selected &= (points[column] == value).values
+        if games is not None:
+            selected &= np.isin(points['Game'].values, games)
+        return selected
+    
+    def with_players(self, players, without=None, mask=None, **situation):
+        """
+        Function : Selects points where every one of the given players was on the pitch.
+        
+        Inputs: 
+            players - Player names or IDs that must all be on.
+            without - Player names or IDs that must all be off. default = None
+            mask, situation - Narrow down the points as select does.
+        
+        Outputs: 
+            Boolean array with an entry per point.
+        """
+        key = self._key(players)
+        selected = ((self.bits & key) == key).all(axis = 1)
+        if without is not None:
+            selected &= ~(self.bits & self._key(without)).any(axis = 1)
+        if mask is not None or situation:
+            selected &= self.select(mask = mask, **situation)
+        return selected
+    
+    def conversion(self, players, without=None, mask=None, **situation):
+        """
+        Function : Conversion rate of the points played with a set of players on the pitch.
+        
+        Inputs: 
+            players, without, mask, situation - Select the points as with_players does.
+        
+        Outputs: 
+            Series with the number of Points, the number Converted, and the conversion Rate.
+        """
+        selected = self.with_players(players, without, mask, **situation)
+        points = int(selected.sum())
+        converted = int(self.scored[selected].sum())
+        return pd.Series({'Points' : points, 'Converted' : converted, 
+                          'Rate' : converted/points if points else np.nan})
+    
+    def by_player(self, mask=None):
+        """
+        Function : Conversion rate with each player on the pitch, over the points selected by mask.
+        
+        Outputs: 
+            Dataframe indexed by player name with columns Points, Converted and Rate.
+        """
+        points = np.zeros(len(self.players), dtype = np.int64)
+        converted = np.zeros(len(self.players), dtype = np.int64)
+        for onpitch, scored in self._blocks(mask):
+            onpitch = onpitch.astype(np.int32)
+            points += onpitch.sum(axis = 0)
+            converted += scored.astype(np.int32) @ onpitch
+        table = pd.DataFrame({'Points' : points, 'Converted' : converted}, index = self.players)
+        table['Rate'] = table['Converted']/table['Points'].replace(0, np.nan)
+        return table
+    
+    def together(self, mask=None, converted=False):
+        """
+        Function : Counts the points every pair of players played together.
+        
+        Inputs: 
+            mask - Boolean array of points to count. default = None, all.
+            converted - If True, only count points that were converted. default = False
+        
+        Outputs: 
+            Square dataframe of counts indexed by player name on both axes. 
+            The diagonal is the number of points each player played.
+        """
+        if converted:
+            mask = self.scored if mask is None else mask & self.scored
+        counts = np.zeros((len(self.players), len(self.players)), dtype = np.int64)
+        for onpitch, scored in self._blocks(mask):
+            # float32 matrix products run on BLAS, which integer ones don't. 
+            # A block's counts are at most BLOCK, well within what float32 holds exactly.
+            onpitch = onpitch.astype(np.float32)
+            counts += (onpitch.T @ onpitch).astype(np.int64)
+        return pd.DataFrame(counts, index = self.players, columns = self.players)
+
+@memoize
+def calc_lineups(overviews, pitchtimes, roster=None):
+    """
+    Function : Packs the line on the pitch in every point of every game into a Lineups bitset table.
+    
+    Inputs: 
+        overviews - dictionary containing dataframes of game events
+        pitchtimes - Dictionary of dataframes containing player stats
+        roster - Dataframe containing roster for the entire tournament. 
+        default = None, merged from pitchtimes.
+    
+    Outputs: 
+        Lineups, with points in the order of calc_points and players in the order of roster.
+    """
+    if roster is None:
+        roster = merge_roster(pitchtimes)
+    players = pd.Index(roster.Name)
+    points = calc_points(overviews)
+    
+    onpitch = np.zeros((len(points), len(players)), dtype = bool)
+    start = 0
+    for game in overviews:
+        gameonpitch = calc_onpitch(overviews[game], pitchtimes[game])[0]
+        rows = players.get_indexer(pitchtimes[game].Name)
+        keep = rows >= 0
+        onpitch[start:start+gameonpitch.shape[1], rows[keep]] |= gameonpitch[keep].T
+        start += gameonpitch.shape[1]
+    
+    return Lineups(points, np.packbits(onpitch, axis = 1), roster)
+
+#%% Player chemistry graph
+
+@memoize
+def calc_chemistry(GAtotal, lineups):
+    """
+    Function : Tabulates the chemistry between every pair of players who played together: 
+    how many points they played together, how many of those were converted, 
+    and how many goals one assisted for the other. 
+    Pair counts come from sparse matrix products over all points at once.
+    
+    Inputs: 
+        GAtotal - Dataframe of Goal Assist pairs, as totalgoalassist_list gives.
+        lineups - Lineups, as calc_lineups gives.
+    
+    Outputs: 
+        Dataframe with a row per pair of players, with columns Player 1, Player 2, Together, 
+        Converted, Rate, 1 to 2 and 2 to 1 (goals assisted by one for the other) and GA (their sum).
+    """
+    n = len(lineups.players)
+    onpitch = sparse.csr_matrix(lineups.onpitch(), dtype = np.int32)
+    scored = onpitch[lineups.scored]
+    together = (onpitch.T @ onpitch).tocsr()
+    converted = (scored.T @ scored).tocsr()
+    
+    ids = pd.Index(lineups.roster.ID)
+    assists = ids.get_indexer(GAtotal['Assists'])
+    goals = ids.get_indexer(GAtotal['Goals'])
+    known = (assists >= 0) & (goals >= 0) & (assists != goals)
+    GA = sparse.csr_matrix((np.ones(known.sum(), dtype = np.int32), (assists[known], goals[known])), shape = (n, n))
+    
+    # Every pair once, from the upper triangle of the co-occurrence counts.
+    pairs = sparse.triu(together, k = 1).tocoo()
+    i, j = pairs.row, pairs.col
+    chemistry = pd.DataFrame({
+            'Player 1' : lineups.players[i],
+            'Player 2' : lineups.players[j],
+            'Together' : pairs.data,
+            'Converted' : np.asarray(converted[i, j]).ravel(),
+            '1 to 2' : np.asarray(GA[i, j]).ravel(),
+            '2 to 1' : np.asarray(GA[j, i]).ravel(),
+            })
+    chemistry['Rate'] = chemistry['Converted']/chemistry['Together']
+    chemistry['GA'] = chemistry['1 to 2']+chemistry['2 to 1']
+    chemistry = chemistry[['Player 1','Player 2','Together','Converted','Rate','1 to 2','2 to 1','GA']]
+    
+    return chemistry
+
+def chemistry_graph(chemistry, weight='GA', minimum=1):
+    """
+    Function : Builds a weighted networkx graph of player chemistry.
+    
+    Inputs: 
+        chemistry - Dataframe of player pairs, as calc_chemistry gives.
+        weight - Column to weigh edges by, e.g. 'GA', 'Together' or 'Converted'. default = 'GA'
+        minimum - Leave out pairs with a weight below this. default = 1
+    
+    Outputs: 
+        networkx Graph with a node per player and an edge per pair, carrying every 
+        chemistry column as an attribute, and the chosen weight as 'weight'.
+    """
+    edges = chemistry[chemistry[weight] >= minimum].copy()
+    edges['weight'] = edges[weight]
+    graph = nx.from_pandas_edgelist(edges, 'Player 1', 'Player 2', edge_attr = True)
+    return graph
+
+def calc_connectors(graph):
+    """
+    Function : Ranks players by how central they are to the team's chemistry.
+    
+    Inputs: 
+        graph - networkx Graph, as chemistry_graph gives.
+    
+    Outputs: 
+        Dataframe indexed by player name, with columns 
+            Strength - total weight of the player's edges
+            Eigenvector - weighted eigenvector centrality, high for players connected to well connected players
+            Betweenness - weighted betweenness centrality, high for players who link otherwise separate parts of the team
+            Community - number of the player's community, from greedy modularity maximisation, largest first
+        sorted with the best connectors first.
+    """
+    if graph.number_of_edges() == 0:
+        return pd.DataFrame(columns = ['Strength', 'Eigenvector', 'Betweenness', 'Community'])
+    
+    # Betweenness follows shortest paths, so strong pairs need to be close together.
+    for _, _, data in graph.edges(data = True):
+        data['distance'] = 1/data['weight']
+    
+    # Eigenvector centrality is only defined on a connected graph, so each connected part
+    # of the team is scored on its own, scaled by its share of the players. Teams are small,
+    # so a dense eigendecomposition also copes with parts of only two players.
+    eigenvector = {}
+    for component in nx.connected_components(graph):
+        players = list(component)
+        leading = np.abs(np.linalg.eigh(nx.to_numpy_array(graph, nodelist = players, weight = 'weight'))[1][:, -1])
+        share = np.sqrt(len(players)/len(graph))
+        eigenvector.update(zip(players, leading/np.linalg.norm(leading)*share))
+
+    connectors = pd.DataFrame({
+            'Strength' : dict(graph.degree(weight = 'weight')),
+            'Eigenvector' : eigenvector,
+            'Betweenness' : nx.betweenness_centrality(graph, weight = 'distance'),
+            })
+    communities = nx.community.greedy_modularity_communities(graph, weight = 'weight')
+    for i, community in enumerate(communities):
+        connectors.loc[list(community), 'Community'] = i
+    connectors['Community'] = connectors['Community'].astype(int)
+    
+    connectors.sort_values(['Betweenness', 'Strength'], ascending = False, inplace = True)
+    return connectors
+
+#%% Adjusted plus-minus
+
+@memoize
+def calc_apm(lineups, alpha=20):
+    """
+    Function : Estimates each player's impact on point conversion, adjusted for who they 
+    played beside and for the situation of the point. A ridge regression of whether each 
+    point was converted on who was on the pitch, with O/D start and gender ratio as covariates, 
+    so a player is not credited for their teammates or for mostly playing O points. 
+    Solved with sparse linear algebra, so it scales to archives of many seasons.
+    
+    Inputs: 
+        lineups - Lineups, as calc_lineups gives.
+        alpha - Strength of the ridge penalty, in points. Players with few points played 
+        are pulled towards 0 more strongly. default = 20
+    
+    Outputs: 
+        Dataframe with the roster, Points Played, Conversion (share of points played that 
+        were converted) and APM (change in the chance of converting a point when the player 
+        is on, compared to an average player), sorted by Points Played as indstats is.
+    """
+    points = lineups.points
+    onpitch = sparse.csr_matrix(lineups.onpitch(), dtype = np.float64)
+    scored = lineups.scored.astype(np.float64)
+    
+    # Situation covariates, with an intercept, are fitted alongside the players but not penalised.
+    situation = pd.get_dummies(points[['Starting on O/D', 'Gender ratio']].astype(str), drop_first = True, dtype = float)
+    situation = situation.loc[:, situation.sum() > 0]
+    situation.insert(0, 'Intercept', 1.0)
+    X = sparse.hstack([onpitch, sparse.csr_matrix(situation.values)], format = 'csr')
+    
+    penalty = np.r_[np.full(onpitch.shape[1], float(alpha)), np.zeros(situation.shape[1])]
+    A = (X.T @ X + sparse.diags(penalty)).tocsc()
+    coefficients = splinalg.spsolve(A, X.T @ scored)
+    
+    played = np.asarray(onpitch.sum(axis = 0)).ravel()
+    converted = onpitch.T @ scored
+    
+    apm = lineups.roster.copy()
+    apm['Points Played'] = played
+    apm['Conversion'] = converted/np.where(played > 0, played, np.nan)
+    apm['APM'] = coefficients[:onpitch.shape[1]]
+    apm.sort_values('Points Played', ascending = False, inplace = True)
+    
+    return apm
+
+#%% Game simulation
+
+_SITUATION = ['Starting on O/D', 'Gender ratio', 'Gender Called by']
+
+@memoize
+def calc_situation_rates(overviews, prior=5):
+    """
+    Function : Calculates the conversion rate of points in every situation: 
+    starting on O or D, gender ratio, and which team called it.
+    
+    Inputs: 
+        overviews - dictionary containing dataframes of game events
+        prior - Rates are shrunk towards the O or D conversion rate, as if each situation had 
+        this many extra points played at that rate, so rarely seen situations are not 
+        taken at face value. default = 5
+    
+    Outputs: 
+        Dataframe indexed by Starting on O/D, Gender ratio and Gender Called by, 
+        in the order O/D, F/M, U/T, with columns Points, Converted and Rate.
+    """
+    points = calc_points(overviews)
+    index = pd.MultiIndex.from_product([['O','D'], ['F','M'], ['U','T']], names = _SITUATION)
+    counts = points.groupby(_SITUATION, observed = True)['Did we score'].agg(['size', 'sum'])
+    counts = counts.reindex(index, fill_value = 0)
+    
+    odrate = points.groupby('Starting on O/D', observed = True)['Did we score'].mean()
+    odrate = odrate.reindex(['O','D']).fillna(points['Did we score'].mean())
+    
+    rates = pd.DataFrame({'Points' : counts['size'], 'Converted' : counts['sum']}, index = index)
+    base = odrate.reindex(index.get_level_values('Starting on O/D')).values
+    rates['Rate'] = (rates['Converted'] + prior*base)/(rates['Points'] + prior)
+    
+    return rates
+
+def simulate_games(rates, games=10000, target=15, ostart=0.5, fratio=None, ucalls=None, seed=None):
+    """
+    Function : Simulates whole games point by point, all games at once. 
+    Each point is converted with the rate of its situation, and the team that scores 
+    pulls, so after scoring the next point starts on D, and after conceding on O.
+    
+    Inputs: 
+        rates - Dataframe of situation conversion rates, as calc_situation_rates gives.
+        games - Number of games to simulate. default = 10000
+        target - Score that wins the game. default = 15
+        ostart - Probability of starting the game on O. default = 0.5
+        fratio - Probability that a point is played with an F gender ratio. 
+        default = None, the share of F points in rates.
+        ucalls - Probability that the gender ratio is called by us. 
+        default = None, the share of points in rates called by us.
+        seed - Seed for the random number generator. default = None
+    
+    Outputs: 
+        Dataframe with a row per simulated game, with the final Deep Space and Opponent scores, 
+        the number of Points played and whether the game was Won.
+    """
+    rng = np.random.default_rng(seed)
+    table = rates['Rate'].values.reshape(2, 2, 2)
+    played = rates['Points'].groupby(level = ['Gender ratio', 'Gender Called by']).sum()
+    if fratio is None:
+        fratio = played['F'].sum()/max(played.sum(), 1)
+    if ucalls is None:
+        ucalls = played.xs('U', level = 'Gender Called by').sum()/max(played.sum(), 1)
+    
+    us = np.zeros(games, dtype = np.int32)
+    them = np.zeros(games, dtype = np.int32)
+    points = np.zeros(games, dtype = np.int32)
+    onO = rng.random(games) < ostart
+    playing = np.ones(games, dtype = bool)
+    
+    # Someone has reached the target by the time 2*target-1 points are played.
+    for _ in range(2*target-1):
+        ratio = (rng.random(games) >= fratio).astype(np.intp)
+        caller = (rng.random(games) >= ucalls).astype(np.intp)
+        scored = rng.random(games) < table[(~onO).astype(np.intp), ratio, caller]
+        us += scored & playing
+        them += ~scored & playing
+        points += playing
+        onO = ~scored
+        playing &= (us < target) & (them < target)
+        if not playing.any():
+            break
+    
+    return pd.DataFrame({'Deep Space' : us, 'Opponent' : them, 'Points' : points, 'Won' : us == target})
+
+def calc_simulation_summary(sims):
+    """
+    Function : Summarises simulated games.
+    
+    Inputs: 
+        sims - Dataframe of simulated games, as simulate_games gives.
+    
+    Outputs: 
+        Series with the number of Games, Win probability, mean scores and mean margin.
+    """
+    return pd.Series({'Games' : len(sims),
+                      'Win probability' : sims['Won'].mean(),
+                      'Deep Space' : sims['Deep Space'].mean(),
+                      'Opponent' : sims['Opponent'].mean(),
+                      'Margin' : (sims['Deep Space']-sims['Opponent']).mean()})
+
+def calc_score_distribution(sims):
+    """
+    Function : Share of simulated games ending in every final score.
+    
+    Outputs: 
+        Dataframe with a row per Deep Space score and a column per Opponent score.
+    """
+    return pd.crosstab(sims['Deep Space'], sims['Opponent'], normalize = True)
+
+def sweep_strategies(rates, ostart=(0.5,), fratio=(None,), ucalls=(None,), games=10000, target=15, seed=None):
+    """
+    Function : Simulates games for every combination of strategy settings, 
+    to compare e.g. starting on O more often, or playing more F points.
+    
+    Inputs: 
+        rates - Dataframe of situation conversion rates, as calc_situation_rates gives.
+        ostart, fratio, ucalls - Values to try for each setting of simulate_games.
+        games, target - As for simulate_games.
+        seed - Seed for the random number generator, every combination uses the same seed. default = None
+    
+    Outputs: 
+        Dataframe with a row per combination of settings and the calc_simulation_summary columns.
+    """
+    rows = []
+    for o in ostart:
+        for f in fratio:
+            for u in ucalls:
+                sims = simulate_games(rates, games, target, o, f, u, seed)
+                rows.append(pd.concat([pd.Series({'ostart' : o, 'fratio' : f, 'ucalls' : u}), calc_simulation_summary(sims)]))
+    
+    return pd.DataFrame(rows)
+
+#%% Lineup optimiser
+
+def calc_line_scores(lineups, od='O', ratio='F', prior=10):
+    """
+    Function : Scores players and pairs of players for a situation, from the points 
+    they played in it. Scores are in conversion rate above the situation's average, 
+    and shrunk towards 0 for players and pairs with few points together.
+    
+    Inputs: 
+        lineups - Lineups, as calc_lineups gives.
+        od - 'O' or 'D' point. default = 'O'
+        ratio - Gender ratio, 'F' or 'M'. default = 'F'
+        prior - Points of average play added to every player and pair, to shrink their scores. default = 10
+    
+    Outputs: 
+        player, pair - Series of player scores, and a square dataframe of pair chemistry: 
+        how much better a pair converted together than their two player scores predict.
+    """
+    mask = lineups.select(ratio = ratio, od = od)
+    base = lineups.scored[mask].mean() if mask.any() else 0.5
+    
+    byplayer = lineups.by_player(mask)
+    player = (byplayer['Converted'] + prior*base)/(byplayer['Points'] + prior) - base
+    
+    together = lineups.together(mask)
+    converted = lineups.together(mask, converted = True)
+    expected = base + player.values[:, None] + player.values[None, :]
+    pair = (converted.values - together.values*expected)/(together.values + prior)
+    np.fill_diagonal(pair, 0)
+    pair = pd.DataFrame(pair, index = together.index, columns = together.columns)
+    
+    return player, pair
+
+def best_lines(lineups, od='O', ratio='F', k=5, available=None, chemistry=1.0, prior=10):
+    """
+    Function : Finds the best lines of seven for a situation, with 4 women and 3 men on an 
+    F point and the other way round on an M point. A line scores the sum of its player scores 
+    and pair chemistry from calc_line_scores. Lines are searched by branch and bound, 
+    skipping every partial line whose most optimistic completion can't make the top k.
+    
+    Inputs: 
+        lineups - Lineups, as calc_lineups gives.
+        od - 'O' or 'D' point. default = 'O'
+        ratio - Gender ratio, 'F' or 'M'. default = 'F'
+        k - Number of lines to return. default = 5
+        available - Names of the players available, all of them on the lineups roster. 
+        default = None, the whole roster.
+        chemistry - Weight of pair chemistry against player scores. default = 1.0
+        prior - As for calc_line_scores. default = 10
+    
+    Outputs: 
+        Dataframe with a row per line, best first, with the Players in it and its Score.
+    """
+    player, pair = calc_line_scores(lineups, od, ratio, prior)
+    names = player.index if available is None else pd.Index(available).unique()
+    unknown = names.difference(player.index)
+    if len(unknown):
+        raise ValueError('Players not on the roster: '+', '.join(map(str, unknown)))
+    s = player.reindex(names).values
+    b = chemistry*pair.reindex(index = names, columns = names).values
+    gender = lineups.roster.set_index('Name').Gender.reindex(names).to_numpy(dtype = object)
+    need = {'F' : 4 if ratio == 'F' else 3}
+    need['M'] = 7-need['F']
+    
+    # bonus[j, m] is the most pair chemistry player j could share with m more teammates. 
+    # Each of those pairs is shared by two players still to come, so only half is counted for each.
+    positive = -np.sort(-np.clip(b, 0, None), axis = 1)[:, :6]
+    positive = np.pad(positive, ((0, 0), (0, 6-positive.shape[1])))
+    bonus = np.concatenate([np.zeros((len(names), 1)), np.cumsum(positive, axis = 1)], axis = 1)/2
+    
+    # Trying promising players first finds good lines early, which prunes more.
+    order = np.argsort(-(s + bonus[:, 6]))
+    pools = {g : order[gender[order] == g] for g in need}
+    if any(len(pools[g]) < need[g] for g in need):
+        return pd.DataFrame(columns = ['Players', 'Score'])
+    
+    best = []
+    
+    def bound(chosen, score, starts):
+        slots = 7-len(chosen)
+        total = score
+        for g in need:
+            rest = pools[g][starts[g]:]
+            left = need[g] - sum(gender[j] == g for j in chosen)
+            if left > len(rest):
+                return -np.inf
+            if left:
+                gain = s[rest] + b[np.ix_(rest, chosen)].sum(axis = 1) + bonus[rest, slots-1]
+                total += np.sort(gain)[-left:].sum()
+        return total
+    
+    def search(chosen, score, starts):
+        if len(chosen) == 7:
+            item = (score, tuple(names[chosen]))
+            if len(best) < k:
+                heapq.heappush(best, item)
+            elif score > best[0][0]:
+                heapq.heapreplace(best, item)
+            return
+        if len(best) == k and bound(chosen, score, starts) <= best[0][0]:
+            return
+        # Fill the women, then the men, each in order of promise.
+        g = 'F' if len(chosen) < need['F'] else 'M'
+        pool = pools[g]
+        for i in range(starts[g], len(pool)):
+            j = pool[i]
+            nxt = dict(starts)
+            nxt[g] = i+1
+            search(chosen+[j], score + s[j] + b[j, chosen].sum(), nxt)
+            if len(best) == k and bound(chosen, score, nxt) <= best[0][0]:
+                break
+    
+    search([], 0.0, {g : 0 for g in need})
+    
+    best.sort(reverse = True)
+    return pd.DataFrame({'Players' : [list(line) for _, line in best], 'Score' : [score for score, _ in best]})
+
+#%% Stats cube over game situations
+
+CUBE_DIMENSIONS = ['Game', 'Starting on O/D', 'Gender ratio', 'Gender Called by']
+CUBE_MEASURES = ['Points', 'Converted', 'Conceded', 'Possessions', 'F Goals', 'M Goals', 'F Assists', 'M Assists']
+
+# Dimension value standing for every value of that dimension, in roll-ups.
+ALL = 'All'
+
+class StatsCube:
+    """
+    Point counts for every combination of game situations, and every roll-up of them, 
+    so any split of the season is a single lookup rather than new pandas code.
+    
+    Usage:
+        cube = load_cube('tournament.csv')
+        cube.query(od = 'D', ratio = 'F')                   # every D point played with an F ratio
+        cube.split(['Gender ratio', 'Gender Called by'])    # the genderstats split, and more
+    """
+    def __init__(self, table):
+        """
+        Inputs:
+            table - Dataframe indexed by CUBE_DIMENSIONS, with a CUBE_MEASURES column, 
+            as calc_cube gives.
+        """
+        self.table = table
+        self._rows = {key : i for i, key in enumerate(table.index)}
+        self._values = table[CUBE_MEASURES].values
+    
+    def query(self, game=ALL, od=ALL, ratio=ALL, calledby=ALL):
+        """
+        Function : Looks up the counts for one combination of situations. 
+        Leaving a dimension as ALL adds up over all its values.
+        
+        Inputs: 
+            game - Opponent name.
+            od - 'O' or 'D' for points started on offence or defence.
+            ratio - Gender ratio.
+            calledby - Team that called the gender ratio.
+        
+        Outputs: 
+            Series of the CUBE_MEASURES and the conversion Rate. Counts are 0 for combinations never played.
+        """
+        row = self._rows.get((game, od, ratio, calledby))
+        counts = self._values[row] if row is not None else np.zeros(len(CUBE_MEASURES))
+        stats = pd.Series(counts, index = CUBE_MEASURES)
+        stats['Rate'] = stats['Converted']/stats['Points'] if stats['Points'] else np.nan
+        return stats
+    
+    def split(self, by, **filters):
+        """
+        Function : Splits the counts by one or more dimensions.
+        
+        Inputs: 
+            by - Dimension name, or list of them, from CUBE_DIMENSIONS.
+            filters - Values to fix other dimensions at, by CUBE_DIMENSIONS name with 
+            spaces and slashes as underscores, e.g. Starting_on_O_D = 'O'.
+        
+        Outputs: 
+            Dataframe indexed by the by dimensions, with the CUBE_MEASURES and Rate.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        fixed = {d : filters.get(d.replace(' ','_').replace('/','_'), ALL) for d in CUBE_DIMENSIONS if d not in by}
+        
+        keep = np.ones(len(self.table), dtype = bool)
+        for d in CUBE_DIMENSIONS:
+            level = self.table.index.get_level_values(d)
+            keep &= (level != ALL) if d in by else (level == fixed[d])
+        
+        table = self.table[keep].droplevel([d for d in CUBE_DIMENSIONS if d not in by])
+        table = table.assign(Rate = table['Converted']/table['Points'])
+        return table
+    
+    def save(self, filename):
+        """
+        Function : Saves the cube to a csv file.
+        """
+        self.table.to_csv(filename)
+    
+    @classmethod
+    def load(cls, filename):
+        """
+        Function : Loads a cube saved with save.
+        """
+        table = pd.read_csv(filename, index_col = list(range(len(CUBE_DIMENSIONS))), 
+                            dtype = {d : object for d in CUBE_DIMENSIONS})
+        return cls(table)
+
+@memoize
+def calc_cube(overviews, pitchtimes, roster):
+    """
+    Function : Counts points, conversions, possessions, and goals and assists by gender for 
+    every combination of game, O/D start, gender ratio and caller in one grouped pass, 
+    then adds every roll-up of those combinations.
+    
+    Inputs: 
+        overviews - dictionary containing dataframes of game events
+        pitchtimes - Dictionary of dataframes containing player stats
+        roster - Dataframe containing roster for the entire tournament
+    
+    Outputs: 
+        StatsCube
+    """
+    points = calc_points(overviews)
+    points['Game'] = np.array(list(overviews), dtype = object)[points['Game']]
+    # Situations that weren't recorded get a value of their own, rather than being left out.
+    for d in CUBE_DIMENSIONS[1:]:
+        points[d] = points[d].astype(object).fillna('Unknown')
+    
+    # Goals and assists by gender, joined to their points on game and point number.
+    GAtotal = totalgoalassist_list(pitchtimes, overviews, roster)
+    GA = pd.DataFrame({g+' '+c : (gender_of(GAtotal[c], roster) == g).values 
+                       for c in ['Goals','Assists'] for g in ['F','M']}, index = GAtotal.index)
+    GA = GA.groupby(level = ['Game','Point']).sum()
+    points = points.join(GA, on = ['Game','Point'])
+    
+    points['Points'] = 1
+    points['Converted'] = points['Did we score']
+    points['Conceded'] = 1 - points['Did we score']
+    points['Possessions'] = points['Number of posessions']
+    points[CUBE_MEASURES] = points[CUBE_MEASURES].fillna(0)
+    cells = points.groupby(CUBE_DIMENSIONS, sort = False)[CUBE_MEASURES].sum()
+    
+    # Every roll-up is a sum over the cells, with the rolled up dimensions set to ALL.
+    cube = []
+    for mask in range(2**len(CUBE_DIMENSIONS)):
+        kept = [d for i, d in enumerate(CUBE_DIMENSIONS) if not mask & (1 << i)]
+        rolled = cells.groupby(level = kept, sort = False).sum() if kept else cells.sum().to_frame().T
+        rolled = rolled.reset_index() if kept else rolled
+        for d in CUBE_DIMENSIONS:
+            if d not in kept:
+                rolled[d] = ALL
+        cube.append(rolled[CUBE_DIMENSIONS+CUBE_MEASURES])
+    cube = pd.concat(cube, ignore_index = True).set_index(CUBE_DIMENSIONS)
+    
+    return StatsCube(cube)
+
+def load_cube(filename, cachedir=None):
+    """
+    Function : Loads the stats cube of a tournament, saved next to the tournament csv file 
+    as <tournament>-Cube.csv. The cube is rebuilt and saved again if it is missing, 
+    or older than the tournament file or any of its game files.
+    
+    Inputs: 
+        filename - String for the tournament csv file, as for readdata.
+        cachedir - As for readdata. default = None, no caching.
+    
+    Outputs: 
+        StatsCube
+    """
+    cubefile = os.path.splitext(filename)[0]+'-Cube.csv'
+    tournament = pd.read_csv(filename).dropna(how = 'all')
+    sources = [filename] + [o+'-'+f+'.csv' for o in tournament['Opponent'] for f in ['Overview','Pitchtime']]
+    if os.path.exists(cubefile) and os.path.getmtime(cubefile) >= max(os.path.getmtime(f) for f in sources):
+        return StatsCube.load(cubefile)
+    
+    overviews, pitchtimes, roster = readdata(filename, cachedir)
+    cube = calc_cube(overviews, pitchtimes, roster)
+    cube.save(cubefile)
+    return cube
+
+#%% Scoring runs and momentum
+
+def calc_runs(overviews, minimum=1):
+    """
+    Function : Finds the scoring runs of every game in one pass, by run-length encoding 
+    the Did we score sequence of all points, with a new run at the start of every game.
+    
+    Inputs: 
+        overviews - dictionary containing dataframes of game events
+        minimum - Shortest run to include. default = 1, every run.
+    
+    Outputs: 
+        Dataframe with a row per run, with the Game, the Team that scored it 
+        ('Deep Space' or 'Opponent'), its Start and End point numbers, its Length, 
+        and how many of its points were Breaks, scored by the team that started on D.
+    """
+    points = calc_points(overviews)
+    game = points['Game'].values
+    scored = points['Did we score'].values
+    onO = (points['Starting on O/D'] == 'O').values
+    
+    starts = np.flatnonzero(np.r_[True, (scored[1:] != scored[:-1]) | (game[1:] != game[:-1])])
+    ends = np.r_[starts[1:], len(points)]
+    # A break is scoring against the pull: us scoring from D, or them scoring when we started on O.
+    breaks = np.r_[0, np.cumsum(scored.astype(bool) != onO)]
+    
+    runs = pd.DataFrame({
+            'Game' : np.array(list(overviews), dtype = object)[game[starts]],
+            'Team' : np.where(scored[starts] == 1, 'Deep Space', 'Opponent'),
+            'Start' : points['Point'].values[starts],
+            'End' : points['Point'].values[ends-1],
+            'Length' : ends - starts,
+            'Breaks' : breaks[ends] - breaks[starts],
+            })
+    
+    return runs[runs['Length'] >= minimum].reset_index(drop = True)
+
+def calc_momentum(overviews):
+    """
+    Function : Counts holds and breaks, and the longest scoring runs, of every game.
+    A hold is scoring after starting on O, a break is scoring after starting on D.
+    
+    Inputs: 
+        overviews - dictionary containing dataframes of game events
+    
+    Outputs: 
+        Dataframe indexed by Game, with columns Holds, Breaks, Opponent Holds, Opponent Breaks, 
+        Longest run and Longest Opponent run.
+    """
+    points = calc_points(overviews)
+    points['Game'] = np.array(list(overviews), dtype = object)[points['Game']]
+    scored = points['Did we score'] == 1
+    onO = points['Starting on O/D'] == 'O'
+    
+    momentum = pd.DataFrame({'Holds' : scored & onO, 'Breaks' : scored & ~onO, 
+                             'Opponent Holds' : ~scored & ~onO, 'Opponent Breaks' : ~scored & onO})
+    momentum = momentum.groupby(points['Game'], sort = False).sum()
+    
+    runs = calc_runs(overviews)
+    longest = runs.groupby(['Game', 'Team'], sort = False)['Length'].max().unstack('Team')
+    longest = longest.reindex(index = momentum.index, columns = ['Deep Space', 'Opponent']).fillna(0).astype(int)
+    momentum['Longest run'] = longest['Deep Space']
+    momentum['Longest Opponent run'] = longest['Opponent']
+    
+    return momentum
+
+def calc_timeout_effects(overviews, n=3):
+    """
+    Function : Compares the conversion rate over the n points before and after every timeout. 
+    A timeout called during a point counts that point as after the timeout.
+    
+    Inputs: 
+        overviews - dictionary containing dataframes of game events
+        n - Number of points to look at either side of a timeout. default = 3
+    
+    Outputs: 
+        Dataframe with a row per timeout, with the Game, its position x on the vis_events axis, 
+        the team that Called it, its Kind ('Midpoint' or 'Between points'), the number of Points 
+        and the conversion rate Before and After it, and the Effect, After minus Before.
+    """
+    timeouts = []
+    offset = 0
+    offsets = {}
+    for game in overviews:
+        gameinfo = overviews[game]
+        offsets[game] = (offset, len(gameinfo))
+        offset += len(gameinfo)
+        for column, x, kind in [('Midpoint Timeouts', 'Point number', 'Midpoint'), 
+                                ('Timeouts between points', 'Events between points', 'Between points')]:
+            t = gameinfo[[column, x]].dropna()
+            timeouts.append(pd.DataFrame({'Game' : game, 'x' : t[x].values.astype(float), 
+                                          'Called' : t[column].values, 'Kind' : kind}))
+    timeouts = pd.concat(timeouts, ignore_index = True)
+    
+    # Conversions over any range of points are differences of one cumulative sum over every game.
+    scored = np.r_[0, np.cumsum(calc_points(overviews)['Did we score'].values)]
+    start = np.array([offsets[g][0] for g in timeouts['Game']], dtype = int)
+    length = np.array([offsets[g][1] for g in timeouts['Game']], dtype = int)
+    first = np.ceil(timeouts['x'].values).astype(int) - 1
+    
+    before = np.clip(first - n, 0, None)
+    after = np.clip(first + n, None, length)
+    first = np.clip(first, 0, length)
+    timeouts['Points before'] = first - before
+    timeouts['Before'] = (scored[start+first] - scored[start+before])/np.where(first > before, first - before, np.nan)
+    timeouts['Points after'] = after - first
+    timeouts['After'] = (scored[start+after] - scored[start+first])/np.where(after > first, after - first, np.nan)
+    timeouts['Effect'] = timeouts['After'] - timeouts['Before']
+    
+    return timeouts
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Opt-in instrumentation for the analysis pipeline.
+
+enable() swaps every public function in fxns for a wrapper that records its wall time,
+peak memory and the number of dataframe rows going in and coming out. Because fxns
+functions call each other through the module namespace, nested calls (e.g. calc_pointlog
+inside calc_GApairs) are recorded too. disable() puts the original functions back, so
+when instrumentation is off there is no overhead at all.
+
+Usage:
+    import instrument
+    with instrument.tracing('trace.json'):
+        ... run the pipeline ...
+    # The trace is written to trace.json and a summary is printed on exit.
+"""
+
+import sys
+import json
+import time
+import inspect
+import functools
+import tracemalloc
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+import fxns
+
+
+# One record per instrumented call, in the order the calls finished.
+records = []
+
+_originals = {}
+_stack = []
+_started_tracemalloc = False
+
+
+def _rows(obj):
+    """
+    Function : Counts the dataframe or array rows in an input or output, including
+    dictionaries and tuples of dataframes. Other objects count as 0 rows.
+    """
+    if isinstance(obj, (pd.DataFrame, pd.Series, np.ndarray)):
+        return len(obj)
+    if isinstance(obj, dict):
+        return sum(_rows(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_rows(v) for v in obj)
+    return 0
+
+def _instrument(function, memory):
+    """
+    Function : Wraps a function so each call is appended to records.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        frame = {'start' : 0, 'peak' : 0}
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # The caller's peak so far would be lost by reset_peak, so keep it on its frame.
+            if _stack:
+                _stack[-1]['peak'] = max(_stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            frame = {'start' : current, 'peak' : current}
+        _stack.append(frame)
+        depth = len(_stack)-1
+
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            _stack.pop()
+            peak = None
+            if memory:
+                framepeak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                peak = (framepeak - frame['start'])/2**20
+                if _stack:
+                    _stack[-1]['peak'] = max(_stack[-1]['peak'], framepeak)
+
+        records.append({'Function' : function.__name__,
+                        'Depth' : depth,
+                        'Start' : start,
+                        'Seconds' : seconds,
+                        'Peak MB' : peak,
+                        'Rows in' : _rows(args) + _rows(kwargs),
+                        'Rows out' : _rows(result)})
+        return result
+
+    return wrapper
+
+def public_functions():
+    """
+    Function : Lists the names of the public functions defined in fxns.
+    """
+    return [name for name, obj in vars(fxns).items()
+            if inspect.isfunction(obj) and not name.startswith('_')
+            and obj.__module__ == fxns.__name__ and name != 'memoize']
+
+def enable(memory=True):
+    """
+    Function : Turns on instrumentation for every public function in fxns.
+
+    Inputs:
+        memory - If True, peak memory is recorded with tracemalloc, which slows
+        down allocation-heavy code. default = True
+    """
+    global _started_tracemalloc
+    if _originals:
+        return
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+    for name in public_functions():
+        _originals[name] = getattr(fxns, name)
+        setattr(fxns, name, _instrument(_originals[name], memory))
+
+def disable():
+    """
+    Function : Turns instrumentation off, restoring the original functions.
+    """
+    global _started_tracemalloc
+    for name, function in _originals.items():
+        setattr(fxns, name, function)
+    _originals.clear()
+    if _started_tracemalloc:
+        tracemalloc.stop()
+        _started_tracemalloc = False
+
+def write_trace(filename):
+    """
+    Function : Writes the recorded calls to a JSON trace file.
+
+    Inputs:
+        filename - String, path of the JSON file.
+    """
+    start = min([r['Start'] for r in records], default = 0)
+    trace = [dict(r, Start = r['Start'] - start) for r in sorted(records, key = lambda r: r['Start'])]
+    with open(filename, 'w') as f:
+        json.dump(trace, f, indent = 1)
+
+def summary():
+    """
+    Function : Summarises the recorded calls by function.
+
+    Outputs:
+        Dataframe with the number of calls, total and slowest wall time, largest peak memory
+        and total rows in and out for each function, sorted by total time.
+    """
+    if not records:
+        return pd.DataFrame(columns = ['Calls', 'Total s', 'Max s', 'Peak MB', 'Rows in', 'Rows out'])
+    table = pd.DataFrame(records).groupby('Function').agg(**{
+            'Calls' : ('Seconds', 'size'),
+            'Total s' : ('Seconds', 'sum'),
+            'Max s' : ('Seconds', 'max'),
+            'Peak MB' : ('Peak MB', 'max'),
+            'Rows in' : ('Rows in', 'sum'),
+            'Rows out' : ('Rows out', 'sum')})
+    return table.sort_values('Total s', ascending = False)
+
+@contextmanager
+def tracing(filename=None, memory=True, stream=sys.stdout):
+    """
+    Function : Context manager that instruments fxns for the duration of a run, then
+    writes the JSON trace and prints a summary.
+
+    Inputs:
+        filename - String, path of the JSON trace. default = None, no trace file.
+        memory - If True, peak memory is recorded. default = True
+        stream - Where the summary is printed to, None to not print it. default = sys.stdout
+    """
+    del records[:]
+    enable(memory)
+    try:
+        yield records
+    finally:
+        disable()
+        if filename is not None:
+            write_trace(filename)
+        if stream is not None:
+            print(summary().round(3).to_string(), file = stream)
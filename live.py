@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Live point-by-point ingestion, for dashboards that update while a game is being played.
+
+A LiveGame takes one point record at a time, keeps the game's overview and the per-player
+counts of indstats up to date, and returns just the new data for the vis_events and
+vis_possessions figures, in the form Plotly.extendTraces and Plotly.relayout take.
+
+A Dashboard writes the two figures once to a html page, and appends each update to
+an updates.js file next to it. The page reloads updates.js every few seconds and applies
+only the updates it has not seen yet, so the figures grow point by point without being
+re-rendered. Everything is local files, so it works offline at the field.
+
+A point record is a dictionary using the Overview column names, plus the players on the pitch:
+    {'Deep Space': 3, 'Opponent': 2,                # score after the point
+     'Starting on O/D': 'O', 'Gender ratio': 'F', 'Gender Called by': 'U',
+     'Number of posessions': 2,
+     'Players': ['Ange', 'Smatt', ...], 'Goal': 'Ange', 'Assist': 'Smatt',
+     'Midpoint Timeouts': 'U',                      # optional, timeout during the point
+     'Timeouts between points': 'T'}               # optional, timeout before the point
+'Did we score' may be given instead of, or as well as, the score.
+
+Usage, tailing a file of JSON point records written by the stat-taker:
+    python live.py Herd roster.csv points.jsonl --out dashboard
+"""
+
+import os
+import re
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import fxns
+
+
+OVERVIEW = ['Point number', 'Deep Space', 'Opponent', 'Gender ratio', 'Gender Called by',
+            'Starting on O/D', 'Did we score', 'Number of posessions',
+            'Midpoint Timeouts', 'Timeouts between points', 'Events between points']
+
+
+class LiveGame:
+    """
+    Keeps one game's overview, pitchtime and player counts up to date as points come in.
+    """
+    def __init__(self, game, roster):
+        """
+        Inputs:
+            game - String, name of opponent.
+            roster - Dataframe containing player names and gender, and IDs if it has an ID 
+            column, e.g. from a registry. Players not on it are added as they appear, with new IDs.
+        """
+        self.game = game
+        ids = roster.ID.values if 'ID' in roster else np.arange(len(roster))
+        self.roster = pd.DataFrame({'ID' : np.asarray(ids, dtype = np.int64), 'Name' : roster.Name.values, 
+                                    'Gender' : roster.Gender.values}).rename(index = str)
+        self.rows = []
+        self.lines = []
+        self.counts = {name : np.zeros(len(fxns._COUNTS)) for name in self.roster.Name}
+        self.timeouts = 0
+
+    def add_point(self, record):
+        """
+        Function : Adds the next point of the game.
+
+        Inputs:
+            record - Dictionary describing the point, see the module docstring.
+
+        Outputs:
+            List of (figure, kind, update, traces) tuples, where figure is 'events' or
+            'possessions', kind is 'extend' or 'relayout', and update and traces are the
+            arguments to Plotly.extendTraces or Plotly.relayout.
+        """
+        n = len(self.rows)+1
+        last = self.rows[-1] if self.rows else {'Deep Space' : 0, 'Opponent' : 0}
+        if 'Did we score' in record:
+            scored = int(record['Did we score'] == 1)
+        else:
+            scored = int(record['Deep Space'] > last['Deep Space'])
+        row = {'Point number' : n,
+               'Deep Space' : record.get('Deep Space', last['Deep Space'] + scored),
+               'Opponent' : record.get('Opponent', last['Opponent'] + 1 - scored),
+               'Gender ratio' : record['Gender ratio'],
+               'Gender Called by' : record['Gender Called by'],
+               'Starting on O/D' : record['Starting on O/D'],
+               'Did we score' : scored,
+               'Number of posessions' : record['Number of posessions'],
+               'Midpoint Timeouts' : record.get('Midpoint Timeouts'),
+               'Timeouts between points' : record.get('Timeouts between points'),
+               'Events between points' : n-0.5 if record.get('Timeouts between points') else np.nan}
+        self.rows.append(row)
+
+        line = {name : '1.0' for name in record['Players']}
+        if record.get('Goal'):
+            line[record['Goal']] = 'G'
+        if record.get('Assist'):
+            line[record['Assist']] = 'A'
+        self.lines.append(line)
+
+        # Same columns as _player_counts: played, goals, assists, then O/D converted/conceded.
+        outcome = 3 + 2*(row['Starting on O/D'] != 'O') + (1 - scored)
+        for name, role in line.items():
+            if name not in self.counts:
+                self.counts[name] = np.zeros(len(fxns._COUNTS))
+                ID = self.roster.ID.max()+1 if len(self.roster) else 0
+                self.roster.loc[str(len(self.roster))] = [ID, name, np.nan]
+            self.counts[name][0] += 1
+            self.counts[name][1] += role == 'G'
+            self.counts[name][2] += role == 'A'
+            self.counts[name][outcome] += 1
+
+        return self._updates(row)
+
+    def _updates(self, row):
+        """
+        Function : Builds the figure updates for a new overview row, matching the traces
+        and shapes of fxns.fig_events and fxns.fig_possessions.
+        """
+        fm2 = dict((k, fxns.pco.to_hex(v)) for k,v in fxns.FMcmap.items())
+        ut2 = dict((k, fxns.pco.to_hex(v)) for k,v in fxns.UTcmap.items())
+        yn = {0 : '#BB8FCE', 1 : '#ABB2B9'}
+        yn1 = {0 : 'Conceded', 1 : 'Converted'}
+        n = row['Point number']
+
+        updates = [('events', 'extend', {'x' : [[n]], 'y' : [[row['Opponent']]]}, [0]),
+                   ('events', 'extend', {'x' : [[n]], 'y' : [[row['Deep Space']]],
+                                         'marker.color' : [[fm2.get(row['Gender ratio'])]],
+                                         'text' : [[str(row['Gender ratio'])+str(row['Gender Called by'])]]}, [1]),
+                   ('possessions', 'extend', {'x' : [[n]], 'y' : [[row['Number of posessions']]],
+                                              'marker.color' : [[yn[row['Did we score']]]],
+                                              'text' : [[yn1[row['Did we score']]]]}, [0])]
+
+        for team, x in [(row['Midpoint Timeouts'], n), (row['Timeouts between points'], n-0.5)]:
+            if team:
+                shape = {'type' : 'line', 'xref' : 'x', 'yref' : 'y', 'x0' : x, 'y0' : 0, 'x1' : x, 'y1' : n,
+                         'line' : {'color' : ut2.get(team), 'width' : 2, 'dash' : 'dash'}}
+                updates.append(('events', 'relayout', {'shapes['+str(self.timeouts)+']' : shape}, None))
+                self.timeouts += 1
+
+        return updates
+
+    def overview(self):
+        """
+        Function : Returns the game events so far, in the layout readdata gives.
+        """
+        return pd.DataFrame(self.rows, columns = OVERVIEW)
+
+    def pitchtime(self):
+        """
+        Function : Returns the player stats so far, in the layout readdata gives.
+        """
+        pitchtime = self.roster[['Gender','Name']].copy()
+        for i, line in enumerate(self.lines):
+            pitchtime[str(i+1)] = pitchtime.Name.map(line)
+        counts = np.array([self.counts[name] for name in pitchtime.Name]).reshape(-1, len(fxns._COUNTS))
+        pitchtime['Points Played'] = counts[:, 0]
+        pitchtime['Goals'] = counts[:, 1]
+        pitchtime['Assists'] = counts[:, 2]
+        return pitchtime
+
+    def indstats(self):
+        """
+        Function : Returns individual player statistics for the game so far, as calc_indstats does.
+        """
+        totals = np.array([self.counts[name] for name in self.roster.Name]).reshape(-1, len(fxns._COUNTS))
+        return fxns._indstats_table(self.roster, totals)
+
+class Dashboard:
+    """
+    A local html page showing a live game's events and possessions, updated point by point.
+    """
+    SCRIPT = """
+		<script>
+		var applied = 0;
+		function liveUpdate(seq, div, kind, update, traces) {
+			if (seq <= applied) return;
+			if (kind == 'extend') Plotly.extendTraces(div, update, traces);
+			else Plotly.relayout(div, update);
+			applied = seq;
+		}
+		function poll() {
+			var s = document.createElement('script');
+			s.src = 'updates.js?' + Date.now();
+			s.onload = s.onerror = function() { s.remove(); };
+			document.body.appendChild(s);
+		}
+		setInterval(poll, %d);
+		</script>
+"""
+
+    def __init__(self, live, directory, poll=2.0):
+        """
+        Inputs:
+            live - LiveGame to show.
+            directory - String, directory to write live.htm and updates.js to.
+            poll - Seconds between the page checking for updates. default = 2.0
+        """
+        self.directory = directory
+        self.updates = os.path.join(directory, 'updates.js')
+        self.seq = 0
+        os.makedirs(directory, exist_ok = True)
+
+        overviews = {live.game : live.overview()}
+        # Plotly is embedded in the page, so it works without an internet connection.
+        events = fxns.offline.plot(fxns.fig_events(live.game, overviews, minrun = None), include_plotlyjs = True, output_type = 'div')
+        possessions = fxns.offline.plot(fxns.fig_possessions(live.game, overviews), include_plotlyjs = False, output_type = 'div')
+        self.divs = {'events' : self._divid(events), 'possessions' : self._divid(possessions)}
+
+        with open(os.path.join(directory, 'live.htm'), 'w') as f:
+            f.write('<!DOCTYPE html>\n<html lang="en">\n<head>\n  <title>Live - '+str(live.game)+'</title>\n</head>\n<body>\n')
+            f.write(events+'\n'+possessions+'\n')
+            f.write(self.SCRIPT % int(poll*1000))
+            f.write('</body>\n</html>\n')
+        open(self.updates, 'w').close()
+
+    @staticmethod
+    def _divid(div):
+        return re.search(r'<div id="([^"]+)" class="plotly-graph-div"', div).group(1)
+
+    def push(self, updates):
+        """
+        Function : Appends figure updates from LiveGame.add_point for the page to pick up.
+        """
+        lines = []
+        for figure, kind, update, traces in updates:
+            self.seq += 1
+            lines.append('liveUpdate('+', '.join(json.dumps(a) for a in
+                         [self.seq, self.divs[figure], kind, update, traces])+');\n')
+        with open(self.updates, 'a') as f:
+            f.writelines(lines)
+
+def follow(path, poll=1.0, stop=None):
+    """
+    Function : Tails a file of JSON point records, one per line, yielding each record
+    as it is written. Lines still being written are held back until they are complete.
+
+    Inputs:
+        path - String, path of the file. It need not exist yet.
+        poll - Seconds between checks for new lines. default = 1.0
+        stop - Function called between checks, returning True to stop following. default = None
+
+    Outputs:
+        Generator of point record dictionaries.
+    """
+    position = 0
+    partial = ''
+    while True:
+        if os.path.exists(path):
+            with open(path) as f:
+                f.seek(position)
+                chunk = f.read()
+                position = f.tell()
+            lines = (partial + chunk).split('\n')
+            partial = lines.pop()
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+        if stop is not None and stop():
+            return
+        time.sleep(poll)
+
+def run(game, roster, path, directory, poll=1.0, stop=None):
+    """
+    Function : Follows a file of point records, updating a live dashboard as each point comes in.
+
+    Inputs:
+        game - String, name of opponent.
+        roster - Dataframe containing player names and gender.
+        path - String, path of the file of JSON point records.
+        directory - String, directory for the dashboard.
+        poll - Seconds between checks for new points. default = 1.0
+        stop - Function returning True to stop following. default = None
+
+    Outputs:
+        The LiveGame, once stopped.
+    """
+    live = LiveGame(game, roster)
+    dashboard = Dashboard(live, directory, poll = max(poll, 1.0))
+    for record in follow(path, poll, stop):
+        dashboard.push(live.add_point(record))
+    return live
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Live dashboard for a game in progress.')
+    parser.add_argument('game', help = 'name of opponent')
+    parser.add_argument('roster', help = 'csv file with Name and Gender columns')
+    parser.add_argument('points', help = 'file of JSON point records, one per line')
+    parser.add_argument('--out', default = 'live', help = 'directory for the dashboard')
+    parser.add_argument('--poll', type = float, default = 1.0)
+    args = parser.parse_args()
+    print('Dashboard at', os.path.join(args.out, 'live.htm'))
+    try:
+        run(args.game, pd.read_csv(args.roster), args.points, args.out, args.poll)
+    except KeyboardInterrupt:
+        pass
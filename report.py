@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Builds the html report from a tournament csv file in one go:
+    readdata -> calc_indstats -> totalgoalassist_list -> calc_gender_r -> all visualisations.
+
+In headless mode, which is the default for batch builds, every figure is rendered to a html div
+exactly once and nothing is opened in a browser. The divs are then put together into the
+report and written to disk with a single write.
+
+Figures can be rendered in parallel over a pool of worker processes with -j.
+
+Usage:
+    python report.py tournament.csv -o index.htm --title "Deep Space Report" -j 4
+"""
+
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import fxns
+import instrument
+
+
+HEADER = """<!DOCTYPE html>
+<html lang="en">
+
+<head>
+  <title>Report</title>
+  <link rel="stylesheet" type="text/css" href="style.css">
+  <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
+</head>
+
+<body>
+	<main>
+		<div id="mainwidth">
+		<h1>{title}</h1>
+		<p>Graphs are interactive - hover over data points to see more information. </p>
+"""
+
+FOOTER = """		</div>
+	</main>
+
+</body>
+</html>
+"""
+
+EVENTS = """
+		<h2>Overview of Events in Each Game</h2>
+		<p>This section shows the evolution of the game during each point. </br>
+		Points are color-coded to show which gender ratio has been called, and who calls it (U : Us, T : Them). </br>
+		Time outs, when they happen, are also shown using vertical dashed lines. These are also color-coded to show which team called the timeout. </br>
+		The other graph shows the number of possessions with each point, and whether that point was converted or conceded. </p>
+"""
+
+GENDER = """
+		<h2>Overall Information</h2>
+
+		<h3>Gender Based Statistics</h3>
+		<p>This section outlines the total stats, split according to the gender ratio called per point. </br>
+		Click on the legend on each pie chart to choose which slices you want to see. </br>
+		M -> Male (4 Men, 3 Women) and F -> Female (4 Women, 3 Men). </p>
+"""
+
+GAFLOW = """
+		<h3>Connections with Goals and Assists Stats</h3>
+		<p>Diagram flows left to right for Assists to Goals.</br>
+		Thicker links show more frequent connections (in one direction) between two players.</br>
+		Player nodes can be shifted.</p>
+"""
+
+PLAYERS = """
+		<h2> Information by Player </h2>
+
+		<h3> Point Outcomes </h3>
+		<p> The point outcomes are normalised to each player - values represent a percentage of the total points the individual has played. </p>
+"""
+
+ODPOINTS = """
+		<h3>Types of Points per Player</h3>
+		<p> This is recorded using actual number of points - this would help show any disparities in player pitch times.</p>
+"""
+
+EFFICIENCY = """
+		<h3>Overall Conversion Efficiency of Players </h3>
+		<p>Conversion efficiencies are normalised to the number of O and D points each individual player has played.</p>
+"""
+
+POSSESSIONS = """
+		<h3>Possessions and O/D Lean by Player</h3>
+"""
+
+
+def _columns(divs, width):
+    """
+    Function : Lays out divs side by side, each taking the given share of the page width.
+    """
+    html = '\t\t<div style="width: 100%; overflow: hidden;">\n'
+    for div in divs:
+        html += '\t\t\t<div style="width: '+width+'; float: left;">\n\t\t\t\t'+div+'\n\t\t\t</div>\n'
+    return html + '\t\t</div>\n'
+
+def build_figures(overviews, pitchtimes, roster, resamples=10000, workers=1):
+    """
+    Function : Runs the analysis pipeline, and lists every figure of the report
+    as (function, arguments) pairs, in the order they appear in the report.
+
+    Inputs:
+        overviews - dictionary containing dataframes of game events
+        pitchtimes - Dictionary of dataframes containing player stats
+        roster - Dataframe containing roster for the entire tournament
+        resamples - Number of bootstrap resamples for the error bars. default = 10000
+        workers - Number of worker processes for the bootstrap, None for one per core. default = 1
+
+    Outputs:
+        Dictionary of figure names to (function, arguments).
+    """
+    indstats = fxns.calc_indstats(overviews, pitchtimes, roster)
+    GAtotal = fxns.totalgoalassist_list(pitchtimes, overviews, roster)
+    genderstats = fxns.calc_gender_r(GAtotal, overviews, indstats)
+    turns = fxns.calc_player_turns(pitchtimes, overviews)
+    # Same seed every build, so the error bars don't move between rebuilds of the same data.
+    indstats_ci = fxns.calc_indstats_ci(overviews, pitchtimes, roster, resamples = resamples, seed = 0,
+                                          workers = workers)
+
+    figures = {}
+    for game in overviews:
+        # Only the game's own overview is passed, so workers are not sent the whole season.
+        figures['events '+game] = (fxns.vis_events, (game, {game: overviews[game]}))
+        figures['possessions '+game] = (fxns.vis_possessions, (game, {game: overviews[game]}))
+    figures['gender con'] = (fxns.pie_gender_con, (genderstats,))
+    figures['gender g'] = (fxns.pie_gender_g, (genderstats,))
+    figures['gender a'] = (fxns.pie_gender_a, (genderstats,))
+    figures['gender GA pair'] = (fxns.pie_gender_GApair, (indstats, GAtotal))
+    figures['disparity'] = (fxns.vis_disparity, (genderstats, indstats, GAtotal))
+    figures['GA flow'] = (fxns.vis_GAflow, (GAtotal, pitchtimes, roster))
+    figures['GA rank A'] = (fxns.vis_GArank, (indstats, 'A'))
+    figures['GA rank G'] = (fxns.vis_GArank, (indstats, 'G'))
+    figures['point results'] = (fxns.vis_player_pointresults, (indstats_ci,))
+    figures['od points'] = (fxns.vis_player_odpoints, (indstats,))
+    figures['efficiency O'] = (fxns.vis_player_efficiency, (indstats_ci, 'O'))
+    figures['efficiency D'] = (fxns.vis_player_efficiency, (indstats_ci, 'D'))
+    figures['od lean'] = (fxns.vis_odlean, (indstats_ci,))
+    figures['possession violin'] = (fxns.vis_player_odposviolin, (turns, roster))
+
+    return figures
+
+def _render(job):
+    """
+    Function : Renders a single figure to its html div. Runs in the worker processes.
+    """
+    function, args = job
+    div = function(*args)
+    # vis_disparity also returns its table alongside the div.
+    return div[1] if isinstance(div, tuple) else div
+
+def _set_headless(headless):
+    fxns.HEADLESS = headless
+
+def render_figures(figures, workers=1):
+    """
+    Function : Renders every figure to its html div, optionally spread over a pool of
+    worker processes. Divs are gathered in the same order as figures, whatever
+    order the workers finish in.
+
+    Inputs:
+        figures - Dictionary of figure names to (function, arguments), from build_figures.
+        workers - Number of worker processes. 1 renders in this process,
+        None uses one process per core. default = 1
+
+    Outputs:
+        Dictionary of figure names to html divs.
+    """
+    if workers == 1:
+        divs = [_render(job) for job in figures.values()]
+    else:
+        with ProcessPoolExecutor(max_workers = workers, initializer = _set_headless,
+                                 initargs = (fxns.HEADLESS,)) as pool:
+            divs = list(pool.map(_render, figures.values()))
+
+    return dict(zip(figures, divs))
+
+def assemble(divs, games, title):
+    """
+    Function : Puts the rendered divs together into the html report.
+
+    Inputs:
+        divs - Dictionary of figure names to html divs, from render_figures.
+        games - List of opponent names, in report order.
+        title - Title of the report.
+
+    Outputs:
+        String containing the whole html report.
+    """
+    html = [HEADER.format(title = title), EVENTS]
+    for i, game in enumerate(games):
+        html.append('\n\t\t<h3>Game '+str(i+1)+' - '+game+'</h3>\n')
+        html.append(_columns([divs['events '+game], divs['possessions '+game]], '50%'))
+    html.append(GENDER)
+    html.append(_columns([divs['gender con'], divs['gender g'], divs['gender a']], '33%'))
+    html.append(_columns([divs['gender GA pair'], divs['disparity']], '50%'))
+    html.append(GAFLOW)
+    html.append(divs['GA flow'])
+    html.append(_columns([divs['GA rank A'], divs['GA rank G']], '50%'))
+    html.append(PLAYERS)
+    html.append(divs['point results'])
+    html.append(ODPOINTS)
+    html.append(divs['od points'])
+    html.append(EFFICIENCY)
+    html.append(_columns([divs['efficiency O'], divs['efficiency D']], '50%'))
+    html.append(POSSESSIONS)
+    html.append(_columns([divs['possession violin'], divs['od lean']], '50%'))
+    html.append(FOOTER)
+    return ''.join(html)
+
+def build_report(filename, output='index.htm', title='Report', headless=True, workers=1, cachedir=None, resamples=10000):
+    """
+    Function : Builds the full html report for a tournament.
+
+    Inputs:
+        filename - String, csv file in which the tournament games are stored in.
+        output - String, file the report is written to. default = 'index.htm'
+        title - Title of the report. default = 'Report'
+        headless - If True, figures are only rendered to divs, and nothing is
+        opened in a browser. default = True
+        workers - Number of worker processes for the bootstrap and for rendering figures,
+        None for one per core. default = 1
+        cachedir - String, directory in which parsed games and derived tables are cached
+        between builds. default = None, no caching.
+        resamples - Number of bootstrap resamples for the error bars. default = 10000
+
+    Outputs:
+        String containing the whole html report.
+    """
+    overviews, pitchtimes, roster = fxns.readdata(filename, cachedir)
+
+    headless_before, cache_before = fxns.HEADLESS, fxns.DERIVED_CACHE
+    fxns.HEADLESS = headless
+    if cachedir is not None:
+        fxns.DERIVED_CACHE = os.path.join(cachedir, 'derived')
+    try:
+        divs = render_figures(build_figures(overviews, pitchtimes, roster, resamples, workers), workers)
+    finally:
+        fxns.HEADLESS, fxns.DERIVED_CACHE = headless_before, cache_before
+
+    html = assemble(divs, list(overviews), title)
+    with open(output, 'w') as f:
+        f.write(html)
+
+    return html
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Build the html report for a tournament.')
+    parser.add_argument('filename', help = 'csv file listing the tournament games')
+    parser.add_argument('-o', '--output', default = 'index.htm')
+    parser.add_argument('--title', default = 'Report')
+    parser.add_argument('--show', action = 'store_true', help = 'also open every figure in the browser')
+    parser.add_argument('-j', '--workers', type = int, default = 1,
+                        help = 'number of processes for the bootstrap and rendering figures, 0 for one per core')
+    parser.add_argument('--cache', default = None,
+                        help = 'directory to cache parsed games and derived tables in between builds, e.g. .ultimate_cache')
+    parser.add_argument('--resamples', type = int, default = 10000,
+                        help = 'number of bootstrap resamples for the error bars')
+    parser.add_argument('--trace', default = None,
+                        help = 'record time and memory of every fxns call, and write the JSON trace to this file')
+    args = parser.parse_args()
+    if args.trace:
+        # Calls made in worker processes are not traced, so figures are rendered in this process.
+        with instrument.tracing(args.trace):
+            build_report(args.filename, args.output, args.title, headless = not args.show, cachedir = args.cache,
+                         resamples = args.resamples)
+    else:
+        build_report(args.filename, args.output, args.title, headless = not args.show,
+                     workers = args.workers or None, cachedir = args.cache, resamples = args.resamples)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generates synthetic tournaments in the same csv layout that fxns.readdata expects:
+a tournament csv listing the opponents, and an <Opponent>-Overview.csv and
+<Opponent>-Pitchtime.csv for every game.
+
+Lines follow the mixed rules (4 women and 3 men on an F point, and the other way round
+on an M point), the team that scores pulls on the next point, and goals and assists are
+given to players on the pitch. This keeps the data realistic enough for testing and
+benchmarking the analysis pipeline at any size.
+
+Usage:
+    python synthetic.py outdir --games 100 --points 20 --roster 24 --fratio 0.5
+"""
+
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+
+def make_game(rng, names, genders, points=20, fratio=0.5, conversion=0.5):
+    """
+    Function : Generates the overview and pitchtime dataframes for a single game.
+
+    Inputs:
+        rng - numpy random Generator.
+        names - Array of player names on the roster.
+        genders - Array of player genders ('F' or 'M'), aligned with names.
+        points - Number of points in the game. default = 20
+        fratio - Probability that a point is played with an F gender ratio. default = 0.5
+        conversion - Probability of scoring a point started on D. Points started on O
+        are converted more often. default = 0.5
+
+    Outputs:
+        overview, pitchtime - Dataframes in the layout of the Overview and Pitchtime csv files.
+    """
+    women = np.flatnonzero(genders == 'F')
+    men = np.flatnonzero(genders == 'M')
+
+    ratio = np.where(rng.random(points) < fratio, 'F', 'M')
+    calledby = rng.choice(['U', 'T'], points)
+
+    # The team that scores pulls, so the other team starts the next point on O.
+    scored = np.zeros(points, dtype = int)
+    od = np.empty(points, dtype = object)
+    od[0] = rng.choice(['O', 'D'])
+    for i in range(points):
+        if i > 0:
+            od[i] = 'D' if scored[i-1] == 1 else 'O'
+        scored[i] = rng.random() < (conversion + 0.2 if od[i] == 'O' else conversion)
+
+    # Conceding on D can happen without ever having the disc.
+    possessions = rng.poisson(1.5, points) + np.where((od == 'O') | (scored == 1), 1, 0)
+
+    overview = pd.DataFrame({
+            'Point number' : np.arange(1, points+1),
+            'Deep Space' : np.cumsum(scored),
+            'Opponent' : np.cumsum(1-scored),
+            'Gender ratio' : ratio,
+            'Gender Called by' : calledby,
+            'Starting on O/D' : od,
+            'Did we score' : scored,
+            'Number of posessions' : possessions,
+            'Midpoint Timeouts' : np.full(points, None, dtype = object),
+            'Timeouts between points' : np.full(points, None, dtype = object),
+            'Events between points' : np.full(points, np.nan),
+            })
+    for i in np.flatnonzero(rng.random(points) < 0.05):
+        overview.loc[i, 'Midpoint Timeouts'] = rng.choice(['U', 'T'])
+    for i in np.flatnonzero(rng.random(points-1) < 0.05):
+        overview.loc[i, 'Timeouts between points'] = rng.choice(['U', 'T'])
+        overview.loc[i, 'Events between points'] = i+1.5
+
+    cells = np.full((len(names), points), '', dtype = object)
+    for i in range(points):
+        nf = 4 if ratio[i] == 'F' else 3
+        line = np.concatenate([rng.choice(women, min(nf, len(women)), replace = False),
+                               rng.choice(men, min(7-nf, len(men)), replace = False)])
+        cells[line, i] = '1.0'
+        if scored[i] == 1:
+            scorer, assister = rng.choice(line, 2, replace = False)
+            cells[scorer, i] = 'G'
+            cells[assister, i] = 'A'
+
+    pitchtime = pd.DataFrame(cells, columns = [str(i+1) for i in range(points)])
+    pitchtime.insert(0, 'Name', names)
+    pitchtime.insert(0, 'Gender', genders)
+    pitchtime['Points Played'] = (cells != '').sum(axis = 1)
+    pitchtime['Goals'] = (cells == 'G').sum(axis = 1)
+    pitchtime['Assists'] = (cells == 'A').sum(axis = 1)
+
+    # The spreadsheet ends with three rows of team totals, which readdata drops.
+    totals = pd.DataFrame('', index = range(3), columns = pitchtime.columns)
+    pitchtime = pd.concat([pitchtime, totals], ignore_index = True)
+
+    return overview, pitchtime
+
+def make_tournament(directory, games=3, points=20, roster=24, fratio=0.5, seed=None):
+    """
+    Function : Writes a synthetic tournament to a directory, in the csv layout readdata expects.
+
+    Inputs:
+        directory - String, directory to write the csv files to. Created if missing.
+        games - Number of games. default = 3
+        points - Number of points per game. default = 20
+        roster - Number of players on the roster, split evenly between genders. default = 24
+        fratio - Share of points played with an F gender ratio. default = 0.5
+        seed - Seed for the random number generator. default = None
+
+    Outputs:
+        String, path to the tournament csv file. Note that readdata reads the game
+        files relative to the working directory, so change into the directory first.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok = True)
+
+    names = np.array(['Player '+str(i+1).zfill(2) for i in range(roster)], dtype = object)
+    genders = np.array(['F' if i % 2 else 'M' for i in range(roster)], dtype = object)
+    opponents = ['Team '+str(i+1).zfill(len(str(games))) for i in range(games)]
+
+    for opponent in opponents:
+        overview, pitchtime = make_game(rng, names, genders, points, fratio)
+        overview.to_csv(os.path.join(directory, opponent+'-Overview.csv'), index = False)
+        # The Gender and Name columns have blank headers in the spreadsheet export.
+        pitchtime.to_csv(os.path.join(directory, opponent+'-Pitchtime.csv'), index = False,
+                         header = ['', '']+list(pitchtime.columns[2:]))
+
+    filename = os.path.join(directory, 'tournament.csv')
+    pd.DataFrame({'Opponent' : opponents}).to_csv(filename, index = False)
+
+    return filename
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Write a synthetic tournament in the readdata csv layout.')
+    parser.add_argument('directory')
+    parser.add_argument('--games', type = int, default = 3)
+    parser.add_argument('--points', type = int, default = 20)
+    parser.add_argument('--roster', type = int, default = 24)
+    parser.add_argument('--fratio', type = float, default = 0.5)
+    parser.add_argument('--seed', type = int, default = None)
+    args = parser.parse_args()
+    print(make_tournament(args.directory, args.games, args.points, args.roster, args.fratio, args.seed))
@@ -0,0 +1,56 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fxns
+import synthetic
+
+
+def load(directory, **kwargs):
+    """
+    Function : Writes a synthetic tournament to directory and reads it back with fxns.readdata,
+    which reads the game files relative to the working directory.
+
+    Outputs:
+        filename, overviews, pitchtimes, roster
+    """
+    filename = synthetic.make_tournament(str(directory), **kwargs)
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        return (filename,) + fxns.readdata(filename)
+    finally:
+        os.chdir(cwd)
+
+def batch(overviews, pitchtimes):
+    """
+    Function : Calculates the season tables from every game at once, for the incremental 
+    and streaming calculations to be checked against.
+
+    Outputs:
+        roster, indstats, GAtotal, genderstats
+    """
+    roster = fxns.merge_roster(pitchtimes)
+    indstats = fxns.calc_indstats(overviews, pitchtimes, roster)
+    GAtotal = fxns.totalgoalassist_list(pitchtimes, overviews)
+    return roster, indstats, GAtotal, fxns.calc_gender_r(GAtotal, overviews, indstats)
+
+@pytest.fixture(scope = 'session')
+def tournament(tmp_path_factory):
+    """
+    A small synthetic tournament: filename, overviews, pitchtimes, roster.
+    """
+    return load(tmp_path_factory.mktemp('tournament'), games = 4, points = 15, roster = 14, seed = 0)
+
+@pytest.fixture
+def make_tournament(tmp_path):
+    """
+    Writes and reads back a synthetic tournament with the given make_tournament arguments.
+    """
+    return lambda **kwargs: load(tmp_path, **kwargs)
+
+@pytest.fixture(autouse = True)
+def no_derived_cache(monkeypatch):
+    monkeypatch.setattr(fxns, 'DERIVED_CACHE', None)
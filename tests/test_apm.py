@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import fxns
+
+
+def test_matches_dense_ridge(tournament):
+    filename, overviews, pitchtimes, roster = tournament
+    lineups = fxns.calc_lineups(overviews, pitchtimes, roster)
+    apm = fxns.calc_apm(lineups, alpha = 5)
+    onpitch = lineups.onpitch().astype(float)
+    situation = pd.get_dummies(lineups.points[['Starting on O/D', 'Gender ratio']].astype(str), drop_first = True, dtype = float)
+    X = np.column_stack([onpitch, np.ones(len(onpitch)), situation.values])
+    penalty = np.r_[np.full(onpitch.shape[1], 5.0), np.zeros(1+situation.shape[1])]
+    coefficients = np.linalg.solve(X.T @ X + np.diag(penalty), X.T @ lineups.scored)
+    expected = pd.Series(coefficients[:onpitch.shape[1]], index = lineups.players)
+    np.testing.assert_allclose(apm.set_index('Name').APM[expected.index], expected)
+    assert (apm['Points Played'].diff().dropna() <= 0).all()
+    indstats = fxns.calc_indstats(overviews, pitchtimes, roster).set_index('Name')
+    assert (apm.set_index('Name')['Points Played'] == indstats['Points Played'][apm.Name].values).all()
+
+def test_recovers_planted_effects():
+    rng = np.random.default_rng(0)
+    n, players = 20000, 14
+    effects = np.zeros(players)
+    effects[[0, 1]], effects[[2, 3]] = 0.1, -0.1
+    onpitch = np.zeros((n, players), dtype = bool)
+    for i in range(n):
+        onpitch[i, rng.choice(players, 7, replace = False)] = True
+    od = rng.choice(['O', 'D'], n)
+    chance = 0.4 + 0.2*(od == 'O') + onpitch @ effects
+    points = pd.DataFrame({'Did we score' : (rng.random(n) < chance).astype(int), 'Starting on O/D' : od,
+                           'Gender ratio' : rng.choice(['F', 'M'], n)})
+    roster = pd.DataFrame({'Name' : ['Player '+str(i) for i in range(players)], 'Gender' : 'F'})
+    apm = fxns.calc_apm(fxns.Lineups(points, np.packbits(onpitch, axis = 1), roster)).set_index('Name').APM[roster.Name]
+    planted = pd.Series(effects - effects.mean(), index = roster.Name)
+    np.testing.assert_allclose(apm - apm.mean(), planted, atol = 0.03)
@@ -0,0 +1,88 @@
+import os
+import pytest
+import numpy as np
+import pandas as pd
+import fxns
+import archive
+
+
+def assert_same(loaded, overviews, pitchtimes, roster):
+    assert list(loaded[0]) == list(overviews)
+    for game in overviews:
+        pd.testing.assert_frame_equal(loaded[0][game], overviews[game])
+        pd.testing.assert_frame_equal(loaded[1][game], pitchtimes[game])
+    pd.testing.assert_frame_equal(loaded[2], roster)
+
+
+def test_round_trip(tournament, tmp_path):
+    filename, overviews, pitchtimes, roster = tournament
+    season = archive.Archive(archive.write_archive(str(tmp_path/'season'), overviews, pitchtimes))
+    assert_same(season.readdata(), overviews, pitchtimes, roster)
+    game = list(overviews)[2]
+    pd.testing.assert_frame_equal(season.game(game)[1], pitchtimes[game])
+
+def test_selected_games(tournament, tmp_path):
+    filename, overviews, pitchtimes, roster = tournament
+    season = archive.Archive(archive.write_archive(str(tmp_path/'season'), overviews, pitchtimes))
+    games = list(overviews)[::-2]
+    loaded = season.readdata(games)
+    assert list(loaded[0]) == games
+    for game in games:
+        pd.testing.assert_frame_equal(loaded[1][game], pitchtimes[game])
+    pd.testing.assert_frame_equal(loaded[2], fxns.merge_roster({game : pitchtimes[game] for game in games}))
+
+def test_onpitch(tournament, tmp_path):
+    filename, overviews, pitchtimes, roster = tournament
+    season = archive.Archive(archive.write_archive(str(tmp_path/'season'), overviews, pitchtimes))
+    for game in overviews:
+        for expected, read in zip(fxns.calc_onpitch(overviews[game], pitchtimes[game]), season.onpitch(game)):
+            np.testing.assert_array_equal(read, expected)
+        np.testing.assert_array_equal(season.column('Did we score', game), overviews[game]['Did we score'].values)
+
+def test_iter_games(tournament, tmp_path):
+    filename, overviews, pitchtimes, roster = tournament
+    season = archive.Archive(archive.write_archive(str(tmp_path/'season'), overviews, pitchtimes))
+    games = list(season.iter_games(chunksize = 3))
+    assert [g[0] for g in games] == list(overviews)
+    for game, overview, pitchtime in games:
+        pd.testing.assert_frame_equal(overview, overviews[game])
+        pd.testing.assert_frame_equal(pitchtime, pitchtimes[game])
+
+def test_replace_leaves_nothing_stale(tournament, tmp_path):
+    filename, overviews, pitchtimes, roster = tournament
+    directory = str(tmp_path/'season')
+    archive.write_archive(directory, overviews, pitchtimes)
+    opened = archive.Archive(directory)
+    # A narrower archive has fewer column arrays, so any left from the first would be stale.
+    narrow = {game : overviews[game].iloc[:, :3] for game in overviews}
+    archive.write_archive(directory, narrow, pitchtimes)
+    assert sorted(os.listdir(tmp_path)) == ['season']
+    fixed = archive._fixed_columns(pitchtimes[list(pitchtimes)[0]])
+    expected = ['index.json', 'cells.npy'] + ['overview-'+str(i)+'.npy' for i in range(3)] + \
+               ['pitchtime-'+str(i)+'.npy' for i in range(len(fixed))]
+    assert sorted(os.listdir(directory)) == sorted(expected)
+    loaded = archive.Archive(directory).readdata()
+    for game in overviews:
+        pd.testing.assert_frame_equal(loaded[0][game], narrow[game])
+    # The archive opened before the replacement still reads the games it was opened with.
+    assert_same(opened.readdata(), overviews, pitchtimes, roster)
+
+def test_will_not_replace_other_directories(tournament, tmp_path):
+    filename, overviews, pitchtimes, roster = tournament
+    directory = tmp_path/'data'
+    directory.mkdir()
+    (directory/'notes.txt').write_text('keep me')
+    with pytest.raises(ValueError):
+        archive.write_archive(str(directory), overviews, pitchtimes)
+    (tmp_path/'file').write_text('keep me too')
+    with pytest.raises(ValueError):
+        archive.write_archive(str(tmp_path/'file'), overviews, pitchtimes)
+    assert (directory/'notes.txt').read_text() == 'keep me'
+    assert (tmp_path/'file').read_text() == 'keep me too'
+    assert sorted(os.listdir(tmp_path)) == ['data', 'file']
+
+def test_empty(tmp_path):
+    season = archive.Archive(archive.write_archive(str(tmp_path/'season'), {}, {}))
+    overviews, pitchtimes, roster = season.readdata()
+    assert overviews == {} and pitchtimes == {} and len(roster) == 0
+    assert list(season.iter_games()) == []
@@ -0,0 +1,22 @@
+import os
+import fxns
+import benchmark
+
+
+def test_benchmark_table(tmp_path):
+    cwd = os.getcwd()
+    table = benchmark.benchmark(games = (1, 2), points = 6, roster = 14, directory = str(tmp_path))
+    assert os.getcwd() == cwd
+    assert fxns.DERIVED_CACHE is None and not fxns.HEADLESS
+    assert list(table.columns) == [(value, n) for value in ['Seconds', 'Peak MB'] for n in [1, 2]]
+    assert 'readdata' in table.index and 'calc_indstats' in table.index
+    assert table.notna().all().all() and (table['Seconds'] > 0).all().all()
+
+def test_temporary_directories_removed(tmp_path, monkeypatch):
+    temporary = tmp_path/'tmp'
+    temporary.mkdir()
+    monkeypatch.setattr(benchmark.tempfile, 'tempdir', str(temporary))
+    benchmark.benchmark(games = (1,), points = 6, roster = 14)
+    benchmark.benchmark(games = (1,), points = 6, roster = 14, directory = str(tmp_path/'kept'))
+    assert os.listdir(temporary) == []
+    assert os.listdir(tmp_path/'kept') == ['1-games']
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+import networkx as nx
+import fxns
+
+
+@pytest.fixture(scope = 'module')
+def season(tournament):
+    filename, overviews, pitchtimes, roster = tournament
+    lineups = fxns.calc_lineups(overviews, pitchtimes, roster)
+    GAtotal = fxns.totalgoalassist_list(pitchtimes, overviews, roster)
+    return lineups, GAtotal, fxns.calc_chemistry(GAtotal, lineups)
+
+
+def test_pairs_match_counts(season):
+    lineups, GAtotal, chemistry = season
+    together = lineups.together()
+    converted = lineups.together(converted = True)
+    GA = GAtotal.apply(fxns.name_of, players = lineups.roster).groupby(['Assists', 'Goals']).size()
+    assert len(chemistry) == (np.triu(together.values, 1) > 0).sum()
+    for row in chemistry.itertuples(index = False):
+        one, two = row[0], row[1]
+        assert row.Together == together.loc[one, two] > 0
+        assert row.Converted == converted.loc[one, two]
+        assert row[5] == GA.get((one, two), 0) and row[6] == GA.get((two, one), 0)
+    assert chemistry.GA.sum() == len(GAtotal)
+
+def test_graph_and_connectors(season):
+    lineups, GAtotal, chemistry = season
+    graph = fxns.chemistry_graph(chemistry, minimum = 2)
+    assert graph.number_of_edges() == (chemistry.GA >= 2).sum()
+    connectors = fxns.calc_connectors(graph)
+    assert set(connectors.index) == set(graph.nodes)
+    strength = pd.concat([chemistry.set_index('Player 1').GA, chemistry.set_index('Player 2').GA])
+    strength = strength[strength >= 2].groupby(level = 0).sum()
+    assert (connectors.Strength.sort_index() == strength.sort_index()).all()
+    assert (connectors.Betweenness.diff().dropna() <= 0).all()
+
+def test_no_edges(season):
+    lineups, GAtotal, chemistry = season
+    graph = fxns.chemistry_graph(chemistry, minimum = 1000)
+    assert len(fxns.calc_connectors(graph)) == 0
+
+def test_disconnected_graph():
+    chemistry = pd.DataFrame({'Player 1' : ['A', 'A', 'B', 'D'], 'Player 2' : ['B', 'C', 'C', 'E'], 'GA' : [2, 1, 1, 3]})
+    connectors = fxns.calc_connectors(fxns.chemistry_graph(chemistry))
+    assert set(connectors.index) == set('ABCDE')
+    whole = fxns.calc_connectors(fxns.chemistry_graph(chemistry[:3]))
+    expected = nx.eigenvector_centrality_numpy(fxns.chemistry_graph(chemistry[:3]), weight = 'weight')
+    np.testing.assert_allclose(whole.Eigenvector[list('ABC')], [expected[p] for p in 'ABC'])
+    np.testing.assert_allclose(connectors.Eigenvector[list('ABC')], whole.Eigenvector[list('ABC')]*np.sqrt(3/5))
+    assert connectors.Eigenvector['D'] == pytest.approx(connectors.Eigenvector['E'])
@@ -0,0 +1,64 @@
+import os
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+import fxns
+
+
+@pytest.fixture(scope = 'module')
+def cube(tournament):
+    filename, overviews, pitchtimes, roster = tournament
+    return fxns.calc_cube(overviews, pitchtimes, roster)
+
+
+def test_query_matches_points(tournament, cube):
+    filename, overviews, pitchtimes, roster = tournament
+    points = fxns.calc_points(overviews)
+    points['Game'] = np.array(list(overviews), dtype = object)[points['Game']]
+    values = [[fxns.ALL]+list(points[d].unique()) for d in fxns.CUBE_DIMENSIONS]
+    for key in itertools.product(*values):
+        selected = points
+        for d, value in zip(fxns.CUBE_DIMENSIONS, key):
+            if value != fxns.ALL:
+                selected = selected[selected[d] == value]
+        stats = cube.query(*key)
+        assert stats.Points == len(selected)
+        assert stats.Converted == selected['Did we score'].sum()
+        assert stats.Possessions == selected['Number of posessions'].sum()
+
+def test_split_matches_genderstats(tournament, cube):
+    filename, overviews, pitchtimes, roster = tournament
+    indstats = fxns.calc_indstats(overviews, pitchtimes, roster)
+    genderstats = fxns.calc_gender_r(fxns.totalgoalassist_list(pitchtimes, overviews), overviews, indstats).set_index('Ratio')
+    split = cube.split('Gender ratio').loc[genderstats.index]
+    assert (split.Points.values == genderstats['Gender ratio'].values).all()
+    for column in ['Converted', 'Conceded', 'F Goals', 'M Goals', 'F Assists', 'M Assists']:
+        np.testing.assert_array_equal(split[column].values, genderstats[column].fillna(0).values)
+
+def test_split_with_filters(cube):
+    split = cube.split(['Gender ratio', 'Gender Called by'], Starting_on_O_D = 'D')
+    for (ratio, caller), row in split.iterrows():
+        assert row.Points == cube.query(od = 'D', ratio = ratio, calledby = caller).Points
+    assert split.Points.sum() == cube.query(od = 'D').Points
+
+def test_unplayed_combination(cube):
+    stats = cube.query(game = 'Nobody')
+    assert stats.Points == 0 and np.isnan(stats.Rate)
+
+def test_load_cube(tournament, monkeypatch):
+    filename, overviews, pitchtimes, roster = tournament
+    monkeypatch.chdir(os.path.dirname(filename))
+    cubefile = os.path.splitext(filename)[0]+'-Cube.csv'
+    cube = fxns.load_cube(filename)
+    assert os.path.exists(cubefile)
+    saved = os.path.getmtime(cubefile)
+    loaded = fxns.load_cube(filename)
+    assert os.path.getmtime(cubefile) == saved
+    pd.testing.assert_frame_equal(loaded.table, cube.table, check_dtype = False, check_index_type = False)
+    # A newer game file makes the cube stale, so it is rebuilt.
+    game = list(overviews)[0]+'-Overview.csv'
+    os.utime(game, (saved+10, saved+10))
+    fxns.load_cube(filename)
+    assert os.path.getmtime(cubefile) > saved
+    os.remove(cubefile)
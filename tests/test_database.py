@@ -0,0 +1,76 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import fxns
+import database
+
+
+@pytest.fixture
+def imported(tournament, tmp_path, monkeypatch):
+    filename, overviews, pitchtimes, roster = tournament
+    monkeypatch.chdir(os.path.dirname(filename))
+    db = str(tmp_path/'archive.db')
+    database.import_games(db, filename, date = '2018-04-14', tournament = 'Spring')
+    return db
+
+
+def test_round_trip(tournament, imported):
+    filename, overviews, pitchtimes, roster = tournament
+    loaded = database.readdata(imported)
+    assert list(loaded[0]) == list(overviews)
+    for game in overviews:
+        pd.testing.assert_frame_equal(loaded[0][game], overviews[game])
+        pd.testing.assert_frame_equal(loaded[1][game], pitchtimes[game])
+    pd.testing.assert_frame_equal(loaded[2], roster)
+
+def test_opponent_filter(tournament, imported):
+    filename, overviews, pitchtimes, roster = tournament
+    games = list(overviews)[1:3]
+    loaded = database.readdata(imported, opponents = games)
+    assert list(loaded[0]) == games
+    for game in games:
+        pd.testing.assert_frame_equal(loaded[1][game], pitchtimes[game])
+
+def test_player_filter(tournament, imported):
+    filename, overviews, pitchtimes, roster = tournament
+    name = roster.Name.iloc[0]
+    played = [game for game in overviews if fxns.calc_onpitch(overviews[game], pitchtimes[game])[0]
+              [(pitchtimes[game].Name == name).values].any()]
+    assert list(database.readdata(imported, players = name)[0]) == played
+    assert database.readdata(imported, players = 'Nobody')[0] == {}
+    assert len(database.readdata(imported, players = 'Nobody')[2]) == 0
+
+def test_date_filter_and_repeat_opponents(tournament, imported):
+    filename, overviews, pitchtimes, roster = tournament
+    database.import_games(imported, filename, date = '2019-05-01', tournament = 'Spring')
+    later = database.readdata(imported, start = '2019-01-01')
+    assert list(later[0]) == list(overviews)
+    both = database.readdata(imported)
+    game = list(overviews)[0]
+    assert list(both[0])[:len(overviews)] == [g+' (2018-04-14)' for g in overviews]
+    pd.testing.assert_frame_equal(both[0][game+' (2019-05-01)'], overviews[game])
+
+def test_reimport_replaces(tournament, imported):
+    filename, overviews, pitchtimes, roster = tournament
+    database.import_games(imported, filename, date = '2018-04-14', tournament = 'Spring')
+    assert list(database.readdata(imported)[0]) == list(overviews)
+
+def test_player_listed_twice(make_tournament, tmp_path, monkeypatch):
+    filename, overviews, pitchtimes, roster = make_tournament(games = 2, points = 10, roster = 14, seed = 5)
+    monkeypatch.chdir(os.path.dirname(filename))
+    # A second, empty row for the first player of the first game, as a stat-taker might leave.
+    game = list(pitchtimes)[0]
+    raw = pd.read_csv(game+'-Pitchtime.csv')
+    extra = raw.iloc[[0]].copy()
+    extra.iloc[0, 2:] = np.nan
+    pd.concat([raw.iloc[:-3], extra, raw.iloc[-3:]]).to_csv(game+'-Pitchtime.csv', index = False)
+    db = str(tmp_path/'twice.db')
+    database.import_games(db, filename)
+    loaded = database.readdata(db)
+    pitchtime = loaded[1][game]
+    assert (pitchtime.Name == roster.Name.iloc[0]).sum() == 2
+    indstats = fxns.calc_indstats(loaded[0], loaded[1], loaded[2])
+    expected = fxns.calc_indstats(overviews, pitchtimes, roster)
+    pd.testing.assert_frame_equal(indstats[expected.columns[2:]].sort_index(),
+                                  expected[expected.columns[2:]].sort_index(), check_dtype = False)
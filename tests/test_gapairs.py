@@ -0,0 +1,51 @@
+import pytest
+import fxns
+
+
+@pytest.fixture
+def marked(tournament):
+    """
+    The first game with a point with two G markers, a scored point with no markers,
+    and a conceded point with a G marker.
+    """
+    filename, overviews, pitchtimes, roster = tournament
+    game = list(overviews)[0]
+    overview, pitchtime = overviews[game], pitchtimes[game].copy()
+    scored = list(overview['Point number'][overview['Did we score'] == 1])
+    conceded = list(overview['Point number'][overview['Did we score'] == 0])
+    twice, none, stray = str(scored[0]), str(scored[1]), str(conceded[0])
+    pitchtime[twice] = pitchtime[twice].where(pitchtime[twice] != '1.0', 'G')
+    pitchtime[none] = pitchtime[none].replace({'G' : '1.0', 'A' : '1.0'})
+    # A point without markers is read as numbers, so it needs room for a text marker.
+    pitchtime[stray] = pitchtime[stray].astype(object)
+    pitchtime.loc[pitchtime[stray].first_valid_index(), stray] = 'G'
+    return {game : overview}, {game : pitchtime}, roster, (int(twice), int(none), int(stray))
+
+
+def test_flags_broken_points(marked):
+    overviews, pitchtimes, roster, (twice, none, stray) = marked
+    GA = fxns.calc_GApairs(overviews, pitchtimes, roster).set_index('Point')
+    overview = list(overviews.values())[0]
+    assert set(GA.index) == set(overview['Point number'][overview['Did we score'] == 1]) | {stray}
+    assert GA.loc[twice, 'G markers'] > 1 and GA.loc[twice, 'A markers'] == 1
+    assert GA.loc[none, 'G markers'] == 0 and GA.loc[none, 'A markers'] == 0
+    assert GA.loc[stray, 'G markers'] == 1 and GA.loc[stray, 'A markers'] == 0
+    assert GA.loc[[twice, none, stray], 'Flagged'].all()
+    # A marker that is missing or duplicated gives -1, a single one still gives its player.
+    assert list(GA.loc[[twice, none], 'Goals']) == [-1, -1] and GA.loc[stray, 'Goals'] >= 0
+    assert list(GA.loc[[none, stray], 'Assists']) == [-1, -1] and GA.loc[twice, 'Assists'] >= 0
+    ok = GA.drop([twice, none, stray])
+    assert not ok.Flagged.any() and (ok.Goals >= 0).all() and (ok.Assists >= 0).all()
+    assert (ok['G markers'] == 1).all() and (ok['A markers'] == 1).all()
+
+def test_totalgoalassist_list_drops_broken_points(marked):
+    overviews, pitchtimes, roster, (twice, none, stray) = marked
+    GAtotal = fxns.totalgoalassist_list(pitchtimes, overviews)
+    points = set(GAtotal.index.get_level_values('Point'))
+    assert not points & {twice, none, stray}
+    GA = fxns.calc_GApairs(overviews, pitchtimes, roster)
+    assert len(GAtotal) == (~GA.Flagged).sum()
+    pitchtime = list(pitchtimes.values())[0]
+    for (game, point), row in GAtotal.apply(fxns.name_of, players = roster).iterrows():
+        assert pitchtime.set_index('Name').loc[row.Goals, str(point)] == 'G'
+        assert pitchtime.set_index('Name').loc[row.Assists, str(point)] == 'A'
@@ -0,0 +1,34 @@
+import os
+import sys
+import json
+import subprocess
+
+# Seconds 'import fxns' may take in a fresh interpreter. It is about 0.3s, nearly all pandas;
+# importing the plotting and graph libraries as well adds over a second.
+IMPORT_BUDGET = 1.0
+
+HEAVY = ['plotly', 'seaborn', 'matplotlib', 'networkx']
+
+SCRIPT = """
+import sys, time, json
+start = time.perf_counter()
+import fxns
+seconds = time.perf_counter() - start
+print(json.dumps({'seconds' : seconds, 'loaded' : [m for m in %r if m in sys.modules]}))
+""" % (HEAVY,)
+
+
+def import_fxns():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', SCRIPT], cwd = root, capture_output = True,
+                            text = True, check = True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_no_heavy_imports():
+    assert import_fxns()['loaded'] == []
+
+def test_import_budget():
+    # Best of three, so one slow start on a busy machine does not fail the test.
+    seconds = min(import_fxns()['seconds'] for _ in range(3))
+    assert seconds < IMPORT_BUDGET, 'import fxns took %.2fs' % seconds
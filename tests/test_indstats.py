@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+import fxns
+
+
+def baseline_indstats(overviews, pitchtimes, roster):
+    """
+    calc_indstats as it was before it was rebuilt on per-game on-pitch matrices,
+    building a dataframe per point. Kept as the reference for the regression test.
+    """
+    indstats = roster.copy()
+    s = ['Points Played', 'Goals','Assists']
+    for column in s:
+        p=np.zeros(len(roster))
+        for game in pitchtimes:
+            p1 = pitchtimes[game][column]
+            p = p+p1
+        indstats[column]=p
+
+    o1 = []
+    o0 = []
+    d1 = []
+    d0 = []
+    for game in overviews:
+        for i in range(len(overviews[game])):
+            r = pitchtimes[game][['Name',str(i+1)]].dropna()
+            r = r.reset_index(drop=True)
+            r.drop(str(i+1), inplace = True, axis = 1)
+
+            if overviews[game]['Did we score'][i]==1:
+                if overviews[game]['Starting on O/D'][i]=='O':
+                    o1.append(r)
+                else:
+                    d1.append(r)
+            else:
+                if overviews[game]['Starting on O/D'][i]=='O':
+                    o0.append(r)
+                else:
+                    d0.append(r)
+
+    o1 = pd.concat(o1)
+    o0 = pd.concat(o0)
+    d1 = pd.concat(d1)
+    d0 = pd.concat(d0)
+
+    a = o1.Name.value_counts().reindex(indstats.Name).fillna(0)
+    indstats['O Converted']=a.tolist()
+
+    a = o0.Name.value_counts().reindex(indstats.Name).fillna(0)
+    indstats['O Conceded']=a.tolist()
+
+    a = d1.Name.value_counts().reindex(indstats.Name).fillna(0)
+    indstats['D Converted']=a.tolist()
+
+    a = d0.Name.value_counts().reindex(indstats.Name).fillna(0)
+    indstats['D Conceded']=a.tolist()
+
+    indstats['O Points'] = indstats['O Converted']+indstats['O Conceded']
+    indstats['D Points'] = indstats['D Converted']+indstats['D Conceded']
+    indstats['Conceded'] = indstats['O Conceded']+indstats['D Conceded']
+    indstats['Converted, not GA']= indstats['Points Played']-(indstats['Goals']+indstats['Assists']+indstats['Conceded'])
+    indstats.sort_values('Points Played', ascending = False, inplace = True)
+
+    return indstats
+
+
+def test_matches_baseline(tournament):
+    filename, overviews, pitchtimes, roster = tournament
+    expected = baseline_indstats(overviews, pitchtimes, roster)
+    pd.testing.assert_frame_equal(fxns.calc_indstats(overviews, pitchtimes, roster), expected)
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_matches_baseline_other_tournaments(make_tournament, seed):
+    filename, overviews, pitchtimes, roster = make_tournament(games = 3, points = 12, roster = 16, seed = seed)
+    expected = baseline_indstats(overviews, pitchtimes, roster)
+    indstats = fxns.calc_indstats(overviews, pitchtimes, roster)
+    # The baseline falls back to floats when a player never had one of the O/D outcomes.
+    pd.testing.assert_frame_equal(indstats, expected, check_dtype = False)
+    for column in ['O Converted', 'O Conceded', 'D Converted', 'D Conceded']:
+        assert indstats[column].dtype == np.int64
+
+def test_counts_add_up(tournament):
+    filename, overviews, pitchtimes, roster = tournament
+    indstats = fxns.calc_indstats(overviews, pitchtimes, roster)
+    points = sum(len(o) for o in overviews.values())
+    # Seven players are on the pitch every point.
+    assert indstats['Points Played'].sum() == 7*points
+    assert (indstats['O Points'] + indstats['D Points'] == indstats['Points Played']).all()
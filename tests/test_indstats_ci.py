@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import fxns
+import report
+
+
+def test_counts_match_indstats(tournament):
+    filename, overviews, pitchtimes, roster = tournament
+    indstats = fxns.calc_indstats(overviews, pitchtimes, roster)
+    ci = fxns.calc_indstats_ci(overviews, pitchtimes, roster, resamples = 200, seed = 0)
+    pd.testing.assert_frame_equal(ci[indstats.columns], indstats)
+
+def test_intervals_contain_estimates(tournament):
+    filename, overviews, pitchtimes, roster = tournament
+    ci = fxns.calc_indstats_ci(overviews, pitchtimes, roster, resamples = 500, seed = 0)
+    for ratio in fxns._RATIOS:
+        defined = ci[ratio].notna()
+        assert (ci[ratio+' low'][defined] <= ci[ratio][defined] + 1e-9).all()
+        assert (ci[ratio][defined] <= ci[ratio+' high'][defined] + 1e-9).all()
+
+def test_reproducible_across_workers(tournament):
+    filename, overviews, pitchtimes, roster = tournament
+    one = fxns.calc_indstats_ci(overviews, pitchtimes, roster, resamples = 2500, seed = 1)
+    two = fxns.calc_indstats_ci(overviews, pitchtimes, roster, resamples = 2500, seed = 1, workers = 2)
+    pd.testing.assert_frame_equal(one, two)
+
+def test_batches_bounded_by_point_count(tournament, monkeypatch):
+    filename, overviews, pitchtimes, roster = tournament
+    points = sum(len(o) for o in overviews.values())
+    sizes = []
+    bootstrap = fxns._bootstrap
+    def record(counts, seed, resamples):
+        sizes.append(resamples)
+        return bootstrap(counts, seed, resamples)
+    monkeypatch.setattr(fxns, '_bootstrap', record)
+    monkeypatch.setattr(fxns, '_BOOTSTRAP_CELLS', 7*points)
+    ci = fxns.calc_indstats_ci(overviews, pitchtimes, roster, resamples = 30, seed = 0)
+    assert sizes == [7, 7, 7, 7, 2]
+    assert ci['Goal rate high'].notna().any()
+
+def test_bootstrap_draws_every_point_count_times():
+    counts = np.ones((40, 1), dtype = np.float32)
+    totals = fxns._bootstrap(counts, np.random.SeedSequence(0), 25)
+    assert (totals[:, 0] == 40).all()
+
+def test_shared_counts_match(monkeypatch):
+    counts = np.random.default_rng(0).random((30, 14), dtype = np.float32)
+    monkeypatch.setattr(fxns, '_shared_counts', None)
+    fxns._share_counts(counts)
+    seed = np.random.SeedSequence(3)
+    np.testing.assert_array_equal(fxns._bootstrap_shared(seed, 5), fxns._bootstrap(counts, seed, 5))
+
+def test_memoized(tournament, tmp_path, monkeypatch):
+    filename, overviews, pitchtimes, roster = tournament
+    monkeypatch.setattr(fxns, 'DERIVED_CACHE', str(tmp_path))
+    monkeypatch.setattr(fxns, 'cachestats', {})
+    first = fxns.calc_indstats_ci(overviews, pitchtimes, roster, resamples = 100, seed = 0)
+    second = fxns.calc_indstats_ci(overviews, pitchtimes, roster, resamples = 100, seed = 0)
+    pd.testing.assert_frame_equal(first, second)
+    assert fxns.cachestats['calc_indstats_ci'] == {'hits' : 1, 'misses' : 1}
+    # The number of workers doesn't change the result, so it shares the cached table.
+    fxns.calc_indstats_ci(overviews, pitchtimes, roster, resamples = 100, seed = 0, workers = 2)
+    assert fxns.cachestats['calc_indstats_ci'] == {'hits' : 2, 'misses' : 1}
+
+def test_report_passes_workers(tournament, monkeypatch):
+    filename, overviews, pitchtimes, roster = tournament
+    calls = []
+    ci = fxns.calc_indstats_ci
+    def record(*args, **kwargs):
+        calls.append(kwargs.get('workers'))
+        return ci(*args, **kwargs)
+    monkeypatch.setattr(fxns, 'calc_indstats_ci', record)
+    report.build_figures(overviews, pitchtimes, roster, resamples = 20, workers = 3)
+    assert calls == [3]
@@ -0,0 +1,44 @@
+import io
+import json
+import pytest
+import fxns
+import instrument
+
+
+def test_records_nested_calls_and_restores(tournament, tmp_path):
+    filename, overviews, pitchtimes, roster = tournament
+    originals = {name : getattr(fxns, name) for name in instrument.public_functions()}
+    trace = str(tmp_path/'trace.json')
+    stream = io.StringIO()
+    with instrument.tracing(trace, stream = stream) as records:
+        GApairs = fxns.calc_GApairs(overviews, pitchtimes, roster)
+    assert {name : getattr(fxns, name) for name in originals} == originals
+
+    calls = {r['Function'] : r for r in records}
+    assert calls['calc_GApairs']['Depth'] == 0 and calls['calc_pointlog']['Depth'] == 1
+    assert calls['calc_GApairs']['Seconds'] >= calls['calc_pointlog']['Seconds']
+    assert calls['calc_GApairs']['Peak MB'] >= 0
+    assert calls['calc_GApairs']['Rows out'] == len(GApairs)
+    assert calls['calc_GApairs']['Rows in'] == sum(map(len, overviews.values())) + \
+                                               sum(map(len, pitchtimes.values())) + len(roster)
+
+    with open(trace) as f:
+        written = json.load(f)
+    assert [r['Function'] for r in written] == ['calc_GApairs'] + \
+           [r['Function'] for r in sorted(records, key = lambda r: r['Start']) if r['Depth'] > 0]
+    assert written[0]['Start'] == 0
+    assert 'calc_GApairs' in stream.getvalue()
+
+def test_without_memory(tournament):
+    filename, overviews, pitchtimes, roster = tournament
+    with instrument.tracing(memory = False, stream = None) as records:
+        fxns.calc_indstats(overviews, pitchtimes, roster)
+    assert records and all(r['Peak MB'] is None for r in records)
+    assert instrument.summary().loc['calc_indstats', 'Calls'] == 1
+
+def test_restores_after_an_error():
+    original = fxns.calc_indstats
+    with pytest.raises(RuntimeError):
+        with instrument.tracing(stream = None):
+            raise RuntimeError
+    assert fxns.calc_indstats is original
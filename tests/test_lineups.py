@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+import fxns
+
+
+@pytest.fixture(scope = 'module')
+def tables(tournament):
+    filename, overviews, pitchtimes, roster = tournament
+    lineups = fxns.calc_lineups(overviews, pitchtimes, roster)
+    onpitch = np.concatenate([pd.DataFrame(fxns.calc_onpitch(overviews[game], pitchtimes[game])[0],
+                                           index = pitchtimes[game].Name.values).reindex(roster.Name, fill_value = False).values.T
+                              for game in overviews])
+    return lineups, onpitch, fxns.calc_indstats(overviews, pitchtimes, roster)
+
+
+def test_by_player_matches_indstats(tables):
+    lineups, onpitch, indstats = tables
+    table = lineups.by_player().loc[indstats.Name]
+    assert (table.Points.values == indstats['Points Played'].values).all()
+    assert (table.Converted.values == (indstats['O Converted'] + indstats['D Converted']).values).all()
+
+def test_onpitch_and_together(tables):
+    lineups, onpitch, indstats = tables
+    np.testing.assert_array_equal(lineups.onpitch(), onpitch)
+    together = onpitch.T.astype(int) @ onpitch.astype(int)
+    np.testing.assert_array_equal(lineups.together().values, together)
+    scored = onpitch[lineups.scored]
+    np.testing.assert_array_equal(lineups.together(converted = True).values, scored.T.astype(int) @ scored.astype(int))
+
+def test_blocks(tables, monkeypatch):
+    lineups, onpitch, indstats = tables
+    mask = lineups.select(od = 'O')
+    expected = [lineups.by_player(), lineups.by_player(mask), lineups.together(), lineups.together(mask, converted = True)]
+    # Blocks of 7 points split the 60 points of the tournament unevenly.
+    monkeypatch.setattr(lineups, 'BLOCK', 7)
+    blocked = [lineups.by_player(), lineups.by_player(mask), lineups.together(), lineups.together(mask, converted = True)]
+    for e, b in zip(expected, blocked):
+        pd.testing.assert_frame_equal(b, e)
+
+@pytest.mark.parametrize('situation', [{}, {'od' : 'D'}, {'ratio' : 'F', 'calledby' : 'U'}, {'games' : [1, 3]}])
+def test_with_players(tables, situation):
+    lineups, onpitch, indstats = tables
+    points = lineups.points
+    expected = onpitch[:, 0] & onpitch[:, 2] & ~onpitch[:, 5]
+    for column, key in [('Gender ratio', 'ratio'), ('Starting on O/D', 'od'), ('Gender Called by', 'calledby')]:
+        if key in situation:
+            expected &= (points[column] == situation[key]).values
+    if 'games' in situation:
+        expected &= points['Game'].isin(situation['games']).values
+    names = list(lineups.players[[0, 2]])
+    selected = lineups.with_players(names, without = lineups.players[5], **situation)
+    np.testing.assert_array_equal(selected, expected)
+    np.testing.assert_array_equal(lineups.with_players([0, 2], without = 5, **situation), expected)
+    conversion = lineups.conversion(names, without = [5], **situation)
+    assert conversion.Points == expected.sum()
+    assert conversion.Converted == lineups.scored[expected].sum()
+
+def test_empty_selection(tables):
+    lineups, onpitch, indstats = tables
+    conversion = lineups.conversion(list(lineups.players[:8]))
+    assert conversion.Points == 0 and np.isnan(conversion.Rate)
@@ -0,0 +1,89 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+import fxns
+import live
+
+
+def records(overview, pitchtime):
+    """
+    Function : Turns a game back into the point records the stat-taker writes.
+    """
+    for i, point in overview.iterrows():
+        column = pitchtime[str(point['Point number'])]
+        record = {c : point[c] for c in ['Deep Space', 'Opponent', 'Starting on O/D', 'Gender ratio',
+                                         'Gender Called by', 'Number of posessions']}
+        record['Players'] = list(pitchtime.Name[column.notna()])
+        for role, mark in [('Goal', 'G'), ('Assist', 'A')]:
+            if (column == mark).any():
+                record[role] = pitchtime.Name[column == mark].iloc[0]
+        for c in ['Midpoint Timeouts', 'Timeouts between points']:
+            if pd.notna(point[c]):
+                record[c] = point[c]
+        yield json.loads(json.dumps(record, default = int))
+
+
+@pytest.fixture
+def game(tournament):
+    filename, overviews, pitchtimes, roster = tournament
+    game = list(overviews)[0]
+    return game, overviews[game], pitchtimes[game], roster
+
+
+def test_matches_readdata(game):
+    name, overview, pitchtime, roster = game
+    livegame = live.LiveGame(name, roster)
+    for i, record in enumerate(records(overview, pitchtime)):
+        livegame.add_point(record)
+        expected = fxns.calc_indstats({name : overview.iloc[:i+1]}, {name : pitchtime}, roster)
+        pd.testing.assert_frame_equal(livegame.indstats(), expected, check_dtype = False)
+    for c in ['Point number', 'Deep Space', 'Opponent', 'Gender ratio', 'Starting on O/D', 'Did we score']:
+        assert list(livegame.overview()[c]) == list(overview[c])
+    for i, expected in enumerate(fxns.calc_onpitch(overview, pitchtime)):
+        read = fxns.calc_onpitch(livegame.overview(), livegame.pitchtime())[i]
+        np.testing.assert_array_equal(read, expected)
+
+def test_unknown_player_joins_the_roster(game):
+    name, overview, pitchtime, roster = game
+    livegame = live.LiveGame(name, roster)
+    record = next(records(overview, pitchtime))
+    record['Players'] = record['Players'][:6] + ['Sub']
+    livegame.add_point(record)
+    assert livegame.roster.Name.iloc[-1] == 'Sub'
+    assert livegame.indstats().set_index('Name').loc['Sub', 'Points Played'] == 1
+
+def test_updates(game):
+    name, overview, pitchtime, roster = game
+    livegame = live.LiveGame(name, roster)
+    record = dict(next(records(overview, pitchtime)), **{'Midpoint Timeouts' : 'U', 'Timeouts between points' : 'T'})
+    updates = livegame.add_point(record)
+    assert [(figure, kind) for figure, kind, update, traces in updates] == \
+           [('events', 'extend')]*2 + [('possessions', 'extend')] + [('events', 'relayout')]*2
+    assert list(updates[-1][2]) == ['shapes[1]']
+
+def test_follow_holds_back_partial_lines(tmp_path):
+    path = str(tmp_path/'points.jsonl')
+    with open(path, 'w') as f:
+        f.write('{"a": 1}\n{"b"')
+    checks = []
+    def stop():
+        checks.append(1)
+        if len(checks) == 1:
+            with open(path, 'a') as f:
+                f.write(': 2}\n')
+        return len(checks) > 1
+    assert list(live.follow(path, poll = 0, stop = stop)) == [{'a' : 1}, {'b' : 2}]
+
+def test_run_writes_dashboard(game, tmp_path):
+    name, overview, pitchtime, roster = game
+    path = str(tmp_path/'points.jsonl')
+    with open(path, 'w') as f:
+        for record in records(overview.iloc[:5], pitchtime):
+            f.write(json.dumps(record)+'\n')
+    livegame = live.run(name, roster, path, str(tmp_path/'dashboard'), poll = 0, stop = lambda: True)
+    assert len(livegame.rows) == 5
+    with open(str(tmp_path/'dashboard'/'updates.js')) as f:
+        lines = f.read().splitlines()
+    assert len(lines) >= 15 and lines[-1].startswith('liveUpdate('+str(len(lines))+',')
+    assert (tmp_path/'dashboard'/'live.htm').exists()
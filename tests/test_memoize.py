@@ -0,0 +1,85 @@
+import os
+import pandas as pd
+import pytest
+import fxns
+
+
+@fxns.memoize
+def doubled(frame, factor=2):
+    doubled.calls += 1
+    return frame*factor
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(fxns, 'DERIVED_CACHE', str(tmp_path))
+    monkeypatch.setattr(fxns, 'cachestats', {})
+    doubled.calls = 0
+    return tmp_path
+
+def entries(directory):
+    return sorted(f for f in os.listdir(directory) if f.endswith('.pkl'))
+
+
+def test_changed_input_misses(cache):
+    frame = pd.DataFrame({'a' : [1, 2, 3]})
+    doubled(frame)
+    pd.testing.assert_frame_equal(doubled(frame.copy()), frame*2)
+    assert doubled.calls == 1
+    changed = frame.copy()
+    changed.loc[1, 'a'] = 5
+    pd.testing.assert_frame_equal(doubled(changed), changed*2)
+    doubled(frame, factor = 3)
+    doubled(frame.rename(columns = {'a' : 'b'}))
+    doubled(frame.astype(float))
+    assert doubled.calls == 5
+    assert fxns.cachestats['doubled'] == {'hits' : 1, 'misses' : 5}
+    assert len(entries(cache)) == 5
+
+def test_changed_code_misses(cache, monkeypatch):
+    frame = pd.DataFrame({'a' : [1, 2, 3]})
+    doubled(frame)
+    monkeypatch.setattr(fxns, '_code_version', lambda: 'edited')
+    doubled(frame)
+    assert doubled.calls == 2 and len(entries(cache)) == 2
+
+def test_unreadable_entry_is_rewritten(cache):
+    frame = pd.DataFrame({'a' : [1, 2, 3]})
+    doubled(frame)
+    [entry] = entries(cache)
+    with open(os.path.join(cache, entry), 'wb') as f:
+        f.write(b'not a pickle')
+    pd.testing.assert_frame_equal(doubled(frame), frame*2)
+    assert doubled.calls == 2 and entries(cache) == [entry]
+    pd.testing.assert_frame_equal(doubled(frame), frame*2)
+    assert doubled.calls == 2
+    assert not [f for f in os.listdir(cache) if f.endswith('.tmp')]
+
+def test_evicts_least_recently_used(cache, monkeypatch):
+    frames = [pd.DataFrame({'a' : range(1000)})+i for i in range(4)]
+    for frame in frames:
+        doubled(frame)
+    files = [os.path.join(cache, f) for f in entries(cache)]
+    size = max(os.path.getsize(f) for f in files)
+    # Space them out in time, oldest first, then use the first one again.
+    for i, frame in enumerate(frames):
+        path = [f for f in files if pd.read_pickle(f).equals(frame*2)][0]
+        os.utime(path, ns = (i*10**9, i*10**9))
+    doubled(frames[0])
+    monkeypatch.setattr(fxns, 'DERIVED_CACHE_SIZE', 3*size)
+    doubled(frames[0]+10)
+    # Of the five, the two used longest ago go: frames 1 and 2.
+    kept = [pd.read_pickle(os.path.join(cache, f)) for f in entries(cache)]
+    assert len(kept) == 3
+    for frame, expected in [(frames[0], True), (frames[1], False), (frames[2], False), (frames[3], True), (frames[0]+10, True)]:
+        assert any(k.equals(frame*2) for k in kept) == expected
+
+def test_evict_directly(tmp_path):
+    for i, name in enumerate(['c', 'a', 'b']):
+        path = tmp_path/(name+'.pkl')
+        path.write_bytes(b'x'*100)
+        os.utime(path, ns = (i*10**9, i*10**9))
+    (tmp_path/'other.txt').write_bytes(b'x'*1000)
+    fxns._evict(str(tmp_path), 250)
+    assert sorted(os.listdir(tmp_path)) == ['a.pkl', 'b.pkl', 'other.txt']
+    fxns._evict(str(tmp_path), 1000)
+    assert sorted(os.listdir(tmp_path)) == ['a.pkl', 'b.pkl', 'other.txt']
@@ -0,0 +1,52 @@
+import itertools
+import numpy as np
+import pytest
+import fxns
+
+
+def brute_force(lineups, od, ratio, k, available, chemistry):
+    player, pair = fxns.calc_line_scores(lineups, od, ratio)
+    gender = lineups.roster.set_index('Name').Gender
+    women = [p for p in available if gender[p] == 'F']
+    men = [p for p in available if gender[p] == 'M']
+    nf = 4 if ratio == 'F' else 3
+    scores = []
+    for f in itertools.combinations(women, nf):
+        for m in itertools.combinations(men, 7-nf):
+            line = list(f+m)
+            chem = pair.loc[line, line].values.sum()/2
+            scores.append(player[line].sum() + chemistry*chem)
+    return sorted(scores, reverse = True)[:k]
+
+
+@pytest.fixture(scope = 'module')
+def lineups(tournament):
+    filename, overviews, pitchtimes, roster = tournament
+    return fxns.calc_lineups(overviews, pitchtimes, roster)
+
+@pytest.mark.parametrize('od, ratio, chemistry', [('O', 'F', 1.0), ('D', 'M', 1.0), ('O', 'M', 0.0), ('D', 'F', 3.0)])
+def test_matches_brute_force(lineups, od, ratio, chemistry):
+    available = list(lineups.roster.Name)
+    lines = fxns.best_lines(lineups, od, ratio, k = 5, chemistry = chemistry)
+    expected = brute_force(lineups, od, ratio, 5, available, chemistry)
+    np.testing.assert_allclose(lines.Score.values, expected)
+    gender = lineups.roster.set_index('Name').Gender
+    for line in lines.Players:
+        assert len(set(line)) == 7
+        assert (gender[line] == 'F').sum() == (4 if ratio == 'F' else 3)
+
+def test_available_subset(lineups):
+    available = list(lineups.roster.Name[:11])
+    lines = fxns.best_lines(lineups, 'O', 'F', k = 3, available = available)
+    expected = brute_force(lineups, 'O', 'F', 3, available, 1.0)
+    np.testing.assert_allclose(lines.Score.values, expected)
+    assert all(p in available for line in lines.Players for p in line)
+
+def test_too_few_players(lineups):
+    women = list(lineups.roster.Name[lineups.roster.Gender == 'F'][:3])
+    assert len(fxns.best_lines(lineups, 'O', 'F', available = women)) == 0
+
+def test_unknown_player(lineups):
+    available = list(lineups.roster.Name) + ['Nobody']
+    with pytest.raises(ValueError, match = 'Nobody'):
+        fxns.best_lines(lineups, 'O', 'F', available = available)
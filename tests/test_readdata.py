@@ -0,0 +1,77 @@
+import os
+import pandas as pd
+import pytest
+import fxns
+
+
+@pytest.fixture
+def games(make_tournament, monkeypatch):
+    filename, overviews, pitchtimes, roster = make_tournament(games = 3, points = 8, roster = 14, seed = 6)
+    monkeypatch.chdir(os.path.dirname(filename))
+    return filename, overviews, pitchtimes, roster
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """
+    Records the csv files read, other than the tournament file.
+    """
+    files = []
+    read_csv = pd.read_csv
+    def record(path, *args, **kwargs):
+        if not str(path).endswith('tournament.csv'):
+            files.append(os.path.basename(str(path)))
+        return read_csv(path, *args, **kwargs)
+    monkeypatch.setattr(pd, 'read_csv', record)
+    return files
+
+
+def test_cache_reparses_only_changed_games(games, parsed, tmp_path):
+    filename, overviews, pitchtimes, roster = games
+    cachedir = str(tmp_path/'cache')
+    first = fxns.readdata(filename, cachedir)
+    assert len(parsed) == 6
+    del parsed[:]
+    second = fxns.readdata(filename, cachedir)
+    assert parsed == []
+    for game in overviews:
+        pd.testing.assert_frame_equal(second[0][game], first[0][game])
+        pd.testing.assert_frame_equal(second[1][game], first[1][game])
+
+    # Touching one game's file, or changing it, parses just that game again.
+    game = list(overviews)[1]
+    stat = os.stat(game+'-Overview.csv')
+    os.utime(game+'-Overview.csv', ns = (stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    fxns.readdata(filename, cachedir)
+    assert sorted(parsed) == [game+'-Overview.csv', game+'-Pitchtime.csv']
+    overview = pd.read_csv(game+'-Overview.csv')
+    overview.loc[0, 'Number of posessions'] = 99
+    overview.to_csv(game+'-Overview.csv', index = False)
+    del parsed[:]
+    third = fxns.readdata(filename, cachedir)
+    assert sorted(parsed) == [game+'-Overview.csv', game+'-Pitchtime.csv']
+    assert third[0][game].loc[0, 'Number of posessions'] == 99
+    assert len(os.listdir(cachedir)) == len(overviews)
+
+def test_no_cache_by_default(games, parsed):
+    filename, overviews, pitchtimes, roster = games
+    fxns.readdata(filename)
+    fxns.readdata(filename)
+    assert len(parsed) == 12
+    assert not os.path.exists('.ultimate_cache')
+
+def test_roster_merged_from_every_game(games):
+    filename, overviews, pitchtimes, roster = games
+    # The first player misses the first game, and a new player only plays the last.
+    names = list(overviews)
+    pitchtime = pd.read_csv(names[0]+'-Pitchtime.csv')
+    pitchtime.iloc[1:].to_csv(names[0]+'-Pitchtime.csv', index = False)
+    pitchtime = pd.read_csv(names[2]+'-Pitchtime.csv')
+    extra = pitchtime.iloc[[0]].copy()
+    extra.iloc[0, :2] = ['F', 'Newcomer']
+    extra.iloc[0, 2:] = float('nan')
+    pd.concat([pitchtime.iloc[:-3], extra, pitchtime.iloc[-3:]]).to_csv(names[2]+'-Pitchtime.csv', index = False)
+
+    overviews, pitchtimes, merged = fxns.readdata(filename)
+    assert list(merged.Name) == list(roster.Name[1:]) + [roster.Name.iloc[0], 'Newcomer']
+    assert merged.set_index('Name').Gender['Newcomer'] == 'F'
+    assert merged.Name.is_unique and list(merged.index) == [str(i) for i in range(len(merged))]
@@ -0,0 +1,90 @@
+import os
+import pandas as pd
+import pytest
+import fxns
+
+
+@pytest.fixture
+def registry():
+    registry = fxns.PlayerRegistry()
+    registry.register(pd.DataFrame({'Name' : ['Smatt', 'Ange', 'Matt S'], 'Gender' : ['M', 'F', 'M']}))
+    return registry
+
+
+def test_stable_ids(registry):
+    assert list(registry.ids(['Smatt', 'Ange', 'Matt S', 'Nobody'])) == [0, 1, 2, -1]
+    registry.register(pd.DataFrame({'Name' : ['Ange', 'New'], 'Gender' : ['F', 'F']}))
+    assert list(registry.ids(['Smatt', 'New'])) == [0, 3]
+
+def test_alias_merges_registered_player(registry):
+    registry.add_alias('Matt S', 'Smatt')
+    assert list(registry.ids(['Matt S', 'Smatt'])) == [0, 0]
+    assert list(registry.roster().Name) == ['Smatt', 'Ange']
+    assert list(registry.canonical(['Matt S', 'Ange', 'Unknown'])) == ['Smatt', 'Ange', 'Unknown']
+
+def test_repointing_alias_keeps_players(registry):
+    registry.add_alias('Ange', 'Smatt')
+    registry.add_alias('Ange', 'Matt S')
+    assert list(registry.roster().Name) == ['Smatt', 'Matt S']
+    assert list(registry.ids(['Ange', 'Smatt', 'Matt S'])) == [2, 0, 2]
+
+def test_alias_of_own_name(registry):
+    registry.add_alias('Smatt', 'Smatt')
+    registry.add_alias('Ange', 'Smatt')
+    registry.add_alias('Smatt', 'Ange')
+    assert list(registry.ids(['Smatt', 'Ange', 'Matt S'])) == [0, 0, 2]
+    assert list(registry.roster().Name) == ['Smatt', 'Matt S']
+
+def test_alias_of_unknown_player(registry):
+    with pytest.raises(KeyError):
+        registry.add_alias('Someone', 'Nobody')
+
+def test_save_and_load(registry, tmp_path):
+    registry.add_alias('Ange', 'Smatt')
+    registry.add_alias('Smatty', 'Smatt')
+    filename = str(tmp_path/'players.csv')
+    registry.save(filename)
+    loaded = fxns.PlayerRegistry(filename)
+    pd.testing.assert_frame_equal(loaded.roster(), registry.roster(), check_dtype = False)
+    assert loaded.aliases == registry.aliases
+
+def test_readdata_with_registry(tournament, tmp_path, monkeypatch):
+    filename, overviews, pitchtimes, roster = tournament
+    registry = fxns.PlayerRegistry(str(tmp_path/'players.csv'))
+    registry.register(pd.DataFrame({'Name' : ['P1'], 'Gender' : ['M']}))
+    registry.add_alias('Player 01', 'P1')
+    monkeypatch.chdir(os.path.dirname(filename))
+    overviews, pitchtimes, merged = fxns.readdata(filename, registry = registry)
+    assert 'Player 01' not in set(merged.Name) and 'P1' in set(merged.Name)
+    assert all('Player 01' not in set(p.Name) for p in pitchtimes.values())
+    assert (merged.ID.values == registry.ids(merged.Name)).all()
+    assert merged.ID.is_unique
+    saved = fxns.PlayerRegistry(registry.filename)
+    assert saved.aliases == {'Player 01' : 0}
+    assert len(saved.roster()) == len(roster)
+
+def test_gender_and_name_of():
+    players = pd.DataFrame({'ID' : [4, 9], 'Name' : ['A', 'B'], 'Gender' : ['F', 'M']})
+    ids = pd.Series([9, 2, 4], index = [5, 6, 7])
+    genders = fxns.gender_of(ids, players)
+    names = fxns.name_of(ids, players)
+    assert list(genders.index) == [5, 6, 7] and list(names.index) == [5, 6, 7]
+    assert genders[5] == 'M' and genders[7] == 'F' and pd.isna(genders[6])
+    assert names[5] == 'B' and names[7] == 'A' and pd.isna(names[6])
+
+def test_tables_keyed_on_registry_ids(tournament, tmp_path, monkeypatch):
+    filename, overviews, pitchtimes, roster = tournament
+    registry = fxns.PlayerRegistry()
+    # Registry IDs that are not roster positions, so a lookup by position would go wrong.
+    registry.register(pd.DataFrame({'Name' : ['Nobody '+str(i) for i in range(5)]+list(roster.Name[::-1]), 
+                                    'Gender' : ['F']*5+list(roster.Gender[::-1])}))
+    monkeypatch.chdir(os.path.dirname(filename))
+    overviews, pitchtimes, merged = fxns.readdata(filename, registry = registry)
+    GAtotal = fxns.totalgoalassist_list(pitchtimes, overviews, merged)
+    expected = fxns.totalgoalassist_list(pitchtimes, overviews)
+    assert set(GAtotal.Goals) <= set(merged.ID) and not set(GAtotal.Goals) <= set(range(len(merged)))
+    pd.testing.assert_frame_equal(GAtotal.apply(fxns.name_of, players = merged), 
+                                  expected.apply(fxns.name_of, players = roster))
+    indstats = fxns.calc_indstats(overviews, pitchtimes, merged)
+    pd.testing.assert_frame_equal(fxns.calc_gender_r(GAtotal, overviews, indstats), 
+                                  fxns.calc_gender_r(expected, overviews, fxns.calc_indstats(overviews, pitchtimes, roster)))
@@ -0,0 +1,66 @@
+import os
+import re
+import builtins
+import fxns
+import report
+
+
+def without_ids(html):
+    """
+    Function : Replaces the random ids plotly gives each div with their order of appearance.
+    """
+    ids = {}
+    for i in re.findall(r'<div id="([^"]+)" class="plotly-graph-div"', html):
+        ids.setdefault(i, 'div'+str(len(ids)))
+    return re.sub('|'.join(map(re.escape, ids)), lambda m: ids[m.group(0)], html) if ids else html
+
+
+def test_workers_give_the_same_report(tournament, tmp_path, monkeypatch):
+    filename, overviews, pitchtimes, roster = tournament
+    monkeypatch.chdir(os.path.dirname(filename))
+    writes = []
+    def record(path, mode = 'r', *args, **kwargs):
+        if 'w' in mode:
+            writes.append(os.path.basename(str(path)))
+        return builtins.open(path, mode, *args, **kwargs)
+    monkeypatch.setattr(report, 'open', record, raising = False)
+
+    one = report.build_report(filename, str(tmp_path/'one.htm'), workers = 1, resamples = 50)
+    two = report.build_report(filename, str(tmp_path/'two.htm'), workers = 2, resamples = 50)
+    assert writes == ['one.htm', 'two.htm']
+    with open(str(tmp_path/'two.htm')) as f:
+        assert f.read() == two
+    assert 'div0' in without_ids(one) and without_ids(one) == without_ids(two)
+
+    # Headless builds open nothing, and the settings are put back afterwards.
+    assert not os.path.exists('temp-plot.html')
+    assert fxns.HEADLESS is False and fxns.DERIVED_CACHE is None
+
+def test_divs_in_report_order(tournament, tmp_path, monkeypatch):
+    filename, overviews, pitchtimes, roster = tournament
+    monkeypatch.setattr(fxns, 'HEADLESS', True)
+    figures = report.build_figures(overviews, pitchtimes, roster, resamples = 20)
+    divs = report.render_figures(figures, workers = 2)
+    assert list(divs) == list(figures)
+    for name, div in divs.items():
+        assert 'plotly-graph-div' in div
+    # Each game's events figure carries its own title.
+    for game in overviews:
+        assert game in divs['events '+game]
+    html = report.assemble(divs, list(overviews), 'Title')
+    positions = [html.index(divs['events '+game]) for game in overviews]
+    assert positions == sorted(positions)
+
+def test_render_headless(monkeypatch):
+    calls = []
+    class Offline:
+        def plot(self, fig, **kwargs):
+            calls.append(kwargs)
+            return '<div>'
+    monkeypatch.setattr(fxns, 'offline', Offline())
+    monkeypatch.setattr(fxns, 'HEADLESS', True)
+    assert fxns.render({}) == '<div>'
+    assert calls == [{'include_plotlyjs' : False, 'output_type' : 'div'}]
+    monkeypatch.setattr(fxns, 'HEADLESS', False)
+    fxns.render({})
+    assert calls[1] == {}
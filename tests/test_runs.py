@@ -0,0 +1,59 @@
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+import fxns
+
+
+@pytest.fixture
+def overviews(make_tournament):
+    return make_tournament(games = 6, points = 20, roster = 14, seed = 2)[1]
+
+
+def test_runs_match_groupby(overviews):
+    expected = []
+    for game, overview in overviews.items():
+        rows = list(overview[['Point number', 'Did we score', 'Starting on O/D']].itertuples(index = False))
+        for scored, run in itertools.groupby(rows, key = lambda r: r[1]):
+            run = list(run)
+            expected.append({'Game' : game, 'Team' : 'Deep Space' if scored == 1 else 'Opponent',
+                             'Start' : run[0][0], 'End' : run[-1][0], 'Length' : len(run),
+                             'Breaks' : sum((r[2] == 'D') == (scored == 1) for r in run)})
+    expected = pd.DataFrame(expected)
+    runs = fxns.calc_runs(overviews)
+    pd.testing.assert_frame_equal(runs, expected, check_dtype = False)
+    long = fxns.calc_runs(overviews, minimum = 3)
+    pd.testing.assert_frame_equal(long, expected[expected.Length >= 3].reset_index(drop = True), check_dtype = False)
+
+def test_momentum(overviews):
+    momentum = fxns.calc_momentum(overviews)
+    assert list(momentum.index) == list(overviews)
+    runs = fxns.calc_runs(overviews)
+    for game, overview in overviews.items():
+        scored = overview['Did we score'] == 1
+        onO = overview['Starting on O/D'] == 'O'
+        row = momentum.loc[game]
+        assert (row.Holds, row.Breaks) == ((scored & onO).sum(), (scored & ~onO).sum())
+        assert (row['Opponent Holds'], row['Opponent Breaks']) == ((~scored & ~onO).sum(), (~scored & onO).sum())
+        mine = runs[(runs.Game == game) & (runs.Team == 'Deep Space')].Length
+        assert row['Longest run'] == (mine.max() if len(mine) else 0)
+
+@pytest.mark.parametrize('n', [1, 3])
+def test_timeout_effects(overviews, n):
+    effects = fxns.calc_timeout_effects(overviews, n)
+    expected = []
+    for game, overview in overviews.items():
+        scored = list(overview['Did we score'])
+        for column, x, kind in [('Midpoint Timeouts', 'Point number', 'Midpoint'),
+                                ('Timeouts between points', 'Events between points', 'Between points')]:
+            for called, position in overview[[column, x]].dropna().itertuples(index = False):
+                # Points are numbered from 1, so the first point after the timeout is at ceil(x)-1.
+                first = int(np.ceil(position)) - 1
+                before, after = scored[max(first-n, 0):first], scored[first:first+n]
+                expected.append((game, called, kind, len(before), len(after),
+                                 np.mean(before) if before else np.nan, np.mean(after) if after else np.nan))
+    assert len(expected) > 0
+    columns = ['Game', 'Called', 'Kind', 'Points before', 'Points after', 'Before', 'After']
+    expected = pd.DataFrame(expected, columns = columns)
+    pd.testing.assert_frame_equal(effects[columns], expected, check_dtype = False)
+    np.testing.assert_allclose(effects.Effect, expected.After - expected.Before)
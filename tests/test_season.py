@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+import fxns
+from conftest import batch
+
+
+def assert_matches(season, overviews, pitchtimes):
+    roster, indstats, GAtotal, genderstats = batch(overviews, pitchtimes)
+    pd.testing.assert_frame_equal(season.roster(), roster)
+    pd.testing.assert_frame_equal(season.indstats(), indstats)
+    pd.testing.assert_frame_equal(season.GAtotal(), GAtotal)
+    pd.testing.assert_frame_equal(season.genderstats(), genderstats)
+
+
+@pytest.fixture
+def season(tournament):
+    filename, overviews, pitchtimes, roster = tournament
+    season = fxns.SeasonStats()
+    for game in overviews:
+        season.add_game(game, overviews[game], pitchtimes[game])
+    return season
+
+
+def test_matches_batch_after_every_game(tournament):
+    filename, overviews, pitchtimes, roster = tournament
+    season = fxns.SeasonStats()
+    for i, game in enumerate(overviews):
+        season.add_game(game, overviews[game], pitchtimes[game])
+        games = list(overviews)[:i+1]
+        assert_matches(season, {g : overviews[g] for g in games}, {g : pitchtimes[g] for g in games})
+
+def test_remove_and_add_again(tournament, season):
+    filename, overviews, pitchtimes, roster = tournament
+    game = list(overviews)[1]
+    season.remove_game(game)
+    rest = [g for g in overviews if g != game]
+    assert_matches(season, {g : overviews[g] for g in rest}, {g : pitchtimes[g] for g in rest})
+    season.add_game(game, overviews[game], pitchtimes[game])
+    games = rest + [game]
+    assert_matches(season, {g : overviews[g] for g in games}, {g : pitchtimes[g] for g in games})
+
+def test_replace_keeps_place(tournament, season):
+    filename, overviews, pitchtimes, roster = tournament
+    games = list(overviews)
+    # A corrected version of the second game, with the goal and assist of a point swapped round.
+    game = games[1]
+    point = str(overviews[game]['Point number'][overviews[game]['Did we score'] == 1].iloc[0])
+    pitchtime = pitchtimes[game].copy()
+    pitchtime[point] = pitchtime[point].replace({'G' : 'A', 'A' : 'G'})
+    season.add_game(game, overviews[game], pitchtime)
+    assert list(season.games) == games
+    assert_matches(season, overviews, dict(pitchtimes, **{game : pitchtime}))
+    assert not season.indstats().equals(batch(overviews, pitchtimes)[1])
+
+def test_tied_ratios_keep_first_appearance(make_tournament):
+    filename, overviews, pitchtimes, roster = make_tournament(games = 2, points = 20, roster = 14, seed = 1)
+    # As many F points as M points, with M first in every game.
+    for game in overviews:
+        overviews[game] = overviews[game].copy()
+        overviews[game]['Gender ratio'] = ['M', 'F']*10
+        pitchtimes[game] = pitchtimes[game].copy()
+    assert list(batch(overviews, pitchtimes)[3].Ratio) == ['M', 'F']
+    season = fxns.SeasonStats()
+    for game in overviews:
+        season.add_game(game, overviews[game], pitchtimes[game])
+    assert_matches(season, overviews, pitchtimes)
+    games = list(overviews)
+    season.remove_game(games[0])
+    season.add_game(games[0], overviews[games[0]], pitchtimes[games[0]])
+    season.add_game(games[1], overviews[games[1]], pitchtimes[games[1]])
+    assert_matches(season, {g : overviews[g] for g in games[::-1]}, {g : pitchtimes[g] for g in games[::-1]})
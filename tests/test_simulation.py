@@ -0,0 +1,56 @@
+import functools
+import pandas as pd
+import pytest
+import fxns
+
+
+def win_probability(rates, target, ostart, fratio, ucalls):
+    """
+    Function : Exact chance of winning, by recursion over the score and who starts on O.
+    """
+    table = rates['Rate'].values.reshape(2, 2, 2)
+    chance = [sum(table[od, r, c]*(fratio if r == 0 else 1-fratio)*(ucalls if c == 0 else 1-ucalls)
+                  for r in range(2) for c in range(2)) for od in range(2)]
+    @functools.lru_cache(None)
+    def win(us, them, od):
+        if us == target or them == target:
+            return float(us == target)
+        return chance[od]*win(us+1, them, 1) + (1-chance[od])*win(us, them+1, 0)
+    return ostart*win(0, 0, 0) + (1-ostart)*win(0, 0, 1)
+
+
+@pytest.fixture(scope = 'module')
+def rates(tournament):
+    filename, overviews, pitchtimes, roster = tournament
+    return fxns.calc_situation_rates(overviews)
+
+
+def test_situation_rates(tournament, rates):
+    filename, overviews, pitchtimes, roster = tournament
+    points = fxns.calc_points(overviews)
+    assert rates.Points.sum() == len(points)
+    counts = points.groupby(fxns._SITUATION)['Did we score'].agg(['size', 'sum'])
+    for situation, row in counts.iterrows():
+        assert rates.loc[situation, 'Points'] == row['size'] and rates.loc[situation, 'Converted'] == row['sum']
+    assert list(rates.index.get_level_values(0).unique()) == ['O', 'D']
+
+def test_games_end_at_target(rates):
+    sims = fxns.simulate_games(rates, games = 2000, target = 7, seed = 0)
+    assert ((sims['Deep Space'] == 7) ^ (sims['Opponent'] == 7)).all()
+    assert (sims.Points == sims['Deep Space'] + sims.Opponent).all()
+    assert (sims.Won == (sims['Deep Space'] == 7)).all()
+    pd.testing.assert_frame_equal(sims, fxns.simulate_games(rates, games = 2000, target = 7, seed = 0))
+    assert fxns.calc_score_distribution(sims).values.sum() == pytest.approx(1)
+
+@pytest.mark.parametrize('ostart, fratio, ucalls', [(0.5, 0.5, 0.5), (1.0, 0.2, 0.9), (0.0, 0.8, 0.1)])
+def test_win_probability_matches_exact(rates, ostart, fratio, ucalls):
+    sims = fxns.simulate_games(rates, games = 40000, target = 9, ostart = ostart, fratio = fratio, ucalls = ucalls, seed = 1)
+    exact = win_probability(rates, 9, ostart, fratio, ucalls)
+    # Well within four standard errors of 40000 games.
+    assert fxns.calc_simulation_summary(sims)['Win probability'] == pytest.approx(exact, abs = 0.01)
+
+def test_sweep(rates):
+    sweep = fxns.sweep_strategies(rates, ostart = (0.0, 1.0), fratio = (0.3, 0.7), games = 500, target = 5, seed = 2)
+    assert len(sweep) == 4 and list(sweep.ostart) == [0.0, 0.0, 1.0, 1.0]
+    expected = fxns.calc_simulation_summary(fxns.simulate_games(rates, 500, 5, 1.0, 0.7, None, 2))
+    pd.testing.assert_series_equal(sweep.iloc[3][expected.index], expected, check_names = False, check_dtype = False)
@@ -0,0 +1,53 @@
+import os
+import pandas as pd
+import pytest
+import fxns
+import archive
+from conftest import batch
+
+
+def assert_tables_equal(found, expected):
+    for a, b in zip(found, expected):
+        pd.testing.assert_frame_equal(a, b)
+
+
+def test_iter_games_matches_readdata(tournament, monkeypatch):
+    filename, overviews, pitchtimes, roster = tournament
+    monkeypatch.chdir(os.path.dirname(filename))
+    games = list(fxns.iter_games(filename))
+    assert [g[0] for g in games] == list(overviews)
+    for game, overview, pitchtime in games:
+        pd.testing.assert_frame_equal(overview, overviews[game])
+        pd.testing.assert_frame_equal(pitchtime, pitchtimes[game])
+
+@pytest.mark.parametrize('chunksize', [1, 3, 50])
+def test_stream_matches_batch(tournament, chunksize):
+    filename, overviews, pitchtimes, roster = tournament
+    games = [(game, overviews[game], pitchtimes[game]) for game in overviews]
+    assert_tables_equal(fxns.calc_stream(games, chunksize), batch(overviews, pitchtimes))
+
+def test_repeat_opponents_across_files(tournament, monkeypatch):
+    filename, overviews, pitchtimes, roster = tournament
+    monkeypatch.chdir(os.path.dirname(filename))
+    pd.DataFrame({'Opponent' : list(overviews)[:2]}).to_csv('rematch.csv', index = False)
+    try:
+        games = list(fxns.iter_games([filename, 'rematch.csv']))
+    finally:
+        os.remove('rematch.csv')
+    names = [g[0] for g in games]
+    assert names == list(overviews) + [g+' (rematch)' for g in list(overviews)[:2]]
+    found = fxns.calc_stream(iter(games), chunksize = 2)
+    assert_tables_equal(found, batch({g[0] : g[1] for g in games}, {g[0] : g[2] for g in games}))
+
+def test_from_archive(tournament, tmp_path):
+    filename, overviews, pitchtimes, roster = tournament
+    season = archive.Archive(archive.write_archive(str(tmp_path/'season'), overviews, pitchtimes))
+    assert_tables_equal(fxns.calc_stream(season.iter_games(chunksize = 3), chunksize = 2), batch(overviews, pitchtimes))
+
+def test_errors(tournament):
+    filename, overviews, pitchtimes, roster = tournament
+    game = list(overviews)[0]
+    with pytest.raises(ValueError):
+        fxns.calc_stream([(game, overviews[game], pitchtimes[game])]*2, chunksize = 1)
+    with pytest.raises(ValueError):
+        fxns.calc_stream([])
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+import fxns
+import synthetic
+
+
+@pytest.fixture
+def game():
+    names = np.array(['Player '+str(i) for i in range(14)], dtype = object)
+    genders = np.array(['F' if i % 2 else 'M' for i in range(14)], dtype = object)
+    overview, pitchtime = synthetic.make_game(np.random.default_rng(3), names, genders, points = 40)
+    return overview, pitchtime.iloc[:-3]
+
+
+def test_lines_follow_the_gender_ratio(game):
+    overview, pitchtime = game
+    cells = pitchtime[[str(i+1) for i in range(len(overview))]].values
+    onpitch = cells != ''
+    assert (onpitch.sum(axis = 0) == 7).all()
+    women = (onpitch & (pitchtime.Gender.values == 'F')[:, None]).sum(axis = 0)
+    assert (women == np.where(overview['Gender ratio'] == 'F', 4, 3)).all()
+
+def test_goals_and_assists_on_scored_points(game):
+    overview, pitchtime = game
+    cells = pitchtime[[str(i+1) for i in range(len(overview))]].values
+    scored = overview['Did we score'].values
+    assert ((cells == 'G').sum(axis = 0) == scored).all()
+    assert ((cells == 'A').sum(axis = 0) == scored).all()
+    assert (pitchtime.Goals.values == (cells == 'G').sum(axis = 1)).all()
+    assert (pitchtime['Points Played'].values == (cells != '').sum(axis = 1)).all()
+
+def test_scores_and_pulls(game):
+    overview, pitchtime = game
+    scored = overview['Did we score'].values
+    assert (overview['Deep Space'].values == np.cumsum(scored)).all()
+    assert (overview['Opponent'].values == np.cumsum(1-scored)).all()
+    # The team that scored pulls, so the next point starts on D after a goal.
+    od = overview['Starting on O/D'].values
+    assert (od[1:] == np.where(scored[:-1] == 1, 'D', 'O')).all()
+
+def test_reproducible(tmp_path):
+    first = synthetic.make_tournament(str(tmp_path/'a'), games = 2, points = 8, roster = 10, seed = 4)
+    second = synthetic.make_tournament(str(tmp_path/'b'), games = 2, points = 8, roster = 10, seed = 4)
+    for name in ['Team 1-Overview.csv', 'Team 2-Pitchtime.csv']:
+        assert (tmp_path/'a'/name).read_text() == (tmp_path/'b'/name).read_text()
+
+def test_readdata_reads_it(tournament):
+    filename, overviews, pitchtimes, roster = tournament
+    assert len(overviews) == 4 and len(roster) == 14
+    for game in overviews:
+        assert len(overviews[game]) == 15
+        assert len(pitchtimes[game]) == 14
+    indstats = fxns.calc_indstats(overviews, pitchtimes, roster)
+    assert indstats['Points Played'].sum() == 7*15*4
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import fxns
+
+
+def test_turns_match_onpitch(tournament):
+    filename, overviews, pitchtimes, roster = tournament
+    turns = fxns.calc_player_turns(pitchtimes, overviews)
+    assert list(turns.columns) == ['Game', 'Point', 'Name', 'Number of posessions', 'Did we score']
+    for scored in [1, 0]:
+        expected = {name : [] for name in roster.Name}
+        for game in overviews:
+            overview = overviews[game]
+            onpitch = fxns.calc_onpitch(overview, pitchtimes[game])[0]
+            for row, name in enumerate(pitchtimes[game].Name):
+                for point in np.flatnonzero(onpitch[row]):
+                    if (overview['Did we score'].iloc[point] == 1) == scored:
+                        expected[name].append(float(overview['Number of posessions'].iloc[point]))
+        found = turns[turns['Did we score'] == scored].groupby('Name', observed = False)['Number of posessions']
+        for name, possessions in found:
+            assert sorted(possessions) == sorted(expected[name])
+    indstats = fxns.calc_indstats(overviews, pitchtimes, roster).set_index('Name')
+    assert (turns.Name.value_counts()[indstats.index] == indstats['Points Played']).all()
+
+def test_violin_traces(tournament, monkeypatch):
+    filename, overviews, pitchtimes, roster = tournament
+    monkeypatch.setattr(fxns, 'render', lambda fig: fig)
+    turns = fxns.calc_player_turns(pitchtimes, overviews)
+    # A player who played no points still gets their two empty violins.
+    roster = pd.concat([roster, pd.DataFrame({'Name' : ['Bench'], 'Gender' : ['F']})], ignore_index = True)
+    fig = fxns.vis_player_odposviolin(turns, roster)
+    assert len(fig.data) == 2*len(roster)
+    for i, name in enumerate(roster.Name):
+        converted, conceded = fig.data[2*i], fig.data[2*i+1]
+        assert converted.name == conceded.name == name
+        mine = turns[turns.Name == name]
+        assert sorted(converted.y) == sorted(mine['Number of posessions'][mine['Did we score'] == 1])
+        assert sorted(conceded.y) == sorted(mine['Number of posessions'][mine['Did we score'] == 0])